@@ -1,16 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import atexit
+import gzip
+import hashlib
 import json
 import os
+import queue
 import re
+import select
 import sys
 import threading
+import time
 import webbrowser
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
 from datetime import date, datetime
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, unquote, urlparse
 
 APP_NAME = "malla_app"
 APP_VERSION = "0.9.64"
@@ -19,6 +27,10 @@ TERM_RE = re.compile(r"^(?P<y>\d{4})-(?P<s>[012])(?:\b|$)")
 COURSE_DIRS = [",Cursos", "Cursos"]
 UI_DIRNAME = "mallas_app"
 DRAFT_FILE = "malla_draft.json"
+DRAFT_JOURNAL = "malla_draft.journal"
+DRAFT_BACKUPS = 5  # snapshots anteriores para deshacer (malla_draft.json.1 … .N)
+CACHE_FILE = "malla_cache.sqlite3"
+FM_MAX_BYTES = 256 * 1024  # tope del header YAML leído en streaming
 
 TERM_CODE = {0: "V", 1: "I", 2: "P"}  # 0 Verano, 1 1er semestre, 2 2do semestre
 MAX_CREDITS = 65
@@ -45,6 +57,8 @@ pre{background:#f6f6f6;border:1px solid #ddd;border-radius:10px;padding:10px;whi
 
 
 def _jdefault(o):
+    if isinstance(o, _Record):
+        return o.to_dict()
     if isinstance(o, (date, datetime)):
         return o.isoformat()
     if isinstance(o, Path):
@@ -70,6 +84,249 @@ def pick_ui_dir(b: Path):
     return None
 
 
+# ---------- metrics ----------
+
+class Metrics:
+    """Contadores e histogramas en memoria (thread-safe) para ``/api/metrics``.
+
+    Las series se identifican por nombre + tupla de labels; los histogramas
+    usan buckets fijos en milisegundos (acumulativos al exportar a Prometheus).
+    """
+
+    BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}  # (name, labels) -> n
+        self.hists = {}  # (name, labels) -> [bucket counts..., +Inf], sum, count
+        self.labels = {}  # name -> nombres de labels
+        self.access_log = None  # stream para el access log estructurado (None = apagado)
+
+    def _key(self, name, labels: dict):
+        self.labels.setdefault(name, tuple(labels))
+        return name, tuple(str(v) for v in labels.values())
+
+    def inc(self, name: str, n=1, **labels):
+        with self._lock:
+            k = self._key(name, labels)
+            self.counters[k] = self.counters.get(k, 0) + n
+
+    def observe(self, name: str, ms: float, **labels):
+        with self._lock:
+            k = self._key(name, labels)
+            h = self.hists.get(k)
+            if h is None:
+                h = self.hists[k] = [[0] * (len(self.BUCKETS_MS) + 1), 0.0, 0]
+            i = 0
+            while i < len(self.BUCKETS_MS) and ms > self.BUCKETS_MS[i]:
+                i += 1
+            h[0][i] += 1
+            h[1] += ms
+            h[2] += 1
+
+    def log(self, record: dict):
+        stream = self.access_log
+        if stream is None:
+            return
+        line = jdump(record) + "\n"
+        with self._lock:
+            try:
+                stream.write(line)
+                stream.flush()
+            except Exception:
+                pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            hists = {k: (list(v[0]), v[1], v[2]) for k, v in self.hists.items()}
+        out = dict(uptime_s=round(time.time() - self.started, 1), counters={}, histograms={}, cache_ratios={})
+        for (name, vals), n in sorted(counters.items()):
+            out["counters"].setdefault(name, []).append(dict(zip(self.labels[name], vals), value=n))
+        for (name, vals), (buckets, total, count) in sorted(hists.items()):
+            q = {}
+            for frac in (0.5, 0.95, 0.99):
+                seen, rank = 0, frac * count
+                for i, c in enumerate(buckets):
+                    seen += c
+                    if seen >= rank:
+                        q[f"p{int(frac * 100)}_le_ms"] = self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else None
+                        break
+            out["histograms"].setdefault(name, []).append(
+                dict(zip(self.labels[name], vals), count=count, sum_ms=round(total, 3), mean_ms=round(total / count, 3), **q)
+            )
+        hits = {}
+        for (name, vals), n in counters.items():
+            if name == "cache_lookups_total":
+                lab = dict(zip(self.labels[name], vals))
+                hits.setdefault(lab["cache"], [0, 0])[0 if lab["result"] == "hit" else 1] += n
+        for cache, (h, m) in sorted(hits.items()):
+            out["cache_ratios"][cache] = dict(hits=h, misses=m, ratio=round(h / (h + m), 4) if h + m else None)
+        return out
+
+    def prometheus(self) -> str:
+        def fmt(name, vals, extra=()):
+            pairs = list(zip(self.labels[name], vals)) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{prom_escape(v)}"' for k, v in pairs) + "}"
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            hists = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self.hists.items())
+        lines, typed = [], set()
+        for (name, vals), n in counters:
+            metric = f"malla_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{fmt(name, vals)} {n}")
+        for (name, vals), (buckets, total, count) in hists:
+            metric = f"malla_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            acc = 0
+            for i, c in enumerate(buckets):
+                acc += c
+                le = str(self.BUCKETS_MS[i]) if i < len(self.BUCKETS_MS) else "+Inf"
+                lines.append(f"{metric}_bucket{fmt(name, vals, [('le', le)])} {acc}")
+            lines.append(f"{metric}_sum{fmt(name, vals)} {round(total, 3)}")
+            lines.append(f"{metric}_count{fmt(name, vals)} {count}")
+        lines.append(f"malla_uptime_seconds {round(time.time() - self.started, 1)}")
+        return "\n".join(lines) + "\n"
+
+
+def prom_escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics()
+API_ROUTES = {
+    "/api/all",
+    "/api/config",
+    "/api/draft",
+    "/api/draft/reset",
+    "/api/draft/undo",
+    "/api/events",
+    "/api/graph",
+    "/api/materialize",
+    "/api/materialize/batch",
+    "/api/metrics",
+    "/api/plan",
+    "/api/scenarios/evaluate",
+    "/api/search",
+    "/api/stats",
+    "/api/vaults",
+    "/api/warnings/evaluate",
+}
+
+
+def route_template(path: str) -> str:
+    # Agrupa rutas con parámetros para no crear una serie por valor.
+    m = VAULT_PATH_RE.match(path)
+    if m is not None:
+        path = m.group(2) or "/"
+    if path.startswith("/api/unlocks/"):
+        return "/api/unlocks/{sigla}"
+    if path.startswith("/api/"):
+        return path if path in API_ROUTES else "/api/(unknown)"
+    return "(static)"
+
+
+# ---------- locks ----------
+
+class TimedLock:
+    """Envuelve un lock y registra espera (``lock_wait_ms``) y retención (``lock_hold_ms``)."""
+
+    def __init__(self, lock, name: str, metrics=METRICS):
+        self._lock = lock
+        self.name = name
+        self.metrics = metrics
+        self._local = threading.local()
+
+    def __enter__(self):
+        t0 = time.perf_counter()
+        self._lock.acquire()
+        t1 = time.perf_counter()
+        self._local.t = t1
+        self.metrics.observe("lock_wait_ms", (t1 - t0) * 1000, lock=self.name)
+        return self
+
+    def __exit__(self, *exc):
+        held = (time.perf_counter() - self._local.t) * 1000
+        self._lock.release()
+        self.metrics.observe("lock_hold_ms", held, lock=self.name)
+        return False
+
+
+class _Side:
+    # Un lado (lectura o escritura) de un RWLock, con la interfaz de threading.Lock.
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class RWLock:
+    """Lock de lectores/escritor: ``reader`` admite lecturas concurrentes y
+    ``writer`` es exclusivo. Prefiere al escritor: con uno esperando no entran
+    lectores nuevos, así una escritura no queda postergada por un flujo de lecturas.
+    No es reentrante.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self.reader = _Side(self._acquire_read, self._release_read)
+        self.writer = _Side(self._acquire_write, self._release_write)
+
+    def _acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def _release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def _acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    def _release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class _Flight:
+    # Scan en curso compartido por los requests que llegan mientras corre.
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
 # ---------- frontmatter ----------
 
 def split_frontmatter(text: str):
@@ -82,17 +339,70 @@ def split_frontmatter(text: str):
     return None, text
 
 
+# Saltos de línea que reconoce ``str.splitlines()`` además de ``\n`` (en UTF-8).
+LINE_BREAK_RE = re.compile(rb"[\r\x0b\x0c\x1c-\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+
+
+def read_frontmatter(md: Path):
+    """Lee solo el header YAML de ``md`` (hasta el ``---`` de cierre).
+
+    Equivale a ``split_frontmatter(md.read_text())[0]`` pero sin leer el cuerpo
+    de la nota. Si el header supera ``FM_MAX_BYTES`` o tiene saltos de línea
+    distintos de ``\n``/``\r\n`` (p. ej. solo ``\r``) se cae a leer el archivo
+    completo para no cambiar el resultado.
+    """
+    with md.open("rb") as f:
+        lines, total = [], 0
+        while True:
+            line = f.readline(FM_MAX_BYTES)
+            total += len(line)
+            body = line[:-2] if line.endswith(b"\r\n") else line.rstrip(b"\n")
+            if total > FM_MAX_BYTES or LINE_BREAK_RE.search(body):
+                raw = b"".join(lines) + line + f.read()
+                return split_frontmatter(raw.decode("utf-8", errors="replace"))[0]
+            if not lines:
+                if line.strip() != b"---":
+                    return None
+            elif not line:
+                return None
+            elif line.strip() == b"---":
+                break
+            lines.append(line)
+    raw = b"".join(lines[1:])
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("utf-8", errors="replace")
+    return "\n".join(text.splitlines())
+
+
+_yaml_probe = None  # None: sin probar; False: PyYAML no disponible; (yaml, Loader)
+
+
+def yaml_support():
+    """(módulo yaml, Loader) o None. El import se prueba una sola vez."""
+    global _yaml_probe
+    if _yaml_probe is None:
+        try:
+            import yaml  # type: ignore
+
+            _yaml_probe = (yaml, getattr(yaml, "CSafeLoader", None) or yaml.SafeLoader)
+        except Exception:
+            _yaml_probe = False
+    return _yaml_probe or None
+
+
 def parse_frontmatter(fm: str | None) -> dict:
     if not fm:
         return {}
-    # Prefer PyYAML si está instalado
-    try:
-        import yaml  # type: ignore
-
-        d = yaml.safe_load(fm)
-        return d if isinstance(d, dict) else {}
-    except Exception:
-        pass
+    # Prefer PyYAML si está instalado (con el loader en C si existe)
+    ys = yaml_support()
+    if ys is not None:
+        try:
+            d = ys[0].load(fm, Loader=ys[1])
+            return d if isinstance(d, dict) else {}
+        except Exception:
+            pass
 
     # Fallback mínimo (key: value + listas "- item")
     out, key = {}, None
@@ -210,7 +520,326 @@ def rel(p: Path, base: Path) -> str:
         return str(p)
 
 
-def discover_all(b: Path):
+def file_sig(p: Path):
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+# ---------- records ----------
+
+class _Record:
+    """Acceso tipo dict (``c["sigla"]``, ``c.get()``, ``dict(c)``, ``{**c}``) sobre
+    un registro con ``__slots__``. Así los cursos del catálogo conviven con los
+    temporales del borrador, que siguen siendo dicts."""
+
+    __slots__ = ()
+    KEYS = ()
+
+    def keys(self):
+        return self.KEYS
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.keys() else default
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in self.keys()]
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.keys()}
+
+
+def _interned(xs) -> list:
+    return [sys.intern(x) for x in xs]
+
+
+@dataclass(slots=True)
+class Term(_Record):
+    term_id: str
+    year: int
+    sem: int
+    code: str
+    folderName: str
+    folderRel: str
+    searchRootRel: str
+    hasCoursesDir: bool
+
+    KEYS = ("term_id", "year", "sem", "code", "folderName", "folderRel", "searchRootRel", "hasCoursesDir")
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Term":
+        return cls(**{k: sys.intern(v) if isinstance(v, str) else v for k, v in d.items() if k in cls.KEYS})
+
+
+@dataclass(slots=True)
+class Course(_Record):
+    """Curso del catálogo. ``fileRel`` es el mismo string que ``course_id`` y el
+    frontmatter se guarda como texto crudo: se parsea solo si alguien lo pide
+    (``fields=frontmatter``/``*``); los campos normalizados ya están arriba."""
+
+    course_id: str
+    term_id: str
+    sigla: str
+    nombre: str
+    creditos: int
+    aprobado: bool
+    concentracion: str
+    prerrequisitos: list
+    semestreOfrecido: list
+    fm_text: str = ""
+    error: str | None = None
+
+    KEYS = (
+        "course_id", "fileRel", "term_id", "sigla", "nombre", "creditos", "aprobado",
+        "concentracion", "prerrequisitos", "semestreOfrecido", "frontmatter",
+    )
+    RECORD = (
+        "course_id", "term_id", "sigla", "nombre", "creditos", "aprobado",
+        "concentracion", "prerrequisitos", "semestreOfrecido", "fm_text", "error",
+    )
+
+    @property
+    def fileRel(self) -> str:
+        return self.course_id
+
+    @property
+    def frontmatter(self) -> dict:
+        return parse_frontmatter(self.fm_text)
+
+    def keys(self):
+        return self.KEYS + ("error",) if self.error is not None else self.KEYS
+
+    def to_dict(self, raw=True) -> dict:
+        """Forma JSON de siempre; con ``raw=False`` sin el frontmatter crudo."""
+        d = dict(
+            course_id=self.course_id,
+            fileRel=self.course_id,
+            term_id=self.term_id,
+            sigla=self.sigla,
+            nombre=self.nombre,
+            creditos=self.creditos,
+            aprobado=self.aprobado,
+            concentracion=self.concentracion,
+            prerrequisitos=self.prerrequisitos,
+            semestreOfrecido=self.semestreOfrecido,
+        )
+        if raw:
+            d["frontmatter"] = self.frontmatter
+        if self.error is not None:
+            d["error"] = self.error
+        return d
+
+    def record(self) -> list:
+        """Fila compacta para el caché en disco (``from_record`` la revierte)."""
+        return [getattr(self, k) for k in self.RECORD]
+
+    @classmethod
+    def from_record(cls, row: list) -> "Course":
+        c = cls(*row)
+        c.term_id, c.sigla, c.concentracion = sys.intern(c.term_id), sys.intern(c.sigla), sys.intern(c.concentracion)
+        c.prerrequisitos, c.semestreOfrecido = _interned(c.prerrequisitos), _interned(c.semestreOfrecido)
+        return c
+
+
+def error_course(md: Path, relp: str, term_id: str, err: str) -> Course:
+    return Course(
+        course_id=relp,
+        term_id=term_id,
+        sigla=sys.intern(md.stem),
+        nombre="",
+        creditos=0,
+        aprobado=False,
+        concentracion="ex",
+        prerrequisitos=[],
+        semestreOfrecido=[],
+        error=f"No se pudo leer: {err}",
+    )
+
+
+def build_course(md: Path, relp: str, term_id: str, fm: dict, fm_text: str | None = "") -> Course:
+    sigla = str(get(fm, "sigla", "código", "codigo", default=md.stem) or md.stem).strip()
+    nombre = str(get(fm, "nombre", default="") or "").strip()
+    creditos = as_int(get(fm, "créditos", "creditos", default=0), 0)
+    aprobado = as_bool(get(fm, "aprobado", default=False))
+
+    catv = get(fm, "concentracion", "concentración", default="ex")
+    if isinstance(catv, list):
+        catv = catv[0] if catv else "ex"
+    concentracion = str(catv or "").strip() or "ex"
+
+    prer = [str(x).strip() for x in listify(get(fm, "prerrequisitos", default=[])) if str(x).strip()]
+    prer = [p for p in prer if p.lower() != "nt"]
+    # Correquisitos en su propia clave: se guardan como ``SIGLA(c)`` en
+    # ``prerrequisitos``, igual que los cursos temporales de la UI.
+    for x in listify(get(fm, "correquisitos", "corequisitos", default=[])):
+        code = str(x).strip()
+        if code and code.lower() != "nt":
+            code = code if COREQ_RE.match(code) else f"{code}(c)"
+            if code not in prer:
+                prer.append(code)
+    sem_of = [str(x).strip() for x in listify(get(fm, "semestreOfrecido", default=[])) if str(x).strip()]
+
+    return Course(
+        course_id=relp,  # estable
+        term_id=sys.intern(term_id),
+        sigla=sys.intern(sigla),
+        nombre=nombre,
+        creditos=creditos,
+        aprobado=aprobado,
+        concentracion=sys.intern(concentracion),
+        prerrequisitos=_interned(prer),
+        semestreOfrecido=_interned(sem_of),
+        fm_text=fm_text or "",
+    )
+
+
+def read_course(md: Path, relp: str, term_id: str) -> Course:
+    try:
+        fm_text = read_frontmatter(md)
+    except Exception as e:
+        return error_course(md, relp, term_id, str(e))
+    return build_course(md, relp, term_id, parse_frontmatter(fm_text), fm_text)
+
+
+# ---------- parallel discovery ----------
+
+# Configurable desde la CLI (--workers / --parse-procs).
+# workers: 0 = automático, 1 = secuencial. parse_procs: 0 = parsear en el proceso principal.
+DISCOVERY = dict(workers=0, parse_procs=0)
+PARALLEL_MIN = 64  # bajo esta cantidad de archivos no vale la pena paralelizar
+
+_pools = {}  # nombre -> (procs, ProcessPoolExecutor)
+_pools_lock = threading.Lock()
+
+
+def process_pool(name: str, procs: int):
+    """Pool de procesos compartido ``name`` con al menos ``procs`` workers.
+
+    Se crea al primer uso y se recrea más grande si se piden más procesos (el
+    anterior termina lo que tenga en curso); nunca se achica, así quien pida
+    menos procesos reparte su trabajo en menos tareas sobre el mismo pool.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _pools_lock:
+        size, pool = _pools.get(name, (0, None))
+        if pool is not None and size >= procs:
+            return pool
+        if not _pools:
+            atexit.register(shutdown_pools)
+        if pool is not None:
+            pool.shutdown(wait=False)
+        pool = ProcessPoolExecutor(max_workers=procs)
+        _pools[name] = (procs, pool)
+        return pool
+
+
+def discard_pool(name: str, pool):
+    # Pool que falló (p. ej. un worker murió): se apaga y el próximo uso crea otro.
+    with _pools_lock:
+        if _pools.get(name, (0, None))[1] is pool:
+            del _pools[name]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for _, pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def discovery_workers(n_items: int, workers=None) -> int:
+    w = DISCOVERY["workers"] if workers is None else workers
+    if n_items < PARALLEL_MIN:
+        return 1
+    if w <= 0:
+        return min(16, (os.cpu_count() or 1) + 4)
+    return w
+
+
+def pmap(fn, items: list, workers: int) -> list:
+    """``map`` ordenado; usa un pool de threads si ``workers > 1`` (I/O)."""
+    if workers <= 1 or len(items) < 2:
+        return [fn(x) for x in items]
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="discover") as ex:
+        return list(ex.map(fn, items))
+
+
+def _read_job(md: Path):
+    try:
+        return True, read_frontmatter(md)
+    except Exception as e:
+        return False, str(e)
+
+
+def parse_many(texts: list, procs=None) -> list:
+    """Parsea frontmatters; con ``procs > 0`` reparte el YAML en un pool de procesos.
+
+    Si el pool no se puede usar (p. ej. un ejecutable congelado sin soporte)
+    se parsea en el proceso actual.
+    """
+    procs = DISCOVERY["parse_procs"] if procs is None else procs
+    if procs > 0 and len(texts) >= PARALLEL_MIN:
+        pool = None
+        try:
+            pool = process_pool("parse", procs)
+            chunk = max(1, len(texts) // (procs * 4))
+            return list(pool.map(parse_frontmatter, texts, chunksize=chunk))
+        except Exception:
+            if pool is not None:
+                discard_pool("parse", pool)
+    return [parse_frontmatter(t) for t in texts]
+
+
+def term_roots(b: Path, term_dirs: list) -> list:
+    """``(Term, carpeta donde buscar .md)`` por período, sin listar las notas."""
+    out = []
+    for tdir in term_dirs:
+        y, s = parse_term(tdir.name)  # type: ignore
+        root, has_courses = find_courses_root(tdir)
+        t = Term(
+            term_id=sys.intern(f"{y}-{s}"),
+            year=y,
+            sem=s,
+            code=TERM_CODE.get(s, "?"),
+            folderName=tdir.name,
+            folderRel=rel(tdir, b),
+            searchRootRel=rel(root, b),
+            hasCoursesDir=bool(has_courses),
+        )
+        out.append((t, root))
+    return out
+
+
+def iter_courses(b: Path, roots=None):
+    """Genera ``(Term, Course)`` nota por nota, en el mismo orden que
+    ``discover_all()``; en memoria queda solo el listado del período en curso."""
+    if roots is None:
+        roots = term_roots(b, find_terms(b)[0]) if b.exists() else []
+    for t, root in roots:
+        for md in sorted(root.rglob("*.md")):
+            yield t, read_course(md, rel(md, b), t.term_id)
+
+
+def discover_all(b: Path, index=None, workers=None, parse_procs=None):
+    t0 = time.perf_counter()
     debug = dict(
         app_name=APP_NAME,
         app_version=APP_VERSION,
@@ -228,224 +857,3373 @@ def discover_all(b: Path):
     term_dirs, mode = find_terms(b)
     debug["mode"], debug["terms_detected"] = mode, len(term_dirs)
 
-    terms, courses = [], []
-    for tdir in term_dirs:
-        y, s = parse_term(tdir.name)  # type: ignore
-        term_id = f"{y}-{s}"
-        root, has_courses = find_courses_root(tdir)
+    terms, jobs = [], []  # jobs: (md, fileRel, term_id) en orden determinista
+    for t, root in term_roots(b, term_dirs):
         md_files = sorted(root.rglob("*.md"))
         debug["md_found_total"] += len(md_files)
-
-        terms.append(
-            dict(
-                term_id=term_id,
-                year=y,
-                sem=s,
-                code=TERM_CODE.get(s, "?"),
-                folderName=tdir.name,
-                folderRel=rel(tdir, b),
-                searchRootRel=rel(root, b),
-                hasCoursesDir=bool(has_courses),
-            )
-        )
+        terms.append(t)
+        term_id = t.term_id
         debug["term_dirs"].append(
             dict(
                 term_id=term_id,
-                folderName=tdir.name,
-                searchRootRel=rel(root, b),
+                folderName=t.folderName,
+                searchRootRel=t.searchRootRel,
                 mdCount=len(md_files),
-                hasCoursesDir=bool(has_courses),
+                hasCoursesDir=t.hasCoursesDir,
             )
         )
+        jobs.extend((md, rel(md, b), term_id) for md in md_files)
+    t_walk = time.perf_counter()
 
-        for md in md_files:
-            relp = rel(md, b)
-            try:
-                txt = md.read_text(encoding="utf-8")
-            except UnicodeDecodeError:
-                txt = md.read_text(encoding="utf-8", errors="replace")
-            except Exception as e:
-                courses.append(
-                    dict(
-                        course_id=relp,
-                        fileRel=relp,
-                        term_id=term_id,
-                        sigla=md.stem,
-                        nombre="",
-                        creditos=0,
-                        aprobado=False,
-                        concentracion="ex",
-                        prerrequisitos=[],
-                        semestreOfrecido=[],
-                        frontmatter={},
-                        error=f"No se pudo leer: {e}",
-                    )
-                )
-                continue
-
-            fm_text, _ = split_frontmatter(txt)
-            fm = parse_frontmatter(fm_text)
+    n_workers = discovery_workers(len(jobs), workers)
+    courses = [None] * len(jobs)
+    sigs = pmap(file_sig, [j[0] for j in jobs], n_workers) if index is not None else [None] * len(jobs)
+    pending = []
+    for i, (md, relp, term_id) in enumerate(jobs):
+        if index is not None:
+            courses[i] = index.lookup(relp, sigs[i])
+        if courses[i] is None:
+            pending.append(i)
+    t_stat = time.perf_counter()
 
-            sigla = str(get(fm, "sigla", "código", "codigo", default=md.stem) or md.stem).strip()
-            nombre = str(get(fm, "nombre", default="") or "").strip()
-            creditos = as_int(get(fm, "créditos", "creditos", default=0), 0)
-            aprobado = as_bool(get(fm, "aprobado", default=False))
+    reads = pmap(_read_job, [jobs[i][0] for i in pending], discovery_workers(len(pending), workers))
+    t_read = time.perf_counter()
 
-            catv = get(fm, "concentracion", "concentración", default="ex")
-            if isinstance(catv, list):
-                catv = catv[0] if catv else "ex"
-            concentracion = str(catv or "").strip() or "ex"
+    ok = [i for i, r in zip(pending, reads) if r[0]]
+    parsed = parse_many([r[1] for r in reads if r[0]], parse_procs)
+    fms = dict(zip(ok, parsed))
+    for i, r in zip(pending, reads):
+        md, relp, term_id = jobs[i]
+        if i in fms:
+            courses[i] = build_course(md, relp, term_id, fms[i], r[1])
+        else:
+            courses[i] = error_course(md, relp, term_id, r[1])
+        if index is not None:
+            index.store(relp, sigs[i], courses[i])
+    t_parse = time.perf_counter()
 
-            prer = [str(x).strip() for x in listify(get(fm, "prerrequisitos", default=[])) if str(x).strip()]
-            prer = [p for p in prer if p.lower() != "nt"]
-            sem_of = [str(x).strip() for x in listify(get(fm, "semestreOfrecido", default=[])) if str(x).strip()]
+    if index is not None:
+        debug["cache"] = index.finish()
+        METRICS.inc("cache_lookups_total", debug["cache"]["hits"], cache="index", result="hit")
+        METRICS.inc("cache_lookups_total", debug["cache"]["misses"], cache="index", result="miss")
 
-            courses.append(
-                dict(
-                    course_id=relp,  # estable
-                    fileRel=relp,
-                    term_id=term_id,
-                    sigla=sigla,
-                    nombre=nombre,
-                    creditos=creditos,
-                    aprobado=aprobado,
-                    concentracion=concentracion,
-                    prerrequisitos=prer,
-                    semestreOfrecido=sem_of,
-                    frontmatter=fm,
-                )
-            )
+    def ms(a, z):
+        return round((z - a) * 1000, 2)
 
+    debug["timings"] = dict(
+        walk_ms=ms(t0, t_walk),
+        stat_ms=ms(t_walk, t_stat),
+        read_ms=ms(t_stat, t_read),
+        parse_ms=ms(t_read, t_parse),
+        total_ms=ms(t0, t_parse),
+        workers=n_workers,
+        parse_procs=DISCOVERY["parse_procs"] if parse_procs is None else parse_procs,
+        files_read=len(pending),
+    )
+    for phase in ("walk", "stat", "read", "parse", "total"):
+        METRICS.observe("discovery_phase_ms", debug["timings"][f"{phase}_ms"], phase=phase)
     return terms, courses, debug
 
 
-# ---------- draft ----------
+# ---------- course index ----------
 
-def draft_default():
-    # Draft schema (persisted in malla_draft.json)
-    # - term_order: ordering of terms in UI
-    # - placements: course_id -> term_id overrides
-    # - custom_terms: user-created terms
-    # - ignored_warnings: persisted ignore flags by warning id
-    # - temp_courses: courses that exist only in draft (UI-created)
-    return {
-        "term_order": [],
-        "placements": {},
-        "custom_terms": [],
-        "ignored_warnings": {},
-        "temp_courses": [],
-    }
+class CourseIndex:
+    """Índice de cursos en memoria, persistente entre requests.
 
+    Cada entrada se guarda por ``fileRel`` junto a su firma ``(mtime_ns, size)``;
+    en cada scan solo se relee/parsea lo que cambió y se descartan los archivos
+    borrados. Si nada cambió se reutiliza el payload anterior tal cual.
 
-def draft_path(b: Path) -> Path:
-    return b / DRAFT_FILE
+    Cada scan que cambia algo incrementa ``generation`` (parte del reloj en ms,
+    así un cursor de otro proceso siempre queda bajo ``floor``) y recalcula
+    ``etag``, un hash del contenido del catálogo. ``changes_since()`` usa la
+    generación de cada curso y las lápidas de los borrados para armar deltas.
 
+    ``on_change`` (opcional) recibe el delta de cada scan que cambió algo:
+    ``{generation, added, updated, removed, terms?}``.
 
-def sanitize_draft(d: dict) -> dict:
-    base = draft_default()
-    if not isinstance(d, dict):
-        return base
-    for k, v in base.items():
-        d.setdefault(k, v)
-    if not isinstance(d["term_order"], list):
-        d["term_order"] = []
-    if not isinstance(d["placements"], dict):
-        d["placements"] = {}
-    if not isinstance(d["custom_terms"], list):
-        d["custom_terms"] = []
-    if not isinstance(d["ignored_warnings"], dict):
-        d["ignored_warnings"] = {}
-    if not isinstance(d.get("temp_courses"), list):
-        d["temp_courses"] = []
-    else:
-        # Keep only dict-like entries to avoid crashes in the UI.
-        d["temp_courses"] = [x for x in d["temp_courses"] if isinstance(x, dict)]
-    return d
+    Con ``cache`` (un ``CatalogCache``) el índice arranca desde disco: ``current()``
+    sirve ese snapshot sin escanear y lo valida en segundo plano; cada scan que
+    cambia algo se escribe de vuelta de forma incremental.
+    """
 
+    TOMBSTONES_MAX = 4096
 
-def load_draft(b: Path) -> dict:
-    p = draft_path(b)
-    if not p.exists():
-        return draft_default()
-    try:
-        return sanitize_draft(json.loads(p.read_text(encoding="utf-8")))
-    except Exception:
-        return draft_default()
+    def __init__(self, b: Path, on_change=None, cache=None):
+        self.b = b
+        self.cache = cache
+        self.validated = True
+        self.debug = None
+        self._validating = False
+        self.lock = threading.Lock()
+        self.entries = {}  # fileRel -> (sig, course, digest, generation)
+        self.terms = None
+        self.courses = None
+        self.on_change = on_change
+        self.generation = self.floor = time.time_ns() // 1_000_000
+        self.etag = None
+        self.tombstones = {}  # fileRel -> generation en que se borró
+        self._seen = set()
+        self._added, self._updated, self._gone = [], [], []
+        self._hits = self._misses = self._reparsed = 0
+        self._derived = {}  # name -> (generation, value)
+        self._flight = None  # scan en curso (single-flight)
+        self._flight_lock = threading.Lock()
+        self.coalesced = 0
 
+    @staticmethod
+    def digest(course) -> bytes:
+        # La fila compacta incluye el frontmatter crudo: no hace falta parsearlo.
+        data = course.record() if isinstance(course, Course) else course
+        return hashlib.sha1(jdump(data, sort_keys=True).encode("utf-8")).digest()
 
-def save_draft(b: Path, d: dict):
-    draft_path(b).write_text(jdump(sanitize_draft(d), indent=2), encoding="utf-8")
+    def lookup(self, relp: str, sig):
+        self._seen.add(relp)
+        hit = self.entries.get(relp)
+        if sig is not None and hit is not None and hit[0] == sig:
+            self._hits += 1
+            return hit[1]
+        self._misses += 1
+        if hit is not None:
+            self._reparsed += 1
+        return None
 
+    def store(self, relp: str, sig, course: dict):
+        (self._updated if relp in self.entries else self._added).append(course)
+        if sig is None:
+            self.entries.pop(relp, None)
+            return
+        self.entries[relp] = (sig, course, self.digest(course), self.generation + 1)
+        self.tombstones.pop(relp, None)
 
-# ---------- http ----------
+    def finish(self) -> dict:
+        gone = [k for k in self.entries if k not in self._seen]
+        for k in gone:
+            del self.entries[k]
+        self._gone = gone
+        stats = dict(
+            hits=self._hits,
+            misses=self._misses,
+            reparsed=self._reparsed,
+            removed=len(gone),
+            entries=len(self.entries),
+        )
+        self._seen = set()
+        self._hits = self._misses = self._reparsed = 0
+        return stats
 
-def send(h, status, ctype, body: bytes):
-    try:
-        h.send_response(status)
-        h.send_header("Content-Type", ctype)
-        h.send_header("Content-Length", str(len(body)))
-        h.end_headers()
-        if body:
-            h.wfile.write(body)
-    except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
-        pass
+    def scan(self):
+        """Escanea el vault. Single-flight: si ya hay un scan en curso, se espera
+        y se comparte su resultado en vez de recorrer el vault otra vez."""
+        with self._flight_lock:
+            flight, leader = self._flight, self._flight is None
+            if leader:
+                flight = self._flight = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            METRICS.inc("scans_coalesced_total")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self._scan()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flight_lock:
+                self._flight = None
+            flight.done.set()
 
+    def _scan(self):
+        with self.lock:
+            self._added, self._updated, self._gone = [], [], []
+            terms, courses, debug = discover_all(self.b, index=self)
+            cache = debug.get("cache") or {}
+            unchanged = not cache.get("misses") and not cache.get("removed")
+            if unchanged and self.courses is not None and terms == self.terms:
+                cache["served_from_cache"] = True
+                debug["generation"], debug["etag"] = self.generation, self.etag
+                # También valida un índice cargado desde disco que no cambió.
+                self.validated, self.debug = True, debug
+                return self.terms, self.courses, debug
+            cache["served_from_cache"] = False
+            self.generation += 1
+            for relp in self._gone:
+                self.tombstones[relp] = self.generation
+            while len(self.tombstones) > self.TOMBSTONES_MAX:
+                relp = next(iter(self.tombstones))
+                self.floor = max(self.floor, self.tombstones.pop(relp))
+            delta = dict(generation=self.generation, added=self._added, updated=self._updated, removed=self._gone)
+            if terms != self.terms:
+                delta["terms"] = terms
+            first = self.courses is None
+            self.terms, self.courses = terms, courses
+            self.etag = self._catalog_hash(terms, courses)
+            debug["generation"], debug["etag"] = self.generation, self.etag
+            self.validated, self.debug = True, debug
+            if self.cache is not None:
+                upserts = [c["course_id"] for c in self._added + self._updated]
+                self.cache.save(self, upserts, self._gone)
+        if self.on_change and not first:
+            self.on_change(delta)
+        return terms, courses, debug
 
-def handler_factory(b: Path, ui_dir):
-    lock = threading.Lock()
+    def load_cache(self) -> bool:
+        """Carga el snapshot persistido (si existe y es de esta versión)."""
+        snap = self.cache.load() if self.cache is not None else None
+        if not snap:
+            return False
+        with self.lock:
+            self.generation += 1
+            self.entries = {
+                relp: (sig, course, dig, self.generation) for relp, (sig, course, dig) in snap["entries"].items()
+            }
+            self.terms = snap["terms"]
+            self.courses = [self.entries[k][1] for k in snap["order"] if k in self.entries]
+            self.debug = snap["debug"]
+            self.etag = self._catalog_hash(self.terms, self.courses)
+            self.validated = False
+        return True
 
-    class H(SimpleHTTPRequestHandler):
-        def __init__(self, *args, **kw):
-            super().__init__(*args, directory=str(ui_dir) if ui_dir else None, **kw)
+    def current(self):
+        """Como ``scan()``, pero si el índice viene de disco y aún no se valida,
+        devuelve ese snapshot al tiro y lanza la validación en segundo plano."""
+        with self.lock:
+            if not self.validated and self.courses is not None:
+                debug = dict(self.debug or {})
+                debug["cache"] = dict(source="disk", validated=False, entries=len(self.entries))
+                debug["generation"], debug["etag"] = self.generation, self.etag
+                if not self._validating:
+                    self._validating = True
+                    threading.Thread(target=self._validate, name="cache-validate", daemon=True).start()
+                return self.terms, self.courses, debug
+        return self.scan()
 
-        def log_message(self, *args):
-            return
+    def _validate(self):
+        try:
+            self.scan()
+        except Exception:
+            pass
+        finally:
+            self._validating = False
 
-        def do_GET(self):
-            path = urlparse(self.path).path
-            if path == "/favicon.ico":
-                return send(self, 204, "image/x-icon", b"")
-            if path.startswith("/api/"):
-                return self.api_get(path)
-            if ui_dir is None:
-                if path in ("/", "/index.html"):
-                    return send(self, 200, "text/html; charset=utf-8", FALLBACK_INDEX.encode("utf-8"))
-                return send(self, 404, "text/plain; charset=utf-8", b"404 Not Found")
-            return super().do_GET()
+    def _catalog_hash(self, terms, courses) -> str:
+        h = hashlib.sha1(jdump(terms, sort_keys=True).encode("utf-8"))
+        for c in courses:
+            hit = self.entries.get(c["course_id"])
+            h.update(hit[2] if hit is not None else self.digest(c))
+        return h.hexdigest()
 
-        def do_POST(self):
-            path = urlparse(self.path).path
+    def derived(self, name: str, build):
+        """Estructura derivada del catálogo (grafo, índices...), cacheada hasta
+        que cambie ``generation``. ``build`` recibe la lista de cursos."""
+        with self.lock:
+            gen, courses = self.generation, self.courses or []
+            hit = self._derived.get(name)
+            if hit is not None and hit[0] == gen:
+                METRICS.inc("cache_lookups_total", cache="derived", result="hit")
+                return hit[1]
+        METRICS.inc("cache_lookups_total", cache="derived", result="miss")
+        value = build(courses)
+        with self.lock:
+            if self.generation == gen:
+                self._derived[name] = (gen, value)
+        return value
 
-            if path == "/api/draft":
+    def changes_since(self, since: int):
+        """Cursos cambiados y ``course_id`` borrados después de ``since``.
+
+        Devuelve ``None`` si ``since`` es anterior a lo que el índice recuerda
+        (otro proceso, lápidas ya descartadas): hay que mandar el payload completo.
+        """
+        with self.lock:
+            if self.courses is None or since < self.floor or since > self.generation:
+                return None
+            changed = []
+            for c in self.courses:
+                hit = self.entries.get(c["course_id"])
+                if hit is None or hit[3] > since:
+                    changed.append(c)
+            removed = [k for k, g in self.tombstones.items() if g > since]
+            return changed, removed
+
+
+class CatalogCache:
+    """Snapshot del índice en SQLite (``malla_cache.sqlite3`` junto al borrador).
+
+    Guarda cada curso parseado con su firma de archivo; se invalida completo si
+    cambia el esquema, la versión de la app o la disponibilidad de PyYAML
+    (cambia el parser). Si el archivo no se puede usar, el caché se desactiva.
+    """
+
+    SCHEMA = 3
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.enabled = True
+
+    def _stamp(self) -> dict:
+        return dict(schema=str(self.SCHEMA), app_version=APP_VERSION, yaml=str(yaml_support() is not None))
+
+    def _connect(self):
+        import sqlite3
+
+        con = sqlite3.connect(str(self.path), timeout=5)
+        con.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS courses ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, digest BLOB, record TEXT)"
+        )
+        return con
+
+    def load(self):
+        if not self.enabled or not self.path.exists():
+            return None
+        with self.lock:
+            try:
+                con = self._connect()
                 try:
-                    n = int(self.headers.get("Content-Length", "0"))
-                    raw = self.rfile.read(n) if n > 0 else b"{}"
-                    d = sanitize_draft(json.loads(raw.decode("utf-8")))
-                    save_draft(b, d)
-                    return send(self, 200, "application/json; charset=utf-8", jdump({"ok": True}).encode("utf-8"))
-                except Exception as e:
-                    return send(
-                        self,
-                        400,
-                        "application/json; charset=utf-8",
-                        jdump({"ok": False, "error": str(e)}).encode("utf-8"),
+                    meta = dict(con.execute("SELECT key, value FROM meta"))
+                    if any(meta.get(k) != v for k, v in self._stamp().items()):
+                        return None
+                    entries = {
+                        path: ((mtime_ns, size), Course.from_record(json.loads(record)), bytes(digest))
+                        for path, mtime_ns, size, digest, record in con.execute(
+                            "SELECT path, mtime_ns, size, digest, record FROM courses"
+                        )
+                    }
+                    return dict(
+                        entries=entries,
+                        terms=[Term.from_dict(t) for t in json.loads(meta.get("terms") or "[]")],
+                        order=json.loads(meta.get("order") or "[]"),
+                        debug=json.loads(meta.get("debug") or "{}"),
                     )
+                finally:
+                    con.close()
+            except Exception:
+                self._reset()
+                return None
 
-            if path == "/api/draft/reset":
-                # Hard reset: delete malla_draft.json (frontend must confirm).
+    def save(self, index: "CourseIndex", upserts, deletes):
+        if not self.enabled:
+            return
+        with self.lock:
+            try:
+                con = self._connect()
                 try:
-                    p = draft_path(b)
-                    existed = p.exists()
-                    try:
-                        p.unlink()
-                    except FileNotFoundError:
-                        existed = False
-                    return send(
-                        self,
-                        200,
-                        "application/json; charset=utf-8",
-                        jdump({"ok": True, "deleted": existed}).encode("utf-8"),
-                    )
+                    with con:
+                        meta = dict(con.execute("SELECT key, value FROM meta"))
+                        if any(meta.get(k) != v for k, v in self._stamp().items()):
+                            con.execute("DELETE FROM courses")
+                            upserts = list(index.entries)
+                        rows = []
+                        for relp in upserts:
+                            hit = index.entries.get(relp)
+                            if hit is not None:
+                                rows.append((relp, hit[0][0], hit[0][1], hit[2], jdump(hit[1].record())))
+                        con.executemany("INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?, ?)", rows)
+                        con.executemany("DELETE FROM courses WHERE path = ?", [(k,) for k in deletes])
+                        meta = dict(
+                            self._stamp(),
+                            terms=jdump(index.terms),
+                            order=jdump([c["course_id"] for c in index.courses]),
+                            debug=jdump({k: v for k, v in (index.debug or {}).items() if k != "cache"}),
+                        )
+                        con.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", list(meta.items()))
+                finally:
+                    con.close()
+            except Exception:
+                self._reset()
+
+    def _reset(self):
+        # Caché corrupto o no escribible: se borra y, si tampoco se puede, se desactiva.
+        try:
+            self.path.unlink()
+        except Exception:
+            self.enabled = False
+
+
+# ---------- live updates ----------
+
+class EventHub:
+    """Fan-out de eventos hacia los clientes SSE (una cola acotada por cliente).
+
+    Si un cliente no alcanza a consumir, se le descarta la cola y recibe un
+    evento ``resync`` para que vuelva a pedir ``/api/all`` completo.
+    """
+
+    QUEUE_MAX = 256
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subs = set()
+
+    def subscribe(self, q=None) -> queue.Queue:
+        # ``q``: cualquier objeto con ``put_nowait`` (p. ej. ``_LoopSubscriber``).
+        q = queue.Queue(self.QUEUE_MAX) if q is None else q
+        with self.lock:
+            self.subs.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self.lock:
+            self.subs.discard(q)
+
+    def count(self) -> int:
+        with self.lock:
+            return len(self.subs)
+
+    def publish(self, event: str, data):
+        with self.lock:
+            subs = list(self.subs)
+        for q in subs:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(("resync", {}))
+
+
+def sse_event(event: str, data, fields=None) -> bytes:
+    # Un evento SSE; en los deltas los cursos se proyectan como en /api/all.
+    if event == "delta":
+        data = dict(data)
+        for k in ("added", "updated"):
+            data[k] = [project_course(c, fields) for c in data.get(k) or []]
+    return f"event: {event}\ndata: {jdump(data)}\n\n".encode("utf-8")
+
+
+class _Inotify:
+    """inotify vía ctypes (solo Linux). Se usa solo para despertar al watcher."""
+
+    MASK = 0x2 | 0x4 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x400  # MODIFY ATTRIB CLOSE_WRITE MOVED_* CREATE DELETE*
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.watched = set()
+
+    def watch(self, p: Path):
+        key = str(p)
+        if key in self.watched:
+            return
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(key), self.MASK) >= 0:
+            self.watched.add(key)
+
+    def wait(self, timeout: float) -> bool:
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if not r:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class VaultWatcher(threading.Thread):
+    """Re-escanea el vault en segundo plano mientras haya clientes SSE.
+
+    Usa inotify si está disponible (con un rescan de seguridad cada
+    ``SAFETY_RESCAN`` s); si no, hace polling por stat cada ``interval`` s.
+    Los cambios salen por ``CourseIndex.on_change``.
+    """
+
+    SAFETY_RESCAN = 30.0
+    DEBOUNCE = 0.25
+
+    def __init__(self, index: CourseIndex, hub: EventHub, interval: float = 1.5):
+        super().__init__(name="vault-watcher", daemon=True)
+        self.index, self.hub, self.interval = index, hub, interval
+        self.stop_event = threading.Event()
+        self.wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self.inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                self.inotify = _Inotify()
+            except Exception:
+                self.inotify = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify else "polling"
+
+    def ensure_started(self):
+        with self._start_lock:
+            if not self.is_alive() and not self.stop_event.is_set():
+                self.start()
+        self.wake.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        with self._start_lock:
+            if not self.is_alive() and self.inotify is not None:
+                self.inotify.close()
+
+    def _watch_dirs(self):
+        b = self.index.b
+        self.inotify.watch(b)
+        for t in self.index.terms or []:
+            for root, _, _ in os.walk(b / t["folderRel"]):
+                self.inotify.watch(Path(root))
+
+    def _wait(self):
+        if self.inotify is None:
+            self.wake.wait(self.interval)
+        elif self.inotify.wait(self.SAFETY_RESCAN):
+            time.sleep(self.DEBOUNCE)
+            self.inotify.wait(0)
+        self.wake.clear()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.hub.count():
+                try:
+                    self.index.scan()
+                    if self.inotify is not None:
+                        self._watch_dirs()
+                except Exception:
+                    pass
+                self._wait()
+            else:
+                self.wake.wait(self.interval)
+                self.wake.clear()
+        if self.inotify is not None:
+            self.inotify.close()
+
+
+# ---------- prerequisite graph ----------
+
+COREQ_RE = re.compile(r"^(.+?)\(c\)$", re.IGNORECASE)
+COREQ_RE_STRICT = re.compile(r"^(.+?)\(c\)$")
+
+
+def norm_sigla(x) -> str:
+    return str(x or "").strip().upper()
+
+
+def split_reqs(prer, ignore_case=True) -> tuple:
+    """Separa ``prerrequisitos`` en (prerrequisitos, correquisitos ``SIGLA(c)``).
+
+    ``ignore_case=False`` replica ``normalizePrereqs()`` de app.js (warnings),
+    que solo reconoce ``(c)`` en minúscula.
+    """
+    pre, co = [], []
+    rx = COREQ_RE if ignore_case else COREQ_RE_STRICT
+    for item in prer or []:
+        s = str(item or "").strip()
+        if not s or s.lower() == "nt":
+            continue
+        m = rx.match(s)
+        if m:
+            co.append(m.group(1).strip())
+        else:
+            pre.append(s)
+    return pre, co
+
+
+class PrereqGraph:
+    """Grafo de prerrequisitos construido desde la salida de ``discover_all()``.
+
+    Mismas reglas que ``unlock.js``: siglas sin distinguir mayúsculas, los
+    correquisitos ``SIGLA(c)`` no son aristas y una sigla repetida apunta al
+    último curso. Precalcula adyacencia en ambos sentidos, componentes
+    fuertemente conexas (ciclos), niveles topológicos y, por curso, el conjunto
+    transitivo de cursos que desbloquea como bitset (``int``).
+    """
+
+    def __init__(self, courses: list):
+        self.ids = [str(c.get("course_id")) for c in courses]
+        self.siglas = [str(c.get("sigla") or "") for c in courses]
+        self.pos = {cid: i for i, cid in enumerate(self.ids)}
+        self.by_sigla = {}
+        for i, sg in enumerate(self.siglas):
+            if norm_sigla(sg):
+                self.by_sigla[norm_sigla(sg)] = i
+
+        n = len(self.ids)
+        self.forward = [[] for _ in range(n)]  # req -> dependientes
+        self.backward = [[] for _ in range(n)]  # curso -> reqs
+        self.unknown = {}
+        for i, c in enumerate(courses):
+            pre, _ = split_reqs(c.get("prerrequisitos"))
+            seen = set()
+            for code in pre:
+                j = self.by_sigla.get(norm_sigla(code))
+                if j is None:
+                    self.unknown.setdefault(self.ids[i], []).append(code)
+                    continue
+                if j in seen:
+                    continue
+                seen.add(j)
+                self.forward[j].append(i)
+                self.backward[i].append(j)
+
+        self._build()
+
+    def _build(self):
+        n = len(self.ids)
+        comp, sccs = tarjan(n, self.forward)
+        self.comp = comp
+        # Tarjan entrega las componentes en orden topológico inverso (sumideros primero).
+        bits = [0] * len(sccs)
+        cyclic = [False] * len(sccs)
+        for k, members in enumerate(sccs):
+            for i in members:
+                bits[k] |= 1 << i
+            cyclic[k] = len(members) > 1 or any(i in self.forward[i] for i in members)
+        self.cycles = [[self.ids[i] for i in sorted(members)] for k, members in enumerate(sccs) if cyclic[k]]
+
+        reach = [0] * len(sccs)
+        for k, members in enumerate(sccs):
+            acc = bits[k] if cyclic[k] else 0
+            for i in members:
+                for j in self.forward[i]:
+                    t = comp[j]
+                    if t != k:
+                        acc |= bits[t] | reach[t]
+            reach[k] = acc
+        self.unlock_bits = [reach[comp[i]] & ~(1 << i) for i in range(n)]
+
+        level = [0] * len(sccs)
+        for k in range(len(sccs) - 1, -1, -1):
+            lv = 0
+            for i in sccs[k]:
+                for j in self.backward[i]:
+                    t = comp[j]
+                    if t != k:
+                        lv = max(lv, level[t] + 1)
+            level[k] = lv
+        self.levels = [level[comp[i]] for i in range(n)]
+
+    def bits_to_ids(self, bits: int) -> list:
+        out, i = [], 0
+        while bits:
+            if bits & 1:
+                out.append(self.ids[i])
+            bits >>= 1
+            i += 1
+        return out
+
+    def unlocks(self, course_id: str) -> list:
+        i = self.pos.get(str(course_id))
+        return [] if i is None else self.bits_to_ids(self.unlock_bits[i])
+
+    def find(self, sigla_or_id: str):
+        i = self.by_sigla.get(norm_sigla(sigla_or_id))
+        return self.pos.get(str(sigla_or_id)) if i is None else i
+
+    def to_dict(self) -> dict:
+        ids = self.ids
+        return dict(
+            nodes=[dict(course_id=ids[i], sigla=self.siglas[i], level=self.levels[i]) for i in range(len(ids))],
+            forward={ids[i]: [ids[j] for j in js] for i, js in enumerate(self.forward) if js},
+            backward={ids[i]: [ids[j] for j in js] for i, js in enumerate(self.backward) if js},
+            cycles=self.cycles,
+            unknown=self.unknown,
+            max_level=max(self.levels, default=0),
+        )
+
+
+def tarjan(n: int, adj: list):
+    """Componentes fuertemente conexas (Tarjan iterativo, sin recursión).
+
+    Devuelve ``(comp, sccs)``: componente de cada nodo y la lista de
+    componentes en orden topológico inverso.
+    """
+    index = [0] * n
+    low = [0] * n
+    on_stack = [False] * n
+    visited = [False] * n
+    comp = [-1] * n
+    stack, sccs = [], []
+    counter = 1
+    for root in range(n):
+        if visited[root]:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, pi = work[-1]
+            if pi == 0 and not visited[v]:
+                visited[v] = True
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            if pi < len(adj[v]):
+                work[-1] = (v, pi + 1)
+                w = adj[v][pi]
+                if not visited[w]:
+                    work.append((w, 0))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                low[u] = min(low[u], low[v])
+            if low[v] == index[v]:
+                members = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp[w] = len(sccs)
+                    members.append(w)
+                    if w == v:
+                        break
+                sccs.append(members)
+    return comp, sccs
+
+
+# ---------- search ----------
+
+SEARCH_WEIGHTS = dict(sigla=12.0, nombre=6.0, concentracion=3.0, prerrequisitos=2.0, semestreOfrecido=1.0, body=1.0)
+SEARCH_BODY_MAX = 64 * 1024  # bytes de cuerpo indexados por nota
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text) -> str:
+    """Minúsculas y sin tildes (``"Álgebra"`` → ``"algebra"``)."""
+    import unicodedata
+
+    s = str(text or "").lower()
+    if s.isascii():
+        return s
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(ch for ch in s if not unicodedata.combining(ch))
+
+
+def search_tokens(text) -> list:
+    return SEARCH_TOKEN_RE.findall(fold(text))
+
+
+def read_body(md: Path) -> str:
+    try:
+        with md.open("rb") as f:
+            raw = f.read(SEARCH_BODY_MAX)
+    except OSError:
+        return ""
+    return split_frontmatter(raw.decode("utf-8", errors="replace"))[1]
+
+
+class SearchIndex:
+    """Índice invertido del catálogo para ``/api/search``.
+
+    Por curso indexa sigla, nombre, concentración, prerrequisitos, semestres
+    ofrecidos y el cuerpo de la nota, cada campo con su peso
+    (``SEARCH_WEIGHTS``). Los tokens se normalizan con ``fold()`` y se buscan
+    por prefijo con ``bisect`` sobre la lista ordenada de tokens.
+
+    Se sincroniza con el ``CourseIndex`` recién al buscar y solo si cambió su
+    ``generation``; en ese caso relee el cuerpo únicamente de las notas cuya
+    firma ``(mtime_ns, size)`` cambió y saca del índice las borradas.
+    """
+
+    def __init__(self, b: Path):
+        self.b = b
+        self.lock = threading.Lock()
+        self.generation = None
+        self.docs = {}  # course_id -> (sig, course, {token: peso})
+        self.postings = {}  # token -> {course_id: peso}
+        self._sorted = []
+        self._dirty = False
+        self.reindexed = 0
+
+    def _remove(self, cid: str):
+        doc = self.docs.pop(cid, None)
+        if doc is None:
+            return
+        for tok in doc[2]:
+            post = self.postings.get(tok)
+            if post is None:
+                continue
+            post.pop(cid, None)
+            if not post:
+                del self.postings[tok]
+                self._dirty = True
+
+    def _add(self, cid: str, sig, course):
+        terms = {}
+
+        def feed(field, text):
+            w = SEARCH_WEIGHTS[field]
+            for tok in search_tokens(text):
+                terms[tok] = terms.get(tok, 0.0) + w
+
+        feed("sigla", course.get("sigla"))
+        feed("nombre", course.get("nombre"))
+        feed("concentracion", course.get("concentracion"))
+        feed("prerrequisitos", " ".join(map(str, course.get("prerrequisitos") or [])))
+        feed("semestreOfrecido", " ".join(map(str, course.get("semestreOfrecido") or [])))
+        # En el cuerpo cada token suma hasta 4 apariciones (una nota larga no tapa a la sigla).
+        for tok, n in Counter(search_tokens(read_body(self.b / cid))).items():
+            terms[tok] = terms.get(tok, 0.0) + min(n, 4) * SEARCH_WEIGHTS["body"]
+
+        self.docs[cid] = (sig, course, terms)
+        for tok, w in terms.items():
+            post = self.postings.get(tok)
+            if post is None:
+                post = self.postings[tok] = {}
+                self._dirty = True
+            post[cid] = w
+        self.reindexed += 1
+
+    def sync(self, index: "CourseIndex"):
+        with index.lock:
+            gen = index.generation
+            if gen == self.generation:
+                return
+            snap = [(str(c["course_id"]), (index.entries.get(c["course_id"]) or (None,))[0], c) for c in index.courses or []]
+        live = set()
+        for cid, sig, course in snap:
+            live.add(cid)
+            doc = self.docs.get(cid)
+            if doc is not None and sig is not None and doc[0] == sig:
+                continue
+            self._remove(cid)
+            self._add(cid, sig, course)
+        for cid in [k for k in self.docs if k not in live]:
+            self._remove(cid)
+        if self._dirty:
+            self._sorted = sorted(self.postings)
+            self._dirty = False
+        self.generation = gen
+
+    def _match(self, tok: str) -> dict:
+        """Puntaje por curso para un token de la consulta: coincidencia exacta
+        con su peso completo, por prefijo con la mitad."""
+        from bisect import bisect_left
+
+        out = dict(self.postings.get(tok) or {})
+        i = bisect_left(self._sorted, tok)
+        while i < len(self._sorted) and self._sorted[i].startswith(tok):
+            cand = self._sorted[i]
+            i += 1
+            if cand == tok:
+                continue
+            for cid, w in self.postings[cand].items():
+                out[cid] = max(out.get(cid, 0.0), w * 0.5)
+        return out
+
+    def search(self, index: "CourseIndex", q="", concentracion=None, term=None, aprobado=None, limit=50) -> dict:
+        t0 = time.perf_counter()
+        with self.lock:
+            self.sync(index)
+            scores = None
+            for tok in dict.fromkeys(search_tokens(q)):
+                m = self._match(tok)
+                if scores is None:
+                    scores = m
+                else:
+                    scores = {cid: s + m[cid] for cid, s in scores.items() if cid in m}
+                if not scores:
+                    break
+            if scores is None:
+                scores = {cid: 0.0 for cid in self.docs}
+            docs = {cid: self.docs[cid][1] for cid in scores}
+
+        filters = dict(
+            concentracion=fold(concentracion) if concentracion else None,
+            term=str(term) if term else None,
+            aprobado=aprobado,
+        )
+
+        def keep(c, skip=None):
+            if skip != "concentracion" and filters["concentracion"] and fold(c.get("concentracion")) != filters["concentracion"]:
+                return False
+            if skip != "term" and filters["term"] and str(c.get("term_id")) != filters["term"]:
+                return False
+            if skip != "aprobado" and filters["aprobado"] is not None and bool(c.get("aprobado")) != filters["aprobado"]:
+                return False
+            return True
+
+        # Facetas "disyuntivas": cada una cuenta con los demás filtros aplicados, no el propio.
+        facets = dict(concentracion={}, term={}, aprobado={})
+        for c in docs.values():
+            for name, key in (("concentracion", c.get("concentracion")), ("term", c.get("term_id")), ("aprobado", bool(c.get("aprobado")))):
+                if keep(c, skip=name):
+                    k = str(key).lower() if name == "aprobado" else str(key)
+                    facets[name][k] = facets[name].get(k, 0) + 1
+
+        hits = [cid for cid, c in docs.items() if keep(c)]
+        hits.sort(key=lambda cid: (-scores[cid], term_index(docs[cid].get("term_id")), str(docs[cid].get("sigla") or "")))
+        total = len(hits)
+        if limit:
+            hits = hits[:limit]
+        results = []
+        for cid in hits:
+            c = docs[cid]
+            results.append(
+                dict(
+                    course_id=cid,
+                    sigla=c.get("sigla"),
+                    nombre=c.get("nombre"),
+                    term_id=c.get("term_id"),
+                    concentracion=c.get("concentracion"),
+                    creditos=c.get("creditos"),
+                    aprobado=bool(c.get("aprobado")),
+                    score=round(scores[cid], 2),
+                )
+            )
+        elapsed = (time.perf_counter() - t0) * 1000
+        METRICS.observe("search_ms", elapsed)
+        return dict(
+            q=q,
+            total=total,
+            results=results,
+            facets=facets,
+            generation=self.generation,
+            elapsed_ms=round(elapsed, 2),
+        )
+
+
+# ---------- stats ----------
+
+GRADE_MIN, GRADE_MAX = 1.0, 7.0  # escala de notas; fuera de rango no entra al PPA
+
+
+def as_grade(x):
+    """Nota como float (acepta ``"5,3"``) o ``None`` si falta, es 0 o no es número."""
+    if x is None or isinstance(x, bool):
+        return None
+    try:
+        v = float(str(x).strip().replace(",", "."))
+    except ValueError:
+        return None
+    return v if v == v and v != 0 else None
+
+
+class _Acc:
+    __slots__ = ("courses", "credits", "approved", "approved_credits", "graded_credits", "points")
+
+    def __init__(self):
+        self.courses = self.credits = self.approved = self.approved_credits = 0
+        self.graded_credits, self.points = 0, 0.0
+
+    def add(self, credits, approved, grade):
+        self.courses += 1
+        self.credits += credits
+        if approved:
+            self.approved += 1
+            self.approved_credits += credits
+        if grade is not None and credits:
+            self.graded_credits += credits
+            self.points += grade * credits
+
+    def to_dict(self) -> dict:
+        return dict(
+            courses=self.courses,
+            credits=self.credits,
+            approved_courses=self.approved,
+            approved_credits=self.approved_credits,
+            pending_credits=self.credits - self.approved_credits,
+            graded_credits=self.graded_credits,
+            ppa=round(self.points / self.graded_credits, 3) if self.graded_credits else None,
+        )
+
+
+class StatsEngine:
+    """Agregados de notas y créditos para ``/api/stats`` (reemplaza el
+    ``dataviewjs`` que cada nota corre sobre ``dv.pages()``).
+
+    Por curso se guarda su aporte ``(créditos, aprobado, nota, concentración)``
+    junto a la firma del archivo; al cambiar la ``generation`` del índice solo
+    se vuelve a parsear el frontmatter de los cursos que cambiaron. Las notas
+    de evaluación (frontmatter con ``Curso``, ``notaObtenida`` y ``Ponderación``)
+    no cuentan como cursos: su suma ponderada es la nota del curso cuando éste
+    no trae ``notaObtenida``, igual que el bloque de Dataview.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.rows = {}  # course_id -> (sig, row)
+        self.reparsed = 0
+
+    @staticmethod
+    def row(c) -> dict:
+        fm = c.frontmatter if isinstance(c, Course) else (c.get("frontmatter") if isinstance(c.get("frontmatter"), dict) else {})
+        curso = get(fm, "Curso", "curso")
+        if curso:
+            return dict(
+                evaluation=str(curso).strip(),
+                nota=as_grade(fm.get("notaObtenida")),
+                pond=num(get(fm, "Ponderación", "ponderación", "Ponderacion", "ponderacion", default=0)),
+            )
+        return dict(
+            sigla=str(c.get("sigla") or ""),
+            stem=Path(str(c.get("course_id") or "")).stem,
+            term_id=str(c.get("term_id") or ""),
+            credits=num(c.get("creditos")),
+            approved=c.get("aprobado") is True,
+            nota=as_grade(c.get("notaObtenida", fm.get("notaObtenida"))),
+            conc=str(c.get("concentracion") or "ex"),
+        )
+
+    def sync(self, index: "CourseIndex"):
+        with index.lock:
+            gen = index.generation
+            if gen == self.generation:
+                return
+            snap = [(str(c["course_id"]), (index.entries.get(c["course_id"]) or (None,))[0], c) for c in index.courses or []]
+        rows = {}
+        for cid, sig, c in snap:
+            hit = self.rows.get(cid)
+            if hit is None or sig is None or hit[0] != sig:
+                hit = (sig, self.row(c))
+                self.reparsed += 1
+            rows[cid] = hit
+        self.rows, self.generation = rows, gen
+
+    def compute(self, index: "CourseIndex", terms: list, draft: dict) -> dict:
+        t0 = time.perf_counter()
+        with self.lock:
+            self.sync(index)
+            rows = {cid: r for cid, (_, r) in self.rows.items()}
+            gen = self.generation
+
+        # Nota final desde evaluaciones: sum(nota * ponderación), redondeada a 1 decimal.
+        evals = {}
+        for r in rows.values():
+            if "evaluation" in r and r["nota"] is not None:
+                evals[r["evaluation"]] = evals.get(r["evaluation"], 0.0) + r["nota"] * r["pond"]
+
+        # Los cursos reemplazados por un temporal (draft.overrides) cuentan como el temporal.
+        overrides = {str(x) for x in draft.get("overrides") or []}
+        ids = [cid for cid, r in rows.items() if "evaluation" not in r and cid not in overrides]
+        courses = [rows[cid] for cid in ids]
+        temps = [c for c in merge_temp_courses([], draft) if c.get("course_id") not in rows]
+        for t in temps:
+            ids.append(str(t["course_id"]))
+            courses.append(self.row(t))
+
+        placements = {str(k): str(v) for k, v in (draft.get("placements") or {}).items() if v}
+        total, by_term, by_conc = _Acc(), {}, {}
+        out_of_range, from_evals = [], 0
+        for cid, r in zip(ids, courses):
+            grade = r["nota"]
+            if grade is None:
+                nf = evals.get(r["stem"], evals.get(r["sigla"]))
+                if nf is not None:
+                    grade, from_evals = round(nf, 1), from_evals + 1
+            if grade is not None and not (GRADE_MIN <= grade <= GRADE_MAX):
+                out_of_range.append(dict(course_id=cid, sigla=r["sigla"], nota=grade))
+                grade = None
+            tid = placements.get(cid) or r["term_id"]
+            for acc in (total, by_term.setdefault(tid, _Acc()), by_conc.setdefault(r["conc"], _Acc())):
+                acc.add(r["credits"], r["approved"], grade)
+
+        order = [t["term_id"] for t in effective_terms(terms, draft)]
+        order += sorted((tid for tid in by_term if tid not in order), key=term_index)
+        running, per_term = _Acc(), []
+        for tid in order:
+            acc = by_term.get(tid)
+            if acc is None:
+                continue
+            running.courses += acc.courses
+            running.graded_credits += acc.graded_credits
+            running.points += acc.points
+            per_term.append(
+                dict(
+                    acc.to_dict(),
+                    term_id=tid,
+                    ppa_acumulado=round(running.points / running.graded_credits, 3) if running.graded_credits else None,
+                )
+            )
+
+        elapsed = (time.perf_counter() - t0) * 1000
+        METRICS.observe("stats_ms", elapsed)
+        return dict(
+            generation=gen,
+            totals=total.to_dict(),
+            by_term=per_term,
+            by_concentracion={k: by_conc[k].to_dict() for k in sorted(by_conc)},
+            grades=dict(
+                scale=[GRADE_MIN, GRADE_MAX],
+                from_evaluations=from_evals,
+                evaluations=sum(1 for r in rows.values() if "evaluation" in r),
+                out_of_range=out_of_range,
+            ),
+            elapsed_ms=round(elapsed, 2),
+        )
+
+
+# ---------- warnings ----------
+
+OFFERED_CODES = ("I", "P", "V")
+
+
+def num(x) -> float:
+    # Equivalente a ``Number(x) || 0`` en JS.
+    try:
+        if isinstance(x, bool):
+            return int(x)
+        v = float(str(x).strip()) if x is not None else 0.0
+    except Exception:
+        return 0
+    if v != v:
+        return 0
+    return int(v) if v.is_integer() else v
+
+
+def term_index(term_id) -> int:
+    # Como termIndex() de app.js: año*10+sem, o 999999 si no es AAAA-S.
+    t = re.fullmatch(r"(\d{4})-([012])", str(term_id or ""))
+    return int(t.group(1)) * 10 + int(t.group(2)) if t else 999999
+
+
+def merge_temp_courses(courses: list, draft: dict) -> list:
+    """Port de ``mergeTempCourses()`` (tempCourses.js): cursos reales sin los
+    reemplazados por ``draft.overrides`` + ``draft.temp_courses`` normalizados."""
+    overrides = {str(x).strip() for x in draft.get("overrides") or [] if str(x or "").strip()}
+    out, seen = [], set()
+    for c in courses:
+        cid = c.get("course_id")
+        if cid is None or str(cid) in overrides or str(cid) in seen:
+            continue
+        seen.add(str(cid))
+        out.append(c)
+    for c in draft.get("temp_courses") or []:
+        if not isinstance(c, dict) or c.get("course_id") is None or str(c["course_id"]) in seen:
+            continue
+        fm = c.get("frontmatter") if isinstance(c.get("frontmatter"), dict) else {}
+        offered = []
+        for x in c.get("semestreOfrecido", fm.get("semestreOfrecido")) or []:
+            v = str(x or "").strip().upper()
+            if v in OFFERED_CODES and v not in offered:
+                offered.append(v)
+        t = dict(c)
+        t.update(
+            is_temp=True,
+            course_id=str(c["course_id"]),
+            sigla=str(c.get("sigla") or fm.get("sigla") or "").strip(),
+            nombre=str(c.get("nombre") or fm.get("nombre") or "").strip(),
+            creditos=as_int(get(c, "creditos", "créditos", default=get(fm, "creditos", "créditos", default=0)), 0),
+            aprobado=bool(c.get("aprobado", fm.get("aprobado"))),
+            prerrequisitos=[
+                str(x).strip()
+                for x in c.get("prerrequisitos", fm.get("prerrequisitos")) or []
+                if str(x or "").strip() and str(x).strip().lower() != "nt"
+            ],
+            semestreOfrecido=offered,
+        )
+        seen.add(t["course_id"])
+        out.append(t)
+    return out
+
+
+def effective_terms(terms: list, draft: dict) -> list:
+    """Port de ``buildEffectiveTermsAndPlacements()`` (app.js): términos del
+    catálogo + ``custom_terms`` + los usados en ``placements``, en orden."""
+    by_id = {t["term_id"]: dict(t) for t in terms}
+
+    def ensure(tid):
+        if not tid or tid in by_id:
+            return
+        m = TERM_RE.match(tid)
+        y, sm = (int(m.group("y")), int(m.group("s"))) if m else (0, 0)
+        by_id[tid] = dict(term_id=tid, year=y, sem=sm, code=TERM_CODE.get(sm, "?"), isCustom=True)
+
+    for ct in draft.get("custom_terms") or []:
+        if isinstance(ct, dict):
+            ensure(str(ct.get("term_id") or "").strip())
+    for tid in (draft.get("placements") or {}).values():
+        ensure(str(tid or "").strip())
+
+    out = list(by_id.values())
+    order = {str(x): i for i, x in enumerate(draft.get("term_order") or [])}
+    if order:
+        out.sort(key=lambda t: (term_index(t["term_id"]), order.get(t["term_id"], 999999), str(t["term_id"])))
+    else:
+        out.sort(key=lambda t: term_index(t["term_id"]))
+    return out
+
+
+class WarningEngine:
+    """Motor de warnings equivalente a ``computeWarnings()`` de warnings.js
+    (incluido el adaptador de app.js que separa correquisitos ``(c)``).
+
+    Mantiene los créditos por término y el resultado de cada chequeo por curso;
+    ``move()`` recalcula solo los términos tocados, el curso movido y los que
+    lo referencian, y devuelve el diff de warnings.
+    """
+
+    def __init__(self, courses: list, terms: list, draft: dict, max_credits=MAX_CREDITS, soft_credits=SOFT_CREDITS):
+        self.draft = draft
+        self.catalog_terms = terms
+        self.max_c, self.soft_c = max_credits, soft_credits
+        self.ignored = draft.get("ignored_warnings") or {}
+        self.courses, self.by_sigla, self.refs = {}, {}, {}
+        for c in merge_temp_courses(courses, draft):
+            cid = str(c["course_id"])
+            pre, co = split_reqs(c.get("prerrequisitos"), ignore_case=False)
+            sigla = str(c.get("sigla")) if c.get("sigla") is not None else ""
+            self.courses[cid] = dict(
+                course_id=cid,
+                sigla=sigla,
+                term_id=c.get("term_id"),
+                creditos=num(c.get("creditos", c.get("créditos", 0))),
+                aprobado=c.get("aprobado") is True,
+                offered=[str(x) for x in c.get("semestreOfrecido") or [] if x],
+                pre=pre,
+                co=co,
+            )
+            if c.get("sigla") is not None:
+                self.by_sigla[sigla] = cid
+            for code in pre + co:
+                self.refs.setdefault(code, set()).add(cid)
+        self.placement = {cid: c["term_id"] for cid, c in self.courses.items()}
+        for cid, tid in (draft.get("placements") or {}).items():
+            if str(tid or "").strip():
+                self.placement[str(cid)] = str(tid).strip()
+        self.recompute_all()
+
+    # -- estado --
+
+    def _build_terms(self):
+        d = dict(self.draft, placements={k: v for k, v in self.placement.items() if v})
+        self.terms = effective_terms(self.catalog_terms, d)
+        self.t_index = {t["term_id"]: i for i, t in enumerate(self.terms)}
+
+    def recompute_all(self):
+        self._build_terms()
+        self.credits = {}
+        for cid, c in self.courses.items():
+            tid = self.placement.get(cid)
+            if tid:
+                self.credits[tid] = self.credits.get(tid, 0) + c["creditos"]
+        self.term_w = {tid: self._term_check(tid) for tid in self.credits}
+        self.course_w = {cid: self._course_checks(cid) for cid in self.courses}
+
+    def _idx(self, tid) -> float:
+        return self.t_index.get(str(tid), float("inf")) if tid is not None else float("inf")
+
+    def _warn(self, kind, **w) -> dict:
+        return dict(w, kind=kind, ignored=bool(self.ignored.get(w["id"])))
+
+    # -- chequeos --
+
+    def _term_check(self, tid):
+        total = self.credits.get(tid, 0)
+        if total > self.max_c:
+            return [
+                self._warn(
+                    "hard",
+                    id=f"credits:hard:{tid}",
+                    scope="term",
+                    term_id=tid,
+                    text=f"Sobrecarga: {total} créditos (máx {self.max_c})",
+                    credits=total,
+                )
+            ]
+        if total > self.soft_c:
+            return [
+                self._warn(
+                    "soft",
+                    id=f"credits:soft:{tid}",
+                    scope="term",
+                    term_id=tid,
+                    text=f"Carga alta: {total} créditos (sobre {self.soft_c})",
+                    credits=total,
+                )
+            ]
+        return []
+
+    def _course_checks(self, cid):
+        c = self.courses[cid]
+        if c["aprobado"]:
+            return []
+        out = []
+        sigla, tid = c["sigla"], self.placement.get(cid)
+        c_idx = self._idx(tid)
+        label = sigla or "Curso"
+
+        if c["offered"] and tid and tid in self.t_index:
+            code = self.terms[self.t_index[tid]].get("code")
+            if code is not None and str(code) and str(code) not in c["offered"]:
+                out.append(
+                    self._warn(
+                        "soft",
+                        id=f"offered:{cid}:{tid}",
+                        scope="course",
+                        course_id=cid,
+                        sigla=sigla,
+                        term_id=tid,
+                        text=f"{label} no se ofrece en este período ({code}).",
+                    )
+                )
+
+        for p in c["pre"]:
+            pid = self.by_sigla.get(p)
+            if pid is None:
+                out.append(
+                    self._warn(
+                        "soft",
+                        id=f"prereq:unknown:{cid}:{p}",
+                        scope="course",
+                        course_id=cid,
+                        sigla=sigla,
+                        term_id=tid,
+                        prereq=p,
+                        text=f"{label} tiene prerrequisito desconocido: {p}.",
+                    )
+                )
+                continue
+            pc = self.courses[pid]
+            if pc["aprobado"]:
+                continue
+            p_idx = self._idx(self.placement.get(pid))
+            if p_idx == c_idx and p_idx != float("inf") and sigla and sigla in pc["pre"]:
+                continue  # correquisito mutuo en el mismo período
+            if p_idx >= c_idx:
+                out.append(
+                    self._warn(
+                        "hard",
+                        id=f"prereq:missing:{cid}:{p}:{tid or ''}",
+                        scope="course",
+                        course_id=cid,
+                        sigla=sigla,
+                        term_id=tid,
+                        prereq=p,
+                        text=f"{label} requiere {p} antes.",
+                    )
+                )
+
+        for q in c["co"]:
+            qid = self.by_sigla.get(q)
+            if qid is None:
+                out.append(
+                    self._warn(
+                        "soft",
+                        id=f"coreq:unknown:{cid}:{q}",
+                        scope="course",
+                        course_id=cid,
+                        sigla=sigla,
+                        term_id=tid,
+                        coreq=q,
+                        text=f"{label} tiene correquisito desconocido: {q}.",
+                    )
+                )
+                continue
+            if self.courses[qid]["aprobado"]:
+                continue
+            qtid = self.placement.get(qid)
+            if tid is not None and qtid is not None and str(tid) == str(qtid):
+                continue
+            out.append(
+                self._warn(
+                    "hard",
+                    id=f"coreq:missing:{cid}:{q}:{tid or ''}",
+                    scope="course",
+                    course_id=cid,
+                    sigla=sigla,
+                    term_id=tid,
+                    coreq=q,
+                    text=f"{label} requiere correquisito {q} en el mismo semestre.",
+                )
+            )
+        return out
+
+    # -- API --
+
+    def _snapshot(self, cids, tids) -> dict:
+        out = {}
+        for cid in cids:
+            for w in self.course_w.get(cid, []):
+                out[w["id"]] = w
+        for tid in tids:
+            for w in self.term_w.get(tid, []):
+                out[w["id"]] = w
+        return out
+
+    def move(self, changes: dict) -> dict:
+        """Aplica ``{course_id: term_id}`` y devuelve el diff de warnings.
+
+        ``term_id`` vacío o ``None`` devuelve el curso a su período en disco.
+        """
+        dirty_c, dirty_t, full = set(), set(), False
+        for cid, tid in changes.items():
+            cid, tid = str(cid), (str(tid).strip() or None) if tid is not None else None
+            if tid is None and cid in self.courses:
+                # Sin ubicación = vuelve al período en disco, como en el borrador.
+                tid = self.courses[cid]["term_id"]
+            old = self.placement.get(cid)
+            if old == tid:
+                continue
+            if tid is None:
+                self.placement.pop(cid, None)
+            else:
+                self.placement[cid] = tid
+                full = full or tid not in self.t_index
+            c = self.courses.get(cid)
+            if c is None:
+                continue
+            for t, sign in ((old, -1), (tid, 1)):
+                if t:
+                    self.credits[t] = self.credits.get(t, 0) + sign * c["creditos"]
+                    dirty_t.add(t)
+            dirty_c.add(cid)
+            dirty_c |= self.refs.get(c["sigla"], set())
+
+        if full:
+            before = self._snapshot(self.courses, self.term_w)
+            self.recompute_all()
+            after = self._snapshot(self.courses, self.term_w)
+        else:
+            before = self._snapshot(dirty_c, dirty_t)
+            for t in dirty_t:
+                self.term_w[t] = self._term_check(t)
+            for cid in dirty_c:
+                if cid in self.courses:
+                    self.course_w[cid] = self._course_checks(cid)
+            after = self._snapshot(dirty_c, dirty_t)
+
+        return dict(
+            added=[w for k, w in after.items() if k not in before],
+            removed=[k for k in before if k not in after],
+            changed=[w for k, w in after.items() if k in before and before[k] != w],
+            recomputed=dict(full=full, courses=len(self.courses) if full else len(dirty_c), terms=len(dirty_t)),
+        )
+
+    def warnings(self) -> list:
+        ws = [w for lst in self.term_w.values() for w in lst] + [w for lst in self.course_w.values() for w in lst]
+        ws.sort(
+            key=lambda w: (
+                1 if w["ignored"] else 0,
+                0 if w["kind"] == "hard" else 1,
+                self._idx(w.get("term_id")),
+                str(w.get("text") or "").casefold(),
+            )
+        )
+        return ws
+
+    def counts(self) -> dict:
+        ws = [w for lst in self.term_w.values() for w in lst] + [w for lst in self.course_w.values() for w in lst]
+        return dict(
+            hard=sum(1 for w in ws if w["kind"] == "hard" and not w["ignored"]),
+            soft=sum(1 for w in ws if w["kind"] == "soft" and not w["ignored"]),
+            ignored=sum(1 for w in ws if w["ignored"]),
+            total=len(ws),
+        )
+
+
+def compute_warnings(courses: list, terms: list, draft: dict, max_credits=MAX_CREDITS, soft_credits=SOFT_CREDITS) -> list:
+    return WarningEngine(courses, terms, draft, max_credits, soft_credits).warnings()
+
+
+# ---------- planner ----------
+
+def next_term_id(term_id: str, summer=False) -> str:
+    m = re.fullmatch(r"(\d{4})-([012])", term_id)
+    y, sm = (int(m.group(1)), int(m.group(2))) if m else (date.today().year, 0)
+    if summer:
+        return f"{y}-{sm + 1}" if sm < 2 else f"{y + 1}-0"
+    return f"{y}-{sm + 1}" if sm < 2 else f"{y + 1}-1"
+
+
+def plan_semesters(
+    courses: list,
+    terms: list,
+    draft: dict,
+    start=None,
+    cap="max",
+    summer=False,
+    keep_draft=True,
+    exact=True,
+    exact_max=12,
+    time_budget=2.0,
+    max_terms=None,
+    max_credits=MAX_CREDITS,
+    soft_credits=SOFT_CREDITS,
+) -> dict:
+    """Ubica los cursos no aprobados en la menor cantidad de períodos posible.
+
+    - Fijos: aprobados (donde estén) y, con ``keep_draft``, los que ya tienen
+      ubicación en ``draft.placements``. El resto se planifica desde ``start``.
+    - Restricciones: prerrequisitos en un período anterior, correquisitos
+      ``(c)`` en el mismo período (se agrupan), ``semestreOfrecido`` y el tope
+      de créditos (``cap``: ``"max"`` o ``"soft"``); un curso que por sí solo
+      supera el tope va solo.
+    - List scheduling con prioridad por largo del camino crítico; si quedan
+      pocos grupos (``exact_max``) se busca el óptimo por branch & bound hasta
+      agotar ``time_budget`` segundos.
+
+    El resultado se evalúa con ``WarningEngine`` para reportar lo que quede.
+    """
+    t0 = time.perf_counter()
+    limit = soft_credits if cap == "soft" else max_credits
+    merged = merge_temp_courses(courses, draft)
+    placements = draft.get("placements") or {}
+
+    info, by_sigla = {}, {}
+    for c in merged:
+        cid = str(c["course_id"])
+        pre, co = split_reqs(c.get("prerrequisitos"), ignore_case=False)
+        tid = str(placements.get(cid) or c.get("term_id") or "").strip() or None
+        info[cid] = dict(
+            sigla=str(c.get("sigla") or ""),
+            cr=num(c.get("creditos", 0)),
+            done=c.get("aprobado") is True,
+            offered=[str(x) for x in c.get("semestreOfrecido") or [] if x],
+            pre=pre,
+            co=co,
+            term=tid,
+        )
+        if c.get("sigla") is not None:
+            by_sigla[str(c.get("sigla"))] = cid
+
+    fixed = {
+        cid: i["term"]
+        for cid, i in info.items()
+        if i["term"] and (i["done"] or (keep_draft and cid in placements))
+    }
+    free = [cid for cid, i in info.items() if not i["done"] and cid not in fixed]
+
+    if not start:
+        done_terms = [i["term"] for i in info.values() if i["done"] and i["term"]]
+        last = max(done_terms, key=term_index) if done_terms else None
+        if last:
+            start = next_term_id(last, summer)
+        elif terms:
+            start = min((t["term_id"] for t in terms), key=term_index)
+        else:
+            start = f"{date.today().year}-1"
+    seq = [start]
+    while len(seq) < (max_terms or 3 * len(free) + 6):
+        seq.append(next_term_id(seq[-1], summer))
+    pos = {tid: k for k, tid in enumerate(seq)}
+    seq_idx = [term_index(tid) for tid in seq]
+    from bisect import bisect_right
+
+    def last_pos(tid):
+        # Última posición de ``seq`` que no va después de ``tid`` (-1 si ninguna).
+        # Un período fijo fuera de ``seq`` (verano sin ``summer``, o más allá
+        # del horizonte) se compara igual por orden cronológico.
+        return bisect_right(seq_idx, term_index(tid)) - 1
+
+    # Grupos de correquisitos (union-find sobre los cursos libres).
+    parent = {cid: cid for cid in free}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for cid in free:
+        for q in info[cid]["co"]:
+            qid = by_sigla.get(q)
+            if qid in parent:
+                parent[find(cid)] = find(qid)
+    members = {}
+    for cid in free:
+        members.setdefault(find(cid), []).append(cid)
+    groups = list(members.values())
+    g_of = {cid: k for k, ms in enumerate(groups) for cid in ms}
+    g_cr = [sum(info[c]["cr"] for c in ms) for ms in groups]
+
+    # Dependencias entre grupos y condiciones externas (cursos fijos).
+    g_pre = [set() for _ in groups]
+    g_after = [-1] * len(groups)  # posición mínima - 1 impuesta por prerrequisitos fijos
+    g_at = [None] * len(groups)  # período exigido por un correquisito fijo
+    for k, ms in enumerate(groups):
+        for cid in ms:
+            for p in info[cid]["pre"]:
+                pid = by_sigla.get(p)
+                if pid is None or info[pid]["done"]:
+                    continue
+                if pid in g_of:
+                    if g_of[pid] != k:
+                        g_pre[k].add(g_of[pid])
+                elif pid in fixed:
+                    g_after[k] = max(g_after[k], last_pos(fixed[pid]))
+            for q in info[cid]["co"]:
+                qid = by_sigla.get(q)
+                if qid in fixed and not info[qid]["done"]:
+                    # Si el período del correquisito no está en ``seq`` el grupo queda sin ubicar.
+                    g_at[k] = pos.get(fixed[qid], -1)
+    g_offered = []
+    for ms in groups:
+        ok = set(OFFERED_CODES) | {"?"}
+        for cid in ms:
+            if info[cid]["offered"]:
+                ok &= set(info[cid]["offered"])
+        g_offered.append(ok)
+    codes = [TERM_CODE.get(int(t[-1]), "?") for t in seq]
+
+    # Prioridad: largo del camino crítico (en períodos) hacia los dependientes.
+    g_next = [set() for _ in groups]
+    for k, pres in enumerate(g_pre):
+        for j in pres:
+            g_next[j].add(k)
+    comp, sccs = tarjan(len(groups), [list(x) for x in g_next])
+    height = [1] * len(groups)
+    for members_k in sccs:  # sumideros primero
+        for k in members_k:
+            height[k] = 1 + max((height[j] for j in g_next[k] if comp[j] != comp[k]), default=0)
+    cyclic = {k for ms in sccs if len(ms) > 1 for k in ms}
+
+    base_load = {}
+    for cid, tid in fixed.items():
+        if not info[cid]["done"]:
+            base_load[tid] = base_load.get(tid, 0) + info[cid]["cr"]
+
+    def allowed(k, t):
+        if g_at[k] is not None and g_at[k] != t:
+            return False
+        return t > g_after[k] and codes[t] in g_offered[k]
+
+    def prio(k):
+        return (-height[k], -g_cr[k], min(info[c]["sigla"] for c in groups[k]))
+
+    # --- list scheduling ---
+    g_pos = [None] * len(groups)
+    for t in range(len(seq)):
+        if all(x is not None or k in cyclic for k, x in enumerate(g_pos)):
+            break
+        load = base_load.get(seq[t], 0)
+        ready = [
+            k
+            for k in range(len(groups))
+            if g_pos[k] is None
+            and k not in cyclic
+            and allowed(k, t)
+            and all(g_pos[j] is not None and g_pos[j] < t for j in g_pre[k])
+        ]
+        for k in sorted(ready, key=prio):
+            if load + g_cr[k] <= limit or (load == 0 and g_cr[k] > limit):
+                g_pos[k] = t
+                load += g_cr[k]
+    method = "list"
+
+    # --- búsqueda exacta (instancias chicas) ---
+    schedulable = [k for k in range(len(groups)) if k not in cyclic]
+    if exact and 0 < len(schedulable) <= exact_max and all(g_pos[k] is not None for k in schedulable):
+        deadline = t0 + time_budget
+        best = [max(g_pos[k] for k in schedulable), list(g_pos)]
+        timed_out = [False]
+
+        def lower_bound(t, left):
+            if not left:
+                return t - 1
+            by_height = max(height[k] for k in left)
+            by_credits = -(-sum(g_cr[k] for k in left) // max(limit, 1))
+            return t - 1 + max(by_height, by_credits)
+
+        def dfs(t, cur, left):
+            if time.perf_counter() > deadline:
+                timed_out[0] = True
+                return
+            if not left:
+                last = max((cur[k] for k in schedulable), default=-1)
+                if last < best[0]:
+                    best[0], best[1] = last, list(cur)
+                return
+            if t >= len(seq) or lower_bound(t, left) >= best[0]:
+                return
+            ready = sorted(
+                (k for k in left if allowed(k, t) and all(cur[j] is not None and cur[j] < t for j in g_pre[k])),
+                key=prio,
+            )
+            base = base_load.get(seq[t], 0)
+            subsets = []
+
+            def extend(i, chosen, load):
+                # Solo conjuntos maximales: dominan a los no maximales.
+                if i == len(ready):
+                    if not any(
+                        k not in chosen and (load + g_cr[k] <= limit or (load == 0 and g_cr[k] > limit))
+                        for k in ready
+                    ):
+                        subsets.append(list(chosen))
+                    return
+                k = ready[i]
+                if load + g_cr[k] <= limit or (load == 0 and g_cr[k] > limit):
+                    chosen.append(k)
+                    extend(i + 1, chosen, load + g_cr[k])
+                    chosen.pop()
+                extend(i + 1, chosen, load)
+
+            extend(0, [], base)
+            for sub in subsets:
+                for k in sub:
+                    cur[k] = t
+                dfs(t + 1, cur, left - set(sub))
+                for k in sub:
+                    cur[k] = None
+                if timed_out[0]:
+                    return
+
+        if lower_bound(0, set(schedulable)) < best[0]:
+            dfs(0, [None] * len(groups), set(schedulable))
+        g_pos = best[1]
+        method = "exact" if not timed_out[0] else "exact-partial"
+
+    result = {}
+    unplaced = []
+    for k, ms in enumerate(groups):
+        for cid in ms:
+            if g_pos[k] is None:
+                unplaced.append(cid)
+            else:
+                result[cid] = seq[g_pos[k]]
+
+    plan_draft = dict(draft, placements=dict(placements if keep_draft else {}, **result))
+    eng = WarningEngine(courses, terms, sanitize_draft(dict(plan_draft)), max_credits, soft_credits)
+    used = sorted(set(result.values()), key=term_index)
+    return dict(
+        placements=result,
+        start=start,
+        terms=used,
+        n_terms=(max(pos[t] for t in used) + 1) if used else 0,
+        last_term=used[-1] if used else None,
+        unplaced=unplaced,
+        cycles=[[c for k in ms for c in groups[k]] for ms in sccs if len(ms) > 1],
+        method=method,
+        groups=len(groups),
+        warnings=eng.counts(),
+        elapsed_ms=round((time.perf_counter() - t0) * 1000, 2),
+    )
+
+
+def apply_plan(draft: dict, plan: dict, catalog_terms: list) -> dict:
+    """Escribe un plan como ``placements`` del borrador (y crea los períodos que falten)."""
+    d = sanitize_draft(draft)
+    d["placements"].update(plan["placements"])
+    known = {t["term_id"] for t in catalog_terms} | {
+        str(t.get("term_id")) for t in d["custom_terms"] if isinstance(t, dict)
+    }
+    for tid in plan["terms"]:
+        if tid not in known:
+            d["custom_terms"].append({"term_id": tid})
+            known.add(tid)
+        if d["term_order"] and tid not in d["term_order"]:
+            d["term_order"].append(tid)
+    return d
+
+
+def synthetic_catalogue(n: int, seed=0, n_terms=10):
+    """Catálogo sintético (``terms``, ``courses``) con la forma de ``discover_all()``.
+
+    Prerrequisitos solo hacia cursos anteriores (DAG), algunos correquisitos,
+    créditos y ``semestreOfrecido`` variados, ~20% aprobados al principio.
+    """
+    import random
+
+    rnd = random.Random(seed)
+    terms = []
+    tid = "2020-1"
+    for _ in range(n_terms):
+        y, sm = tid.split("-")
+        terms.append(dict(term_id=tid, year=int(y), sem=int(sm), code=TERM_CODE[int(sm)]))
+        tid = next_term_id(tid)
+    courses = []
+    for i in range(n):
+        sigla = f"SYN{i:04d}"
+        pre = [f"SYN{rnd.randrange(i):04d}" for _ in range(rnd.choice((0, 1, 1, 2, 2, 3)))] if i else []
+        if i > 1 and rnd.random() < 0.03:
+            pre.append(f"SYN{i - 1:04d}(c)")
+        term = terms[min(len(terms) - 1, i * len(terms) // max(n, 1))]["term_id"]
+        courses.append(
+            dict(
+                course_id=f"{term}/,Cursos/{sigla}.md",
+                fileRel=f"{term}/,Cursos/{sigla}.md",
+                term_id=term,
+                sigla=sigla,
+                nombre=f"Curso sintético {i}",
+                creditos=rnd.choice((5, 10, 10, 10, 15, 20)),
+                aprobado=i < n // 5,
+                concentracion=rnd.choice(("MScB", "M", "m", "FI", "OFG", "ex")),
+                prerrequisitos=sorted(set(pre)),
+                semestreOfrecido=rnd.choice((["I", "P"], ["I"], ["P"], [], ["I", "P", "V"])),
+                frontmatter={},
+            )
+        )
+    return terms, courses
+
+
+def bench_planner(sizes=(500, 1000, 2000), seed=0) -> list:
+    out = []
+    for n in sizes:
+        terms, courses = synthetic_catalogue(n, seed)
+        plan = plan_semesters(courses, terms, draft_default())
+        out.append(
+            dict(
+                courses=n,
+                groups=plan["groups"],
+                n_terms=plan["n_terms"],
+                unplaced=len(plan["unplaced"]),
+                method=plan["method"],
+                hard_warnings=plan["warnings"]["hard"],
+                elapsed_ms=plan["elapsed_ms"],
+            )
+        )
+    return out
+
+
+# ---------- scenarios ----------
+
+# Configurable desde la CLI (--scenario-procs). 0 = evaluar en el proceso principal.
+SCENARIOS = dict(procs=min(4, os.cpu_count() or 1))
+SCENARIO_PARALLEL_MIN = 4  # con menos escenarios no vale la pena levantar procesos
+SCENARIO_MAX = 256
+SCENARIO_CURRENT = "(actual)"
+
+
+def _slim_course(c) -> dict:
+    # Lo único que mira WarningEngine; así el catálogo viaja liviano a los procesos.
+    return dict(
+        course_id=c.get("course_id"),
+        sigla=c.get("sigla"),
+        term_id=c.get("term_id"),
+        creditos=c.get("creditos", c.get("créditos", 0)),
+        aprobado=c.get("aprobado"),
+        semestreOfrecido=list(c.get("semestreOfrecido") or []),
+        prerrequisitos=list(c.get("prerrequisitos") or []),
+    )
+
+
+def evaluate_scenario(
+    courses: list, terms: list, draft: dict, max_credits=MAX_CREDITS, soft_credits=SOFT_CREDITS
+) -> dict:
+    """Evalúa un juego de ``placements`` (ya aplicado en ``draft``).
+
+    Devuelve los conteos de warnings (tope de créditos, ``semestreOfrecido`` y
+    orden de prerrequisitos), el período de egreso (el último con cursos
+    pendientes) y la carga de créditos de los períodos con carga desde el
+    primer pendiente: ``mean``, ``variance`` (poblacional) y ``max``.
+    """
+    eng = WarningEngine(courses, terms, draft, max_credits, soft_credits)
+    placed = [eng.placement.get(cid) for cid, c in eng.courses.items() if not c["aprobado"]]
+    pending = [tid for tid in placed if tid]
+    hard = [w for w in eng.warnings() if w["kind"] == "hard" and not w["ignored"]]
+    out = dict(
+        counts=eng.counts(),
+        hard=[dict(id=w["id"], text=w.get("text")) for w in hard[:5]],
+        graduation=None,
+        n_terms=0,
+        load=dict(by_term={}, mean=0, variance=0, max=0),
+        unplaced=len(placed) - len(pending),
+    )
+    if not pending:
+        return out
+    first = min(eng._idx(tid) for tid in pending)
+    last = max(eng._idx(tid) for tid in pending)
+    if last == float("inf"):
+        out["graduation"] = max(pending, key=term_index)
+        return out
+    by_term = {}
+    for t in eng.terms[first : last + 1]:
+        cr = eng.credits.get(t["term_id"], 0)
+        if cr:
+            by_term[t["term_id"]] = cr
+    loads = list(by_term.values())
+    mean = sum(loads) / len(loads) if loads else 0
+    out.update(
+        graduation=eng.terms[last]["term_id"],
+        n_terms=len(loads),
+        load=dict(
+            by_term=by_term,
+            mean=round(mean, 2),
+            variance=round(sum((x - mean) ** 2 for x in loads) / len(loads), 2) if loads else 0,
+            max=max(loads, default=0),
+        ),
+    )
+    return out
+
+
+def _evaluate_chunk(courses: list, terms: list, draft: dict, chunk: list, max_credits, soft_credits) -> list:
+    # Tarea de un proceso del pool: varios escenarios sobre el mismo catálogo.
+    return [
+        dict(evaluate_scenario(courses, terms, dict(draft, placements=pl), max_credits, soft_credits), name=name)
+        for name, pl in chunk
+    ]
+
+
+def scenario_rank_key(r: dict):
+    # Menos warnings hard, egreso más temprano, menos soft, carga más pareja.
+    return (
+        r["counts"]["hard"],
+        term_index(r["graduation"]) if r["graduation"] else 0,
+        r["counts"]["soft"],
+        r["load"]["variance"],
+        r["load"]["max"],
+        r["name"],
+    )
+
+
+def evaluate_scenarios(
+    courses: list,
+    terms: list,
+    draft: dict,
+    scenarios: dict,
+    procs=None,
+    max_credits=MAX_CREDITS,
+    soft_credits=SOFT_CREDITS,
+) -> dict:
+    """Evalúa y ordena varios escenarios ``{nombre: placements}``.
+
+    Los ``placements`` de cada escenario se aplican sobre los del borrador; el
+    resto del borrador (períodos propios, cursos temporales, warnings
+    ignorados) es común. Con ``procs > 1`` y suficientes escenarios se reparten
+    en un pool de procesos; si el pool no se puede usar se evalúan aquí.
+    """
+    t0 = time.perf_counter()
+    procs = SCENARIOS["procs"] if procs is None else procs
+    base = draft.get("placements") or {}
+    items = [(name, dict(base, **pl)) for name, pl in scenarios.items()]
+    slim = [_slim_course(c) for c in courses]
+    d = {k: v for k, v in draft.items() if k != "scenarios"}
+    results, used = None, 0
+    if procs > 1 and len(items) >= SCENARIO_PARALLEL_MIN:
+        pool = None
+        try:
+            used = min(procs, len(items))
+            pool = process_pool("scenarios", used)
+            chunks = [items[i::used] for i in range(used)]
+            futs = [pool.submit(_evaluate_chunk, slim, terms, d, ch, max_credits, soft_credits) for ch in chunks]
+            results = [r for f in futs for r in f.result()]
+        except Exception:
+            if pool is not None:
+                discard_pool("scenarios", pool)
+            results, used = None, 0
+    if results is None:
+        results = _evaluate_chunk(slim, terms, d, items, max_credits, soft_credits)
+    results.sort(key=scenario_rank_key)
+    for i, r in enumerate(results, 1):
+        r["rank"] = i
+    return dict(
+        scenarios=results,
+        best=results[0]["name"] if results else None,
+        procs=used,
+        elapsed_ms=round((time.perf_counter() - t0) * 1000, 2),
+    )
+
+
+def scenario_placements(value) -> dict:
+    """Normaliza ``{course_id: term_id}`` o ``{"placements": {...}}``."""
+    if isinstance(value, dict) and isinstance(value.get("placements"), dict):
+        value = value["placements"]
+    if not isinstance(value, dict):
+        raise ValueError("placements debe ser un objeto {course_id: term_id}")
+    return {str(k): str(v).strip() for k, v in value.items() if str(v or "").strip()}
+
+
+def parse_scenarios(value) -> dict:
+    """``{nombre: placements}`` o ``[{name, placements}]`` -> ``{nombre: placements}``."""
+    if isinstance(value, list):
+        out = {}
+        for i, s in enumerate(value):
+            if not isinstance(s, dict):
+                raise ValueError(f"escenario {i} inválido")
+            out[str(s.get("name") or f"#{i + 1}")] = scenario_placements(s)
+        return out
+    if isinstance(value, dict):
+        return {str(k): scenario_placements(v) for k, v in value.items()}
+    raise ValueError("scenarios debe ser un objeto o una lista")
+
+
+# ---------- draft ----------
+
+def draft_default():
+    # Draft schema (persisted in malla_draft.json)
+    # - term_order: ordering of terms in UI
+    # - placements: course_id -> term_id overrides
+    # - custom_terms: user-created terms
+    # - ignored_warnings: persisted ignore flags by warning id
+    # - temp_courses: courses that exist only in draft (UI-created)
+    # - scenarios: named what-if placement sets, name -> {placements, note?}
+    return {
+        "term_order": [],
+        "placements": {},
+        "custom_terms": [],
+        "ignored_warnings": {},
+        "temp_courses": [],
+        "scenarios": {},
+    }
+
+
+# Clave del snapshot con la última rev del journal que ya incluye (no es parte del borrador).
+SNAPSHOT_REV = "_rev"
+
+
+def draft_path(b: Path) -> Path:
+    return b / DRAFT_FILE
+
+
+def sanitize_draft(d: dict) -> dict:
+    base = draft_default()
+    if not isinstance(d, dict):
+        return base
+    d.pop(SNAPSHOT_REV, None)
+    for k, v in base.items():
+        d.setdefault(k, v)
+    if not isinstance(d["term_order"], list):
+        d["term_order"] = []
+    if not isinstance(d["placements"], dict):
+        d["placements"] = {}
+    if not isinstance(d["custom_terms"], list):
+        d["custom_terms"] = []
+    if not isinstance(d["ignored_warnings"], dict):
+        d["ignored_warnings"] = {}
+    if not isinstance(d.get("temp_courses"), list):
+        d["temp_courses"] = []
+    else:
+        # Keep only dict-like entries to avoid crashes in the UI.
+        d["temp_courses"] = [x for x in d["temp_courses"] if isinstance(x, dict)]
+    if not isinstance(d.get("scenarios"), dict):
+        d["scenarios"] = {}
+    else:
+        # Solo escenarios con forma {placements: {...}, note?}.
+        d["scenarios"] = {
+            str(k): x for k, x in d["scenarios"].items() if isinstance(x, dict) and isinstance(x.get("placements"), dict)
+        }
+    return d
+
+
+def load_draft(b: Path) -> dict:
+    return load_draft_rev(b)[0]
+
+
+def load_draft_rev(b: Path) -> tuple:
+    """(borrador, rev guardada en el snapshot por ``DraftStore``; 0 si no tiene)."""
+    p = draft_path(b)
+    if not p.exists():
+        return draft_default(), 0
+    try:
+        d = json.loads(p.read_text(encoding="utf-8"))
+        rev = as_int(d.pop(SNAPSHOT_REV, 0), 0) if isinstance(d, dict) else 0
+        return sanitize_draft(d), rev
+    except Exception:
+        return draft_default(), 0
+
+
+def atomic_write(p: Path, data: bytes):
+    # temp + fsync + rename: un corte a mitad de escritura deja el archivo anterior intacto.
+    tmp = p.with_name(p.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, p)
+    if os.name == "posix":
+        try:
+            fd = os.open(p.parent, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def save_draft(b: Path, d: dict):
+    atomic_write(draft_path(b), jdump(sanitize_draft(d), indent=2).encode("utf-8"))
+
+
+def _pointer(path: str) -> list:
+    # JSON Pointer (RFC 6901): "/placements/2024-1~1,Cursos~1X.md" -> ["placements", "2024-1/,Cursos/X.md"]
+    if path == "":
+        return []
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise ValueError(f"path inválido: {path!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in path[1:].split("/")]
+
+
+def _walk(doc, tokens: list):
+    for t in tokens:
+        if isinstance(doc, dict) and t in doc:
+            doc = doc[t]
+        elif isinstance(doc, list) and t.isdigit() and int(t) < len(doc):
+            doc = doc[int(t)]
+        else:
+            raise ValueError(f"no existe: /{'/'.join(tokens)}")
+    return doc
+
+
+def apply_patch(doc, ops: list):
+    """Aplica operaciones estilo JSON Patch (add, remove, replace, move, copy, test).
+
+    Todo o nada: trabaja sobre una copia y devuelve el documento nuevo.
+    """
+    if not isinstance(ops, list):
+        raise ValueError("ops debe ser una lista")
+    doc = json.loads(json.dumps(doc))
+    for op in ops:
+        if not isinstance(op, dict) or op.get("op") not in ("add", "remove", "replace", "move", "copy", "test"):
+            raise ValueError(f"operación inválida: {op!r}")
+        kind = op["op"]
+        tokens = _pointer(op.get("path"))
+        if kind == "test":
+            if _walk(doc, tokens) != op.get("value"):
+                raise ValueError(f"test falló en {op.get('path')}")
+            continue
+        if kind in ("move", "copy"):
+            src = _pointer(op.get("from"))
+            value = json.loads(json.dumps(_walk(doc, src)))
+            if kind == "move":
+                doc = apply_patch(doc, [{"op": "remove", "path": op["from"]}])
+        elif kind != "remove":
+            if "value" not in op:
+                raise ValueError(f"falta value en {op.get('path')}")
+            value = op["value"]
+        if not tokens:
+            if kind == "remove":
+                raise ValueError("no se puede borrar la raíz")
+            doc = value
+            continue
+        parent, last = _walk(doc, tokens[:-1]), tokens[-1]
+        if isinstance(parent, dict):
+            if kind in ("remove", "replace") and last not in parent:
+                raise ValueError(f"no existe: {op.get('path')}")
+            if kind == "remove":
+                del parent[last]
+            else:
+                parent[last] = value
+        elif isinstance(parent, list):
+            if last == "-" and kind in ("add", "move", "copy"):
+                parent.append(value)
+                continue
+            if not last.isdigit() or int(last) > len(parent) or (kind != "add" and int(last) == len(parent)):
+                raise ValueError(f"índice inválido: {op.get('path')}")
+            i = int(last)
+            if kind == "remove":
+                del parent[i]
+            elif kind == "replace":
+                parent[i] = value
+            else:
+                parent.insert(i, value)
+        else:
+            raise ValueError(f"no es contenedor: {op.get('path')}")
+    return doc
+
+
+class DraftConflict(ValueError):
+    pass
+
+
+class DraftStore:
+    """Borrador en memoria con persistencia journaled.
+
+    - ``patch(ops)`` aplica deltas estilo JSON Patch y los agrega (con fsync) a
+      ``malla_draft.journal``; ``replace(d)`` registra un reemplazo completo.
+    - Las escrituras del snapshot ``malla_draft.json`` se agrupan con un timer
+      (``DEBOUNCE``, a lo más ``FLUSH_MAX`` de atraso) y se compactan de forma
+      atómica (temp + fsync + rename); luego se vacía el journal.
+    - Cada compactación rota el snapshot previo a ``malla_draft.json.1 … .N``;
+      ``undo()`` vuelve al más reciente.
+    - El snapshot guarda la rev que incluye (``_rev``); al abrir se reproducen
+      solo las entradas del journal posteriores, así un corte entre el rename y
+      el borrado del journal no aplica dos veces el mismo cambio. Una entrada
+      ilegible (p. ej. la última, truncada por un corte) se salta sin perder
+      las siguientes. Si el snapshot se edita a mano se recarga.
+    """
+
+    DEBOUNCE = 0.4
+    FLUSH_MAX = 3.0
+
+    def __init__(self, b: Path, backups=DRAFT_BACKUPS):
+        self.path = draft_path(b)
+        self.journal = b / DRAFT_JOURNAL
+        self.backups = backups
+        self._lock = threading.RLock()
+        self._timer = None
+        self._dirty_since = None
+        self.rev = 0
+        self.flushes = 0
+        self._open()
+        atexit.register(self.flush)
+
+    def _backup(self, k: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{k}")
+
+    def _open(self):
+        self.draft, snap_rev = load_draft_rev(self.path.parent)
+        self.rev = max(self.rev, snap_rev)
+        self._disk = jdump(self.draft, indent=2) if self.path.exists() else None
+        self._sig = file_sig(self.path)
+        replayed = skipped = 0
+        try:
+            with open(self.journal, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        rev = as_int(entry.get("rev"), 0)
+                        if rev and rev <= snap_rev:
+                            continue  # ya está en el snapshot
+                        self.draft = sanitize_draft(apply_patch(self.draft, entry["ops"]))
+                    except Exception:
+                        skipped += 1  # línea truncada o entrada inválida: se salta solo esa
+                        continue
+                    self.rev = max(self.rev, rev)
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        self.replayed, self.skipped = replayed, skipped
+        if replayed:
+            self._dirty_since = time.monotonic()
+            self.flush()
+        elif self.journal.exists():
+            self.journal.unlink()
+
+    def _reload_if_edited(self):
+        # Edición externa del snapshot (sin cambios pendientes): se relee.
+        if self._dirty_since is None and file_sig(self.path) != self._sig:
+            self.draft = load_draft(self.path.parent)
+            self._disk = jdump(self.draft, indent=2) if self.path.exists() else None
+            self._sig = file_sig(self.path)
+            self.rev += 1
+
+    def get(self) -> dict:
+        with self._lock:
+            self._reload_if_edited()
+            return json.loads(json.dumps(self.draft))
+
+    def _log(self, ops: list):
+        line = json.dumps({"rev": self.rev, "ops": ops}, ensure_ascii=False) + "\n"
+        with open(self.journal, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def patch(self, ops: list, rev=None) -> int:
+        with self._lock:
+            self._reload_if_edited()
+            if rev is not None and as_int(rev, -1) != self.rev:
+                raise DraftConflict(f"el borrador cambió (rev {self.rev}, se esperaba {rev})")
+            new = sanitize_draft(apply_patch(self.draft, ops))
+            self.rev += 1
+            self._log(ops)
+            self.draft = new
+            self._schedule()
+            return self.rev
+
+    def replace(self, d: dict) -> int:
+        return self.patch([{"op": "replace", "path": "", "value": sanitize_draft(d)}])
+
+    def _schedule(self):
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(0.0, min(self.DEBOUNCE, self._dirty_since + self.FLUSH_MAX - now))
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _rotate(self):
+        if self._disk is None or self.backups <= 0:
+            return
+        for k in range(self.backups - 1, 0, -1):
+            if self._backup(k).exists():
+                os.replace(self._backup(k), self._backup(k + 1))
+        atomic_write(self._backup(1), self._disk.encode("utf-8"))
+
+    def flush(self):
+        """Compacta: escribe el snapshot de forma atómica y vacía el journal."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty_since is None:
+                return False
+            text = jdump(self.draft, indent=2)
+            if text != self._disk:
+                self._rotate()
+                snap = jdump({**self.draft, SNAPSHOT_REV: self.rev}, indent=2)
+                atomic_write(self.path, snap.encode("utf-8"))
+                self._disk = text
+                self._sig = file_sig(self.path)
+                self.flushes += 1
+            try:
+                self.journal.unlink()
+            except FileNotFoundError:
+                pass
+            self._dirty_since = None
+            return True
+
+    def history(self) -> int:
+        return sum(1 for k in range(1, self.backups + 1) if self._backup(k).exists())
+
+    def undo(self):
+        """Vuelve al snapshot anterior (los cambios pendientes se compactan antes)."""
+        with self._lock:
+            self.flush()
+            first = self._backup(1)
+            if not first.exists():
+                return None
+            text = first.read_text(encoding="utf-8")
+            atomic_write(self.path, text.encode("utf-8"))
+            for k in range(1, self.backups):
+                if self._backup(k + 1).exists():
+                    os.replace(self._backup(k + 1), self._backup(k))
+                elif self._backup(k).exists():
+                    self._backup(k).unlink()
+            if self.backups == 1:
+                first.unlink()
+            self.draft = load_draft(self.path.parent)
+            self._disk, self._sig = text, file_sig(self.path)
+            self.rev += 1
+            return self.get()
+
+    def reset(self) -> bool:
+        """Hard reset: borra el snapshot (queda como respaldo para ``undo``)."""
+        with self._lock:
+            self.flush()
+            existed = self.path.exists()
+            if existed:
+                self._rotate()
+                self.path.unlink()
+            self.draft, self._disk, self._sig = draft_default(), None, None
+            self.rev += 1
+            return existed
+
+
+# ---------- materialize ----------
+
+DATAVIEW_BLOCK = """```dataviewjs
+let notas = dv.pages().where(b=>b.file.frontmatter.Curso === dv.current().file.name).file.frontmatter.notaObtenida
+let pond = dv.pages().where(b=>b.file.frontmatter.Curso === dv.current().file.name).file.frontmatter.Ponderación
+let sigla = dv.pages().where(b=>b.file.frontmatter.Curso === dv.current().file.name).file.link
+let arr = []
+let nf = 0
+for(i=0;i<=notas.length-1;i++){
+    arr.push([sigla[i],notas[i],pond[i]])
+    nf = nf + notas[i]*pond[i]
+}
+nf = Math.round(nf*10)/10
+dv.table([\"Evaluación\",\"Nota\",\"Ponderación\"],arr)
+dv.paragraph(\"$$\\\\Huge{\\\\text{NFC}=\"+nf+\"}$$\")
+```"""
+
+
+def course_note(b: Path, payload: dict):
+    """Valida un curso temporal y arma su nota ``.md``: devuelve ``(md_path, texto)``.
+
+    No toca el disco, así un lote se puede validar completo antes de escribir.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Payload inválido")
+
+    term_id = str(payload.get("term_id", "") or "").strip()
+    fm = payload.get("frontmatter") if isinstance(payload.get("frontmatter"), dict) else {}
+
+    sigla = str(payload.get("sigla") or fm.get("sigla") or "").strip()
+    nombre = str(payload.get("nombre") or fm.get("nombre") or "").strip()
+    creditos = payload.get("creditos")
+    if creditos is None:
+        creditos = fm.get("creditos", fm.get("créditos"))
+    aprobado = payload.get("aprobado") if payload.get("aprobado") is not None else fm.get("aprobado")
+    concentracion = payload.get("concentracion") or payload.get("concentración")
+    if concentracion is None:
+        concentracion = fm.get("concentracion", fm.get("concentración"))
+    prerrequisitos = payload.get("prerrequisitos", fm.get("prerrequisitos"))
+    semestre_ofrecido = payload.get("semestreOfrecido", fm.get("semestreOfrecido"))
+
+    if not term_id or not TERM_RE.match(term_id):
+        raise ValueError("term_id inválido")
+    if not sigla:
+        raise ValueError("sigla obligatoria")
+
+    term_match = TERM_RE.match(term_id)
+    sem_val = int(term_match.group("s")) if term_match else 0
+    year_val = int(term_match.group("y")) if term_match else date.today().year
+
+    fm.setdefault("sigla", sigla)
+    if nombre:
+        fm.setdefault("nombre", nombre)
+    if creditos is not None:
+        fm.setdefault("creditos", creditos)
+        fm.setdefault("créditos", creditos if creditos is not None else fm.get("creditos"))
+    if aprobado is not None:
+        fm.setdefault("aprobado", aprobado)
+    else:
+        fm.setdefault("aprobado", False)
+    if concentracion is not None:
+        fm.setdefault("concentracion", concentracion)
+    if prerrequisitos is not None:
+        fm.setdefault("prerrequisitos", prerrequisitos)
+    if semestre_ofrecido is not None:
+        fm.setdefault("semestreOfrecido", semestre_ofrecido)
+    fm.setdefault("semestre", sem_val)
+    fm.setdefault("año", year_val)
+    fm.setdefault("sección", fm.get("sección", 0))
+    fm.setdefault("notaObtenida", fm.get("notaObtenida", 0))
+    fm.setdefault("dg-publish", fm.get("dg-publish", True))
+
+    term_dir = (b / term_id).resolve()
+    if term_dir.exists() and not term_dir.is_dir():
+        raise ValueError(f"No se pudo crear directorio de período: {term_dir}")
+
+    courses_root, has_courses = find_courses_root(term_dir) if term_dir.is_dir() else (term_dir, False)
+    if not has_courses:
+        courses_root = term_dir / COURSE_DIRS[0]
+
+    safe_sigla = re.sub(r"[^A-Za-z0-9._-]+", "_", sigla) or "curso"
+    md_path = (courses_root / f"{safe_sigla}.md").resolve()
+    if not str(md_path).startswith(str(term_dir)):
+        raise ValueError("Ruta de destino inválida")
+
+    try:
+        fm_text = yaml_support()[0].safe_dump(fm, allow_unicode=True, sort_keys=False)
+    except Exception:
+        fm_text = jdump(fm, indent=2)
+
+    return md_path, f"---\n{fm_text}\n---\n\n{DATAVIEW_BLOCK}\n"
+
+
+def write_note(md_path: Path, text: str):
+    md_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(md_path, text.encode("utf-8"))
+
+
+# ---------- bundle ----------
+
+class BundleError(ValueError):
+    pass
+
+
+IMPORT_FROM_RE = re.compile(r"""^import\s+([^;'"]+?)\s+from\s*(["'])([^"']+)\2\s*;?""", re.M | re.S)
+IMPORT_BARE_RE = re.compile(r"""^import\s*(["'])([^"']+)\1\s*;?""", re.M)
+EXPORT_DECL_RE = re.compile(r"^export\s+((?:async\s+)?function\*?\s+|const\s+|class\s+)([A-Za-z_$][\w$]*)", re.M)
+EXPORT_LIST_RE = re.compile(r"^export\s*\{([^}]*)\}\s*;?", re.M)
+MODULE_SCRIPT_RE = re.compile(r"""<script\b[^>]*\btype=(["'])module\1[^>]*\bsrc=(["'])([^"'?#]+)[^"']*\2[^>]*>\s*</script>""")
+
+
+def _bundle_key(spec: str, importer: str) -> str:
+    # "./state.js" importado desde "modules/render.js" -> "modules/state.js"
+    spec = spec.split("?", 1)[0].split("#", 1)[0]
+    parts = [] if spec.startswith("/") else importer.split("/")[:-1]
+    for part in spec.lstrip("/").split("/"):
+        if part == "..":
+            if not parts:
+                raise BundleError(f"import fuera de la UI: {spec} ({importer})")
+            parts.pop()
+        elif part not in ("", "."):
+            parts.append(part)
+    return "/".join(parts)
+
+
+def _import_bindings(clause: str, key: str, importer: str) -> str:
+    clause = " ".join(clause.split())
+    ref = f"__m[{json.dumps(key)}]"
+    if clause.startswith("* as "):
+        return f"const {clause[5:].strip()} = {ref};"
+    if clause.startswith("{") and clause.endswith("}"):
+        names = []
+        for item in clause[1:-1].split(","):
+            item = item.strip()
+            if not item:
+                continue
+            src, _, dst = item.partition(" as ")
+            names.append(f"{src.strip()}: {dst.strip()}" if dst else src.strip())
+        return f"const {{ {', '.join(names)} }} = {ref};"
+    raise BundleError(f"import no soportado en {importer}: import {clause} from ...")
+
+
+def _bundle_module(code: str, key: str):
+    """Convierte un módulo ES en el cuerpo de una IIFE: ``(código, deps)``.
+
+    Los imports pasan a ``const`` al inicio (como el hoisting de ESM) y los
+    exports se devuelven en un objeto. Solo se aceptan las formas que usa la UI;
+    cualquier otra aborta con ``BundleError``.
+    """
+    deps, consts = [], []
+
+    def on_import(m):
+        dep = _bundle_key(m.group(3), key)
+        deps.append(dep)
+        consts.append(_import_bindings(m.group(1), dep, key))
+        return ""
+
+    def on_bare(m):
+        deps.append(_bundle_key(m.group(2), key))
+        return ""
+
+    code = IMPORT_FROM_RE.sub(on_import, code)
+    code = IMPORT_BARE_RE.sub(on_bare, code)
+
+    exports = {}
+
+    def on_decl(m):
+        exports[m.group(2)] = m.group(2)
+        return m.group(1) + m.group(2)
+
+    def on_list(m):
+        for item in m.group(1).split(","):
+            item = item.strip()
+            if item:
+                src, _, dst = item.partition(" as ")
+                exports[(dst or src).strip()] = src.strip()
+        return ""
+
+    code = EXPORT_DECL_RE.sub(on_decl, code)
+    code = EXPORT_LIST_RE.sub(on_list, code)
+
+    for pattern, what in (
+        (r"^\s*import\b(?!\s*\()", "import"),
+        (r"^\s*export\b", "export (let/var/default/*)"),
+        (r"\bimport\s*\(", "import() dinámico"),
+        (r"\bimport\.meta\b", "import.meta"),
+        (r"^await\b", "await de nivel superior"),
+    ):
+        m = re.search(pattern, code, re.M)
+        if m:
+            line = code.count("\n", 0, m.start()) + 1
+            raise BundleError(f"sintaxis no soportada en {key}:{line}: {what}")
+
+    ret = ", ".join(k if k == v else f"{k}: {v}" for k, v in exports.items())
+    body = "\n".join(consts) + "\n" + code.strip("\n") + f"\nreturn {{ {ret} }};"
+    return body, deps
+
+
+def bundle_modules(root: Path, entry: str, version=APP_VERSION):
+    """Empaqueta el grafo de módulos de ``entry`` en un solo script.
+
+    Cada módulo queda en una IIFE que devuelve sus exports, en orden topológico
+    (dependencias primero). Devuelve ``(código, {key: firma})``; un ciclo o una
+    sintaxis no soportada aborta con ``BundleError``.
+    """
+    order, state, bodies, sources = [], {}, {}, {}
+
+    def visit(key, chain):
+        if state.get(key) == "done":
+            return
+        if state.get(key) == "visiting":
+            raise BundleError("import circular: " + " -> ".join(chain + [key]))
+        p = root / key
+        if not p.is_file():
+            raise BundleError(f"módulo no encontrado: {key}" + (f" (desde {chain[-1]})" if chain else ""))
+        state[key] = "visiting"
+        sources[key] = file_sig(p)
+        body, deps = _bundle_module(p.read_text(encoding="utf-8"), key)
+        bodies[key] = body
+        for dep in deps:
+            visit(dep, chain + [key])
+        state[key] = "done"
+        order.append(key)
+
+    visit(entry, [])
+    out = [f"// {APP_NAME} v{version}: bundle de {len(order)} módulos generado por el servidor (--bundle)", "(() => {", "const __m = Object.create(null);"]
+    for key in order:
+        out.append(f"// ---------- {key} ----------")
+        out.append(f"__m[{json.dumps(key)}] = (() => {{\n\"use strict\";\n{bodies[key]}\n}})();")
+    out.append("})();")
+    return "\n".join(out) + "\n", sources
+
+
+def boot_script(boot: dict) -> str:
+    # JSON dentro de <script>: se escapan "</" y los separadores de línea U+2028/U+2029.
+    data = jdump(boot).replace("</", "<\\/").replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+    return f"<script>window.__MALLA_BOOT__ = {data};</script>"
+
+
+# ---------- http ----------
+
+COMPRESS_MIN = 1024  # bytes; bajo esto comprimir no compensa
+COMPRESSIBLE = ("application/json", "application/javascript", "text/")
+
+_brotli_mod = None
+
+
+def brotli_mod():
+    # brotli es opcional; el probe se hace una sola vez.
+    global _brotli_mod
+    if _brotli_mod is None:
+        try:
+            import brotli  # type: ignore
+
+            _brotli_mod = brotli
+        except Exception:
+            _brotli_mod = False
+    return _brotli_mod or None
+
+
+def accepted_encodings(h) -> set:
+    out = set()
+    for part in (h.headers.get("Accept-Encoding", "") if h.headers else "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            out.add(name.strip().lower())
+    return out
+
+
+def negotiate_encoding(h, ctype: str, size: int):
+    if size < COMPRESS_MIN or not ctype.startswith(COMPRESSIBLE):
+        return None
+    acc = accepted_encodings(h)
+    if "br" in acc and brotli_mod():
+        return "br"
+    if "gzip" in acc:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, enc: str) -> bytes:
+    if enc == "br":
+        return brotli_mod().compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def etag_core(tag: str) -> str:
+    t = tag.strip()
+    if t.startswith("W/"):
+        t = t[2:]
+    t = t.strip('"')
+    for suffix in ("-gz", "-br"):
+        if t.endswith(suffix):
+            return t[: -len(suffix)]
+    return t
+
+
+def etag_matches(h, etag: str) -> bool:
+    # Ignora el sufijo de encoding (-gz/-br) que send() agrega al comprimir.
+    inm = h.headers.get("If-None-Match", "")
+    if not inm:
+        return False
+    if inm.strip() == "*":
+        return True
+    want = etag_core(etag)
+    return any(etag_core(t) == want for t in inm.split(","))
+
+
+def query_flag(query: dict, name: str) -> bool:
+    return str(query.get(name, [""])[0]).strip().lower() in ("1", "true", "yes")
+
+
+def query_str(query: dict, name: str) -> str:
+    return str(query.get(name, [""])[0]).strip()
+
+
+def parse_fields(query: dict):
+    raw = str(query.get("fields", [""])[0]).strip()
+    return [f.strip() for f in raw.split(",") if f.strip()] if raw else None
+
+
+def project_course(c, fields) -> dict:
+    # Por defecto se omite el frontmatter crudo (duplica los campos normalizados).
+    if fields is None:
+        if isinstance(c, Course):
+            return c.to_dict(raw=False)
+        return {k: v for k, v in c.items() if k != "frontmatter"}
+    if "*" in fields:
+        return c
+    out = {"course_id": c.get("course_id")}
+    for f in fields:
+        if f in c:
+            out[f] = c[f]
+    return out
+
+
+def send(h, status, ctype, body: bytes, headers=None):
+    headers = dict(headers or {})
+    # Un body ya comprimido (p. ej. desde StaticCache) trae su Content-Encoding.
+    enc = negotiate_encoding(h, ctype, len(body)) if status == 200 and "Content-Encoding" not in headers else None
+    if enc:
+        body = compress(body, enc)
+        headers["Content-Encoding"] = enc
+        if "ETag" in headers:
+            headers["ETag"] = headers["ETag"][:-1] + ("-br" if enc == "br" else "-gz") + '"'
+    if ctype.startswith(COMPRESSIBLE):
+        headers.setdefault("Vary", "Accept-Encoding")
+    try:
+        h.send_response(status)
+        h.send_header("Content-Type", ctype)
+        h.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            h.send_header(k, v)
+        h.end_headers()
+        if body and h.command != "HEAD":
+            h.wfile.write(body)
+    except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+        pass
+
+
+class StaticCache:
+    """Archivos de la UI precargados en memoria, con variante gzip precomprimida.
+
+    - ``index.html`` y los imports relativos de cada ``.js`` se reescriben con
+      ``?v=<hash>``, un hash del contenido de toda la UI (el mismo para todos,
+      así cada módulo se carga una sola vez); esas URLs versionadas se sirven
+      con caché inmutable y cambian apenas cambia cualquier archivo.
+    - Lo demás (y todo en modo ``dev``) va con ``no-cache`` + ETag: una recarga
+      cuesta un 304.
+    - En modo ``dev`` se compara la firma ``(mtime_ns, size)`` en cada request y
+      se recarga lo que cambió (o se agrega lo nuevo).
+    """
+
+    IMMUTABLE = "public, max-age=31536000, immutable"
+    JS_IMPORT_RE = re.compile(r"""(\bfrom\s*|\bimport\s*\(\s*|\bimport\s+)(["'])((?:\.{1,2}/|/)[^"'?#\s]+\.js)\2""")
+    HTML_REF_RE = re.compile(r"""\b((?:src|href)=)(["'])((?!\w+:|//)[^"'?#]+\.(?:js|css))\2""")
+
+    def __init__(self, root: Path, dev=False, version=None, bundle=False):
+        self.root = root.resolve()
+        self.dev = dev
+        self.lock = threading.Lock()
+        self.files = {}  # ruta relativa (posix) -> entrada
+        self.bundle_entry = None  # módulo de entrada si se sirve bundle.js
+        self.bundle_sources = {}
+        self.bundle_error = None
+        paths = [p for p in sorted(self.root.rglob("*")) if p.is_file()]
+        self.version = version or self._content_hash(paths)
+        for p in paths:
+            self._load(p)
+        if bundle:
+            self._build_bundle()
+
+    def _content_hash(self, paths: list) -> str:
+        # Token de ``?v=``: ruta + bytes de cada archivo de la UI.
+        h = hashlib.sha1()
+        for p in paths:
+            h.update(p.relative_to(self.root).as_posix().encode("utf-8") + b"\0")
+            h.update(p.read_bytes())
+            h.update(b"\0")
+        return h.hexdigest()[:12]
+
+    def _build_bundle(self):
+        """Arma ``bundle.js`` desde el ``<script type=module>`` de index.html y
+        apunta index.html a él. Si no se puede, se sigue sirviendo por módulos."""
+        index = self.root / "index.html"
+        m = MODULE_SCRIPT_RE.search(index.read_text(encoding="utf-8")) if index.is_file() else None
+        if m is None:
+            self.bundle_error = "index.html no tiene un <script type=module src=...>"
+            return False
+        entry = m.group(3).lstrip("/")
+        try:
+            code, sources = bundle_modules(self.root, entry)
+        except (BundleError, OSError, UnicodeDecodeError) as e:
+            self.bundle_error = str(e)
+            return False
+        self.bundle_entry, self.bundle_sources, self.bundle_error = entry, sources, None
+        self._put("bundle.js", None, code.encode("utf-8"), "application/javascript; charset=utf-8")
+        self._load(index)
+        return True
+
+    def _put(self, key: str, sig, data: bytes, ctype: str, html=False):
+        gz = None
+        if len(data) >= COMPRESS_MIN and ctype.startswith(COMPRESSIBLE):
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gz) >= len(data):
+                gz = None
+        self.files[key] = dict(
+            sig=sig,
+            body=data,
+            gz=gz,
+            ctype=ctype,
+            etag=hashlib.sha1(data).hexdigest()[:16],
+            html=html,
+        )
+
+    def _versioned(self, m) -> str:
+        return f"{m.group(1)}{m.group(2)}{m.group(3)}?v={self.version}{m.group(2)}"
+
+    def _load(self, p: Path):
+        import mimetypes
+
+        key = p.relative_to(self.root).as_posix()
+        sig = file_sig(p)
+        data = p.read_bytes()
+        if p.suffix in (".js", ".mjs"):
+            data = self.JS_IMPORT_RE.sub(self._versioned, data.decode("utf-8")).encode("utf-8")
+        elif p.suffix in (".html", ".htm"):
+            text = data.decode("utf-8")
+            if self.bundle_entry and key == "index.html":
+                text = MODULE_SCRIPT_RE.sub(
+                    lambda m: f'<script type="module" src="/bundle.js?v={self.version}"></script>', text, count=1
+                )
+            data = self.HTML_REF_RE.sub(self._versioned, text).encode("utf-8")
+        ctype = {".js": "application/javascript", ".mjs": "application/javascript"}.get(p.suffix) or (
+            mimetypes.guess_type(p.name)[0] or "application/octet-stream"
+        )
+        if ctype.startswith(("text/", "application/javascript", "application/json")):
+            ctype += "; charset=utf-8"
+        self._put(key, sig, data, ctype, html=p.suffix in (".html", ".htm"))
+
+    def get(self, path: str):
+        key = unquote(path).lstrip("/")
+        if key == "" or key.endswith("/"):
+            key += "index.html"
+        if not self.dev:
+            return self.files.get(key)
+        with self.lock:
+            if key == "bundle.js" and self.bundle_entry:
+                if any(file_sig(self.root / k) != sig for k, sig in self.bundle_sources.items()):
+                    self._build_bundle()
+                return self.files.get(key)
+            p = (self.root / key).resolve()
+            if self.root not in p.parents:
+                return None
+            sig = file_sig(p)
+            hit = self.files.get(key)
+            if sig is None:
+                self.files.pop(key, None)
+                return None
+            if (hit is None or hit["sig"] != sig) and p.is_file():
+                self._load(p)
+            return self.files.get(key)
+
+    def serve(self, h, path: str, query: dict) -> bool:
+        """Responde desde memoria; ``False`` si el archivo no está en la caché."""
+        e = self.get(path)
+        METRICS.inc("cache_lookups_total", cache="static", result="miss" if e is None else "hit")
+        if e is None:
+            return False
+        versioned = not self.dev and not e["html"] and query.get("v", [""])[0] == self.version
+        gz = e["gz"] is not None and "gzip" in accepted_encodings(h)
+        headers = {
+            "ETag": f'"{e["etag"]}{"-gz" if gz else ""}"',
+            "Cache-Control": self.IMMUTABLE if versioned else "no-cache",
+        }
+        if e["gz"] is not None:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(h, headers["ETag"]):
+            send(h, 304, e["ctype"], b"", headers)
+            return True
+        if gz:
+            headers["Content-Encoding"] = "gzip"
+        send(h, 200, e["ctype"], e["gz"] if gz else e["body"], headers)
+        return True
+
+
+class Vault:
+    """Lo que el servidor mantiene por vault: índice, borrador, watcher y motores.
+
+    El índice y lo que cuelga de él (watcher, búsqueda, stats, motores de
+    warnings) se descargan con ``unload()`` cuando el vault queda ocioso y se
+    vuelven a abrir, desde el caché SQLite, en el siguiente request. El
+    borrador se conserva: es chico y sus escrituras son diferidas.
+    """
+
+    ENGINES_MAX = 8
+
+    def __init__(self, name: str, b: Path):
+        self.name, self.b = name, b
+        # Lecturas del catálogo concurrentes; escrituras al vault exclusivas.
+        rw = RWLock()
+        self.read_lock = TimedLock(rw.reader, "catalog_read")
+        self.write_lock = TimedLock(rw.writer, "catalog_write")
+        self.hub = EventHub()
+        self.drafts = DraftStore(b)
+        self.lock = threading.Lock()
+        self.active = 0  # requests en curso (incluye streams SSE)
+        self.last_used = time.monotonic()
+        self.loads = 0
+        self.index = self.watcher = self.search = self.stats = None
+        self.engines = OrderedDict()  # session -> (generation, WarningEngine)
+        self.engines_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.index is not None
+
+    def idle(self) -> bool:
+        return self.active == 0 and self.hub.count() == 0
+
+    def load(self):
+        with self.lock:
+            if self.index is not None:
+                return
+            index = CourseIndex(
+                self.b, on_change=lambda delta: self.hub.publish("delta", delta), cache=CatalogCache(self.b / CACHE_FILE)
+            )
+            index.load_cache()
+            self.watcher = VaultWatcher(index, self.hub)
+            self.search = SearchIndex(self.b)
+            self.stats = StatsEngine()
+            with self.engines_lock:
+                self.engines.clear()
+            self.index = index
+            self.loads += 1
+
+    def unload(self):
+        with self.lock:
+            if self.index is None:
+                return
+            self.watcher.stop()
+            self.drafts.flush()
+            self.index = self.watcher = self.search = self.stats = None
+            with self.engines_lock:
+                self.engines.clear()
+
+    def warning_engine(self, session: str, draft=None):
+        with self.read_lock:
+            terms, courses, _ = self.index.current()
+        gen = self.index.generation
+        with self.engines_lock:
+            hit = self.engines.get(session)
+            if hit is not None:
+                self.engines.move_to_end(session)
+        if draft is None and hit is not None:
+            if hit[0] == gen:
+                METRICS.inc("cache_lookups_total", cache="warning_engine", result="hit")
+                return hit[1], False
+            # Cambió el catálogo: se reconstruye conservando las ubicaciones de la sesión.
+            draft = dict(hit[1].draft, placements={k: v for k, v in hit[1].placement.items() if v})
+        METRICS.inc("cache_lookups_total", cache="warning_engine", result="miss")
+        eng = WarningEngine(courses, terms, sanitize_draft(draft if draft is not None else self.drafts.get()))
+        with self.engines_lock:
+            self.engines[session] = (gen, eng)
+            self.engines.move_to_end(session)
+            while len(self.engines) > self.ENGINES_MAX:
+                self.engines.popitem(last=False)
+        return eng, True
+
+    def info(self) -> dict:
+        return dict(
+            name=self.name,
+            base_dir=str(self.b),
+            loaded=self.loaded,
+            active=self.active,
+            sse_clients=self.hub.count(),
+            loads=self.loads,
+            idle_s=round(time.monotonic() - self.last_used, 1),
+        )
+
+
+class VaultRegistry:
+    """Vaults que sirve un proceso, con a lo más ``max_loaded`` índices en memoria.
+
+    ``acquire()`` marca el vault como en uso (y lo carga si hacía falta);
+    al pasar el tope se descargan los vaults ociosos usados hace más tiempo (LRU).
+    Un vault con requests o clientes SSE activos nunca se descarga.
+    """
+
+    def __init__(self, vaults: dict, max_loaded=4):
+        self.vaults = {name: Vault(name, Path(b)) for name, b in vaults.items()}
+        self.max_loaded = max(1, max_loaded)
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def acquire(self, name: str):
+        with self.lock:
+            v = self.vaults.get(name)
+            if v is None:
+                return None
+            v.active += 1
+            v.last_used = time.monotonic()
+        try:
+            v.load()
+        except BaseException:
+            self.release(v)
+            raise
+        self._evict()
+        return v
+
+    def release(self, v: Vault):
+        with self.lock:
+            v.active -= 1
+            v.last_used = time.monotonic()
+
+    def _evict(self):
+        # Bajo self.lock nadie puede adquirir un vault mientras se descarga.
+        with self.lock:
+            loaded = [v for v in self.vaults.values() if v.loaded]
+            excess = len(loaded) - self.max_loaded
+            if excess <= 0:
+                return
+            for v in sorted((v for v in loaded if v.idle()), key=lambda v: v.last_used)[:excess]:
+                v.unload()
+                self.evictions += 1
+                METRICS.inc("vault_evictions_total")
+
+    def info(self) -> dict:
+        with self.lock:
+            vaults = [v.info() for v in self.vaults.values()]
+        return dict(max_loaded=self.max_loaded, evictions=self.evictions, vaults=vaults)
+
+
+VAULT_PATH_RE = re.compile(r"^/v/([^/]+)(/.*)?$")
+
+
+def parse_vault_spec(spec: str):
+    """``nombre=ruta`` de ``--vault`` → ``(nombre, Path)``."""
+    name, sep, path = spec.partition("=")
+    name = name.strip()
+    if not sep or not name or not path.strip():
+        raise ValueError(f"--vault espera nombre=ruta: {spec!r}")
+    if "/" in name or name in (".", ".."):
+        raise ValueError(f"nombre de vault inválido: {name!r}")
+    p = Path(path.strip()).expanduser().resolve()
+    if not p.is_dir():
+        raise ValueError(f"el vault {name!r} no es una carpeta: {p}")
+    return name, p
+
+
+def handler_factory(b: Path, ui_dir, dev=False, bundle=False, inline_data=False, vaults=None, max_loaded=4):
+    # Con ``vaults`` ({nombre: ruta}) un mismo proceso sirve varios vaults bajo
+    # /v/<nombre>/; si no, ``b`` se sirve en la raíz como siempre.
+    multi = bool(vaults)
+    registry = VaultRegistry(vaults if multi else {"": b}, max_loaded=max_loaded)
+    static = StaticCache(ui_dir, dev=dev, bundle=bundle) if ui_dir else None
+    if static is not None and bundle and static.bundle_error:
+        print(f"[{APP_NAME}] Bundle desactivado: {static.bundle_error}")
+
+    def config_payload():
+        return dict(
+            app_name=APP_NAME,
+            app_version=APP_VERSION,
+            max_credits=MAX_CREDITS,
+            soft_credits=SOFT_CREDITS,
+            term_code_by_sem=TERM_CODE,
+            supports_theme=True,
+            theme_values=["light", "dark"],
+            theme_default="light",
+        )
+
+    def catalog_payload(terms, courses, debug, fields=None):
+        return {
+            "version": APP_VERSION,
+            "generation": debug["generation"],
+            "debug": debug,
+            "terms": terms,
+            "courses": [project_course(c, fields) for c in courses],
+        }
+
+    class H(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kw):
+            super().__init__(*args, directory=str(ui_dir) if ui_dir else None, **kw)
+
+        def log_message(self, *args):
+            return
+
+        def handle_one_request(self):
+            # Mide cada request (ruta agrupada + status) y, si está activo, escribe el access log.
+            self._status, self._bytes, self.v, self.sse = None, 0, None, None
+            t0 = time.perf_counter()
+            try:
+                super().handle_one_request()
+            finally:
+                if self.v is not None:
+                    registry.release(self.v)
+                    self.v = None
+            if self._status is None:
+                return
+            ms = (time.perf_counter() - t0) * 1000
+            path = urlparse(getattr(self, "path", "") or "").path
+            route = route_template(path)
+            METRICS.inc("http_requests_total", route=route, method=self.command, status=self._status)
+            if route != "/api/events":  # el stream SSE dura lo que dure la conexión
+                METRICS.observe("http_request_ms", ms, route=route, status=self._status)
+            METRICS.log(
+                dict(
+                    ts=datetime.now().isoformat(timespec="milliseconds"),
+                    client=self.client_address[0],
+                    method=self.command,
+                    path=path,
+                    route=route,
+                    status=self._status,
+                    bytes=self._bytes,
+                    ms=round(ms, 3),
+                )
+            )
+
+        def send_response(self, code, message=None):
+            self._status = code
+            super().send_response(code, message)
+
+        def send_header(self, keyword, value):
+            if keyword.lower() == "content-length":
+                self._bytes = as_int(value)
+            super().send_header(keyword, value)
+
+        def split_vault(self, path: str):
+            """``(nombre del vault, ruta sin /v/<nombre>)``; ``nombre`` es ``None``
+            en la raíz del modo multi-vault y ``""`` en el modo de un solo vault."""
+            if not multi:
+                return "", path
+            m = VAULT_PATH_RE.match(path)
+            if m is None:
+                return None, path
+            return unquote(m.group(1)), m.group(2) or ""
+
+        def use_vault(self, name):
+            # El vault queda adquirido (no se descarga) hasta que termine el request.
+            if name is None:
+                return None
+            if self.v is None:
+                self.v = registry.acquire(name)
+            return self.v
+
+        def unknown_vault(self, name):
+            msg = f"vault desconocido: {name}" if name is not None else "unknown api (usar /v/<vault>/api/...)"
+            return send(self, 404, "application/json; charset=utf-8", jdump({"error": msg}).encode("utf-8"))
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            name, path = self.split_vault(u.path)
+            if path == "/favicon.ico":
+                return send(self, 204, "image/x-icon", b"")
+            if name is not None and path == "":
+                return send(self, 301, "text/plain; charset=utf-8", b"", {"Location": u.path + "/"})
+            if path == "/api/vaults":
+                return send(self, 200, "application/json; charset=utf-8", jdump(registry.info()).encode("utf-8"))
+            if path.startswith("/api/"):
+                if name is None and path in ("/api/config", "/api/metrics"):
+                    return self.api_get(path, parse_qs(u.query))
+                if self.use_vault(name) is None:
+                    return self.unknown_vault(name)
+                if path == "/api/events":
+                    return self.api_events(parse_qs(u.query))
+                return self.api_get(path, parse_qs(u.query))
+            if name is None and path in ("/", "/index.html"):
+                return self.vault_index()
+            if ui_dir is None:
+                if path in ("/", "/index.html"):
+                    return send(self, 200, "text/html; charset=utf-8", FALLBACK_INDEX.encode("utf-8"))
+                return send(self, 404, "text/plain; charset=utf-8", b"404 Not Found")
+            if inline_data and static is not None and name is not None and path in ("/", "/index.html"):
+                if self.use_vault(name) is None:
+                    return self.unknown_vault(name)
+                return self.boot_index()
+            if static is not None and static.serve(self, path, parse_qs(u.query)):
+                return
+            if name:
+                return send(self, 404, "text/plain; charset=utf-8", b"404 Not Found")
+            return super().do_HEAD() if self.command == "HEAD" else super().do_GET()
+
+        def do_HEAD(self):
+            # Mismas rutas que GET (StaticCache incluido); send() omite el body.
+            if self.split_vault(urlparse(self.path).path)[1] == "/api/events":
+                return send(self, 405, "text/plain; charset=utf-8", b"", {"Allow": "GET"})
+            return self.do_GET()
+
+        def vault_index(self):
+            # Raíz del modo multi-vault: enlaces a cada /v/<nombre>/.
+            import html
+
+            items = "".join(
+                f'<li><a href="/v/{html.escape(n)}/">{html.escape(n)}</a> <small>{html.escape(str(v.b))}</small></li>'
+                for n, v in registry.vaults.items()
+            )
+            page = FALLBACK_INDEX.split("<h1>")[0] + f"<h1>Malla</h1><p>Vaults servidos:</p><ul>{items}</ul></body></html>"
+            return send(self, 200, "text/html; charset=utf-8", page.encode("utf-8"))
+
+        def do_PATCH(self):
+            name, path = self.split_vault(urlparse(self.path).path)
+            if path != "/api/draft":
+                return send(self, 404, "application/json; charset=utf-8", jdump({"error": "unknown api"}).encode("utf-8"))
+            v = self.use_vault(name)
+            if v is None:
+                return self.unknown_vault(name)
+            # Body: [ops…] o {ops: [ops…], rev?}; con rev, 409 si el borrador cambió entremedio.
+            try:
+                n = int(self.headers.get("Content-Length", "0"))
+                raw = self.rfile.read(n) if n > 0 else b"[]"
+                payload = json.loads(raw.decode("utf-8"))
+                if isinstance(payload, list):
+                    payload = {"ops": payload}
+                if not isinstance(payload, dict):
+                    raise ValueError("Payload inválido")
+                rev = v.drafts.patch(payload.get("ops"), payload.get("rev"))
+                return send(self, 200, "application/json; charset=utf-8", jdump({"ok": True, "rev": rev}).encode("utf-8"))
+            except DraftConflict as e:
+                return send(
+                    self,
+                    409,
+                    "application/json; charset=utf-8",
+                    jdump({"ok": False, "error": str(e), "rev": v.drafts.rev}).encode("utf-8"),
+                )
+            except Exception as e:
+                return send(
+                    self,
+                    400,
+                    "application/json; charset=utf-8",
+                    jdump({"ok": False, "error": str(e)}).encode("utf-8"),
+                )
+
+        def do_POST(self):
+            name, path = self.split_vault(urlparse(self.path).path)
+            if not path.startswith("/api/"):
+                return send(self, 404, "text/plain; charset=utf-8", b"404 Not Found")
+            v = self.use_vault(name)
+            if v is None:
+                return self.unknown_vault(name)
+
+            if path == "/api/warnings/evaluate":
+                # Body: {session?, draft?, changes?: {course_id: term_id}, full?}
+                try:
+                    n = int(self.headers.get("Content-Length", "0"))
+                    raw = self.rfile.read(n) if n > 0 else b"{}"
+                    payload = json.loads(raw.decode("utf-8"))
+                    if not isinstance(payload, dict):
+                        raise ValueError("Payload inválido")
+                    session = str(payload.get("session") or "default")
+                    draft = payload.get("draft") if isinstance(payload.get("draft"), dict) else None
+                    changes = payload.get("changes") or {}
+                    if not isinstance(changes, dict):
+                        raise ValueError("changes debe ser un objeto {course_id: term_id}")
+
+                    eng, fresh = v.warning_engine(session, draft)
+                    with v.engines_lock:
+                        diff = eng.move(changes)
+                        out = dict(ok=True, session=session, generation=v.index.generation, rebuilt=fresh, **diff)
+                        out["counts"] = eng.counts()
+                        if fresh or payload.get("full"):
+                            out["warnings"] = eng.warnings()
+                    return send(self, 200, "application/json; charset=utf-8", jdump(out).encode("utf-8"))
+                except Exception as e:
+                    return send(
+                        self,
+                        400,
+                        "application/json; charset=utf-8",
+                        jdump({"ok": False, "error": str(e)}).encode("utf-8"),
+                    )
+
+            if path == "/api/plan":
+                # Body: {draft?, start?, cap?: "max"|"soft", summer?, keep_draft?, exact?,
+                #        exact_max?, time_budget_ms?, max_terms?, apply?, scenario?}
+                try:
+                    n = int(self.headers.get("Content-Length", "0"))
+                    raw = self.rfile.read(n) if n > 0 else b"{}"
+                    payload = json.loads(raw.decode("utf-8"))
+                    if not isinstance(payload, dict):
+                        raise ValueError("Payload inválido")
+                    if payload.get("cap", "max") not in ("max", "soft"):
+                        raise ValueError('cap debe ser "max" o "soft"')
+                    with v.read_lock:
+                        terms, courses, _ = v.index.current()
+                    given = payload.get("draft")
+                    draft = sanitize_draft(given if isinstance(given, dict) else v.drafts.get())
+                    plan = plan_semesters(
+                        courses,
+                        terms,
+                        draft,
+                        start=str(payload.get("start") or "").strip() or None,
+                        cap=payload.get("cap", "max"),
+                        summer=bool(payload.get("summer", False)),
+                        keep_draft=bool(payload.get("keep_draft", True)),
+                        exact=bool(payload.get("exact", True)),
+                        exact_max=max(0, min(20, as_int(payload.get("exact_max"), 12))),
+                        time_budget=max(0, min(30000, as_int(payload.get("time_budget_ms"), 2000))) / 1000,
+                        max_terms=as_int(payload.get("max_terms"), 0) or None,
+                    )
+                    out = dict(ok=True, plan=plan, applied=False)
+                    name = str(payload.get("scenario") or "").strip()
+                    if name:
+                        # Se guarda como escenario con nombre en vez de aplicarse.
+                        key = name.replace("~", "~0").replace("/", "~1")
+                        value = {"placements": plan["placements"]}
+                        ops = [{"op": "add", "path": f"/scenarios/{key}", "value": value}]
+                        out.update(scenario=name, rev=v.drafts.patch(ops))
+                    elif payload.get("apply", True):
+                        d = apply_plan(draft, plan, terms)
+                        out.update(applied=True, draft=d, rev=v.drafts.replace(d))
+                    return send(self, 200, "application/json; charset=utf-8", jdump(out).encode("utf-8"))
+                except Exception as e:
+                    return send(
+                        self,
+                        400,
+                        "application/json; charset=utf-8",
+                        jdump({"ok": False, "error": str(e)}).encode("utf-8"),
+                    )
+
+            if path == "/api/scenarios/evaluate":
+                # Body: {scenarios?: {nombre: placements} | [{name, placements}], draft?,
+                #        current?: bool, procs?}
+                try:
+                    n = int(self.headers.get("Content-Length", "0"))
+                    raw = self.rfile.read(n) if n > 0 else b"{}"
+                    payload = json.loads(raw.decode("utf-8"))
+                    if not isinstance(payload, dict):
+                        raise ValueError("Payload inválido")
+                    with v.read_lock:
+                        terms, courses, _ = v.index.current()
+                    given = payload.get("draft")
+                    draft = sanitize_draft(given if isinstance(given, dict) else v.drafts.get())
+                    given = payload.get("scenarios")
+                    scenarios = parse_scenarios(draft["scenarios"] if given is None else given)
+                    if payload.get("current", True):
+                        scenarios.setdefault(SCENARIO_CURRENT, {})
+                    if not scenarios:
+                        raise ValueError("no hay escenarios para evaluar")
+                    if len(scenarios) > SCENARIO_MAX:
+                        raise ValueError(f"demasiados escenarios ({len(scenarios)} > {SCENARIO_MAX})")
+                    procs = payload.get("procs")
+                    res = evaluate_scenarios(
+                        courses,
+                        terms,
+                        draft,
+                        scenarios,
+                        procs=None if procs is None else max(0, min(SCENARIOS["procs"], as_int(procs, 0))),
+                    )
+                    out = dict(ok=True, generation=v.index.generation, **res)
+                    return send(self, 200, "application/json; charset=utf-8", jdump(out).encode("utf-8"))
+                except Exception as e:
+                    return send(
+                        self,
+                        400,
+                        "application/json; charset=utf-8",
+                        jdump({"ok": False, "error": str(e)}).encode("utf-8"),
+                    )
+
+            if path == "/api/draft":
+                try:
+                    n = int(self.headers.get("Content-Length", "0"))
+                    raw = self.rfile.read(n) if n > 0 else b"{}"
+                    d = sanitize_draft(json.loads(raw.decode("utf-8")))
+                    rev = v.drafts.replace(d)
+                    return send(self, 200, "application/json; charset=utf-8", jdump({"ok": True, "rev": rev}).encode("utf-8"))
+                except Exception as e:
+                    return send(
+                        self,
+                        400,
+                        "application/json; charset=utf-8",
+                        jdump({"ok": False, "error": str(e)}).encode("utf-8"),
+                    )
+
+            if path == "/api/draft/reset":
+                # Hard reset: delete malla_draft.json (frontend must confirm).
+                # The previous snapshot is kept as a backup, so /api/draft/undo can restore it.
+                try:
+                    existed = v.drafts.reset()
+                    return send(
+                        self,
+                        200,
+                        "application/json; charset=utf-8",
+                        jdump({"ok": True, "deleted": existed}).encode("utf-8"),
+                    )
+                except Exception as e:
+                    return send(
+                        self,
+                        400,
+                        "application/json; charset=utf-8",
+                        jdump({"ok": False, "error": str(e)}).encode("utf-8"),
+                    )
+
+            if path == "/api/draft/undo":
+                try:
+                    d = v.drafts.undo()
+                    out = {"ok": d is not None, "draft": d, "rev": v.drafts.rev, "undo_left": v.drafts.history()}
+                    if d is None:
+                        out["error"] = "No hay versiones anteriores del borrador."
+                    return send(self, 200 if d is not None else 409, "application/json; charset=utf-8", jdump(out).encode("utf-8"))
                 except Exception as e:
                     return send(
                         self,
@@ -458,103 +4236,76 @@ def handler_factory(b: Path, ui_dir):
                 try:
                     n = int(self.headers.get("Content-Length", "0"))
                     raw = self.rfile.read(n) if n > 0 else b"{}"
-                    payload = json.loads(raw.decode("utf-8"))
-                    if not isinstance(payload, dict):
-                        raise ValueError("Payload inválido")
-
-                    term_id = str(payload.get("term_id", "") or "").strip()
-                    fm = payload.get("frontmatter") if isinstance(payload.get("frontmatter"), dict) else {}
-
-                    sigla = str(payload.get("sigla") or fm.get("sigla") or "").strip()
-                    nombre = str(payload.get("nombre") or fm.get("nombre") or "").strip()
-                    creditos = payload.get("creditos")
-                    if creditos is None:
-                        creditos = fm.get("creditos", fm.get("créditos"))
-                    aprobado = payload.get("aprobado") if payload.get("aprobado") is not None else fm.get("aprobado")
-                    concentracion = payload.get("concentracion") or payload.get("concentración")
-                    if concentracion is None:
-                        concentracion = fm.get("concentracion", fm.get("concentración"))
-                    prerrequisitos = payload.get("prerrequisitos", fm.get("prerrequisitos"))
-                    semestre_ofrecido = payload.get("semestreOfrecido", fm.get("semestreOfrecido"))
-
-                    if not term_id or not TERM_RE.match(term_id):
-                        raise ValueError("term_id inválido")
-                    if not sigla:
-                        raise ValueError("sigla obligatoria")
-
-                    term_match = TERM_RE.match(term_id)
-                    sem_val = int(term_match.group("s")) if term_match else 0
-                    year_val = int(term_match.group("y")) if term_match else date.today().year
-
-                    fm.setdefault("sigla", sigla)
-                    if nombre:
-                        fm.setdefault("nombre", nombre)
-                    if creditos is not None:
-                        fm.setdefault("creditos", creditos)
-                        fm.setdefault("créditos", creditos if creditos is not None else fm.get("creditos"))
-                    if aprobado is not None:
-                        fm.setdefault("aprobado", aprobado)
-                    else:
-                        fm.setdefault("aprobado", False)
-                    if concentracion is not None:
-                        fm.setdefault("concentracion", concentracion)
-                    if prerrequisitos is not None:
-                        fm.setdefault("prerrequisitos", prerrequisitos)
-                    if semestre_ofrecido is not None:
-                        fm.setdefault("semestreOfrecido", semestre_ofrecido)
-                    fm.setdefault("semestre", sem_val)
-                    fm.setdefault("año", year_val)
-                    fm.setdefault("sección", fm.get("sección", 0))
-                    fm.setdefault("notaObtenida", fm.get("notaObtenida", 0))
-                    fm.setdefault("dg-publish", fm.get("dg-publish", True))
-
-                    term_dir = (b / term_id).resolve()
-                    term_dir.mkdir(parents=True, exist_ok=True)
-                    if not term_dir.is_dir():
-                        raise ValueError(f"No se pudo crear directorio de período: {term_dir}")
-
-                    courses_root, has_courses = find_courses_root(term_dir)
-                    if not has_courses:
-                        courses_root = term_dir / COURSE_DIRS[0]
-                        courses_root.mkdir(parents=True, exist_ok=True)
-
-                    safe_sigla = re.sub(r"[^A-Za-z0-9._-]+", "_", sigla) or "curso"
-                    md_path = (courses_root / f"{safe_sigla}.md").resolve()
-                    if not str(md_path).startswith(str(term_dir)):
-                        raise ValueError("Ruta de destino inválida")
-
-                    try:
-                        import yaml  # type: ignore
-
-                        fm_text = yaml.safe_dump(fm, allow_unicode=True, sort_keys=False)
-                    except Exception:
-                        fm_text = jdump(fm, indent=2)
-
-                    dataview_block = """```dataviewjs
-let notas = dv.pages().where(b=>b.file.frontmatter.Curso === dv.current().file.name).file.frontmatter.notaObtenida
-let pond = dv.pages().where(b=>b.file.frontmatter.Curso === dv.current().file.name).file.frontmatter.Ponderación
-let sigla = dv.pages().where(b=>b.file.frontmatter.Curso === dv.current().file.name).file.link
-let arr = []
-let nf = 0
-for(i=0;i<=notas.length-1;i++){
-    arr.push([sigla[i],notas[i],pond[i]])
-    nf = nf + notas[i]*pond[i]
-}
-nf = Math.round(nf*10)/10
-dv.table([\"Evaluación\",\"Nota\",\"Ponderación\"],arr)
-dv.paragraph(\"$$\\\\Huge{\\\\text{NFC}=\"+nf+\"}$$\")
-```"""
-
-                    md_body = f"---\n{fm_text}\n---\n\n{dataview_block}\n"
-                    with lock:
-                        md_path.write_text(md_body, encoding="utf-8")
+                    md_path, md_body = course_note(v.b, json.loads(raw.decode("utf-8")))
+                    with v.write_lock:
+                        write_note(md_path, md_body)
 
                     return send(
                         self,
                         200,
                         "application/json; charset=utf-8",
-                        jdump({"ok": True, "fileRel": rel(md_path, b)}).encode("utf-8"),
+                        jdump({"ok": True, "fileRel": rel(md_path, v.b)}).encode("utf-8"),
+                    )
+                except Exception as e:
+                    return send(
+                        self,
+                        400,
+                        "application/json; charset=utf-8",
+                        jdump({"ok": False, "error": str(e)}).encode("utf-8"),
                     )
+
+            if path == "/api/materialize/batch":
+                # Body: {courses: [payload de /api/materialize + course_id/override_of], partial?}
+                # Se valida todo antes de escribir; sin partial, un curso inválido aborta el lote.
+                try:
+                    n = int(self.headers.get("Content-Length", "0"))
+                    raw = self.rfile.read(n) if n > 0 else b"{}"
+                    payload = json.loads(raw.decode("utf-8"))
+                    items = payload.get("courses") if isinstance(payload, dict) else None
+                    if not isinstance(items, list) or not items:
+                        raise ValueError("courses debe ser una lista no vacía")
+
+                    results, planned, targets = [], [], {}
+                    for item in items:
+                        cid = str(item.get("course_id") or "") if isinstance(item, dict) else ""
+                        try:
+                            md_path, md_body = course_note(v.b, item)
+                            if md_path in targets:
+                                raise ValueError(f"misma ruta que {targets[md_path] or 'otro curso del lote'}")
+                            targets[md_path] = cid or item.get("sigla")
+                        except Exception as e:
+                            results.append(dict(course_id=cid, ok=False, error=str(e)))
+                            continue
+                        results.append(dict(course_id=cid, ok=True, fileRel=rel(md_path, v.b)))
+                        planned.append((results[-1], item, md_path, md_body))
+
+                    failed = len(results) - len(planned)
+                    if failed and not payload.get("partial"):
+                        out = dict(ok=False, error=f"{failed} curso(s) inválido(s); no se escribió nada", written=0, results=results)
+                        return send(self, 400, "application/json; charset=utf-8", jdump(out).encode("utf-8"))
+
+                    with v.write_lock:
+                        for res, _, md_path, md_body in planned:
+                            try:
+                                write_note(md_path, md_body)
+                            except Exception as e:
+                                res.update(ok=False, error=str(e))
+                                res.pop("fileRel", None)
+
+                    # Un solo cambio al borrador: se quitan los temporales escritos.
+                    done = [(res["course_id"], item) for res, item, _, _ in planned if res["ok"] and res["course_id"]]
+                    out = dict(ok=all(r["ok"] for r in results), written=sum(1 for r in results if r["ok"]), results=results)
+                    if done:
+                        d = v.drafts.get()
+                        ids = {cid for cid, _ in done}
+                        overridden = {str(item.get("override_of") or "").strip() for _, item in done} - {""}
+                        d["temp_courses"] = [c for c in d["temp_courses"] if str(c.get("course_id") or "") not in ids]
+                        for cid in ids:
+                            d["placements"].pop(cid, None)
+                        if overridden and isinstance(d.get("overrides"), list):
+                            d["overrides"] = [x for x in d["overrides"] if x not in overridden]
+                        out["rev"] = v.drafts.replace(d)
+                    return send(self, 200, "application/json; charset=utf-8", jdump(out).encode("utf-8"))
                 except Exception as e:
                     return send(
                         self,
@@ -565,34 +4316,926 @@ dv.paragraph(\"$$\\\\Huge{\\\\text{NFC}=\"+nf+\"}$$\")
 
             return send(self, 404, "text/plain; charset=utf-8", b"404 Not Found")
 
-        def api_get(self, path: str):
+        def api_events(self, query: dict):
+            # Server-Sent Events: deltas del catálogo (add/update/delete) en vivo.
+            v = self.v
+            fields = parse_fields(query)
+            # Con --server asyncio el stream sigue como corrutina en el loop (no ocupa un thread).
+            handoff = getattr(self.server, "sse_subscriber", None)
+            q = v.hub.subscribe(handoff() if handoff else None)
+            v.watcher.ensure_started()
+            self.close_connection = True
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("X-Accel-Buffering", "no")
+                self.end_headers()
+                hello = dict(app_version=APP_VERSION, watcher=v.watcher.mode)
+                self.wfile.write(f"retry: 3000\nevent: hello\ndata: {jdump(hello)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if handoff:
+                    # El vault queda adquirido hasta que el loop cierre el stream.
+                    self.sse, self.v = dict(q=q, v=v, fields=fields, release=lambda: registry.release(v)), None
+                    q = None
+                    return
+                while not v.watcher.stop_event.is_set():
+                    try:
+                        event, data = q.get(timeout=15)
+                    except queue.Empty:
+                        self.wfile.write(b": ping\n\n")
+                    else:
+                        self.wfile.write(sse_event(event, data, fields))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError, OSError):
+                pass
+            finally:
+                if q is not None:
+                    v.hub.unsubscribe(q)
+
+        def boot_index(self):
+            # index.html con /api/config, /api/all y /api/draft embebidos (--inline-data):
+            # la UI pinta sin esperar esos tres requests.
+            v = self.v
+            e = static.get("/index.html")
+            if e is None:
+                return send(self, 404, "text/plain; charset=utf-8", b"404 Not Found")
+            with v.read_lock:
+                terms, courses, debug = v.index.current()
+            boot = dict(config=config_payload(), all=catalog_payload(terms, courses, debug), draft=v.drafts.get())
+            html = e["body"].decode("utf-8")
+            m = MODULE_SCRIPT_RE.search(html)
+            at = m.start() if m else (html.rfind("</body>") if "</body>" in html else len(html))
+            html = html[:at] + boot_script(boot) + "\n  " + html[at:]
+            return send(self, 200, e["ctype"], html.encode("utf-8"), {"Cache-Control": "no-store"})
+
+        def graph(self):
+            v = self.v
+            with v.read_lock:
+                v.index.current()
+            return v.index.derived("graph", PrereqGraph)
+
+        def api_get(self, path: str, query: dict):
+            v = self.v
+            ind = 2 if query_flag(query, "pretty") else None
             if path == "/api/config":
-                cfg = dict(
-                    app_name=APP_NAME,
-                    app_version=APP_VERSION,
-                    max_credits=MAX_CREDITS,
-                    soft_credits=SOFT_CREDITS,
-                    term_code_by_sem=TERM_CODE,
-                    supports_theme=True,
-                    theme_values=["light", "dark"],
-                    theme_default="light",
-                )
-                return send(self, 200, "application/json; charset=utf-8", jdump(cfg, indent=2).encode("utf-8"))
+                return send(self, 200, "application/json; charset=utf-8", jdump(config_payload(), indent=ind).encode("utf-8"))
 
             if path == "/api/draft":
-                return send(self, 200, "application/json; charset=utf-8", jdump(load_draft(b), indent=2).encode("utf-8"))
+                return send(self, 200, "application/json; charset=utf-8", jdump(v.drafts.get(), indent=ind).encode("utf-8"))
 
             if path == "/api/all":
-                with lock:
-                    terms, courses, debug = discover_all(b)
-                payload = {"version": APP_VERSION, "debug": debug, "terms": terms, "courses": courses}
-                return send(self, 200, "application/json; charset=utf-8", jdump(payload, indent=2).encode("utf-8"))
+                with v.read_lock:
+                    terms, courses, debug = v.index.current()
+                gen = debug["generation"]
+                fields = parse_fields(query)
+                since = query.get("since", [""])[0].strip()
+                if since:
+                    delta = v.index.changes_since(as_int(since, -1))
+                    if delta is not None:
+                        payload = {
+                            "version": APP_VERSION,
+                            "generation": gen,
+                            "since": as_int(since),
+                            "full": False,
+                            "debug": debug,
+                            "terms": terms,
+                            "courses": [project_course(c, fields) for c in delta[0]],
+                            "removed": delta[1],
+                        }
+                        return send(self, 200, "application/json; charset=utf-8", jdump(payload, indent=ind).encode("utf-8"))
+
+                # El ETag depende también de la representación (fields/pretty).
+                variant = hashlib.sha1(f"{fields}|{ind}".encode("utf-8")).hexdigest()[:8]
+                etag = f'"{debug["etag"]}-{variant}"'
+                headers = {"ETag": etag, "Cache-Control": "no-cache"}
+                if etag_matches(self, etag):
+                    METRICS.inc("cache_lookups_total", cache="etag", result="hit")
+                    return send(self, 304, "application/json; charset=utf-8", b"", headers)
+                METRICS.inc("cache_lookups_total", cache="etag", result="miss")
+                payload = catalog_payload(terms, courses, debug, fields)
+                if since:
+                    payload["full"] = True
+                t0 = time.perf_counter()
+                body = jdump(payload, indent=ind).encode("utf-8")
+                METRICS.observe("serialize_ms", (time.perf_counter() - t0) * 1000, route="/api/all")
+                return send(self, 200, "application/json; charset=utf-8", body, headers)
+
+            if path == "/api/metrics":
+                if query.get("format", [""])[0] == "prometheus":
+                    return send(self, 200, "text/plain; version=0.0.4; charset=utf-8", METRICS.prometheus().encode("utf-8"))
+                if v is None:  # raíz del modo multi-vault: métricas del proceso
+                    out = dict(METRICS.snapshot(), vaults=registry.info())
+                else:
+                    out = dict(METRICS.snapshot(), watcher=v.watcher.mode, sse_clients=v.hub.count(), generation=v.index.generation)
+                return send(self, 200, "application/json; charset=utf-8", jdump(out, indent=ind).encode("utf-8"))
+
+            if path == "/api/search":
+                with v.read_lock:
+                    v.index.current()
+                apr = query_str(query, "aprobado").lower()
+                res = v.search.search(
+                    v.index,
+                    q=query_str(query, "q"),
+                    concentracion=query_str(query, "concentracion") or None,
+                    term=query_str(query, "term") or None,
+                    aprobado=True if apr in ("1", "true", "si", "sí", "yes") else False if apr in ("0", "false", "no") else None,
+                    limit=max(0, as_int(query_str(query, "limit") or 50, 50)),
+                )
+                return send(self, 200, "application/json; charset=utf-8", jdump(res, indent=ind).encode("utf-8"))
+
+            if path == "/api/stats":
+                with v.read_lock:
+                    terms, _, _ = v.index.current()
+                res = v.stats.compute(v.index, terms, sanitize_draft(v.drafts.get()))
+                return send(self, 200, "application/json; charset=utf-8", jdump(res, indent=ind).encode("utf-8"))
+
+            if path == "/api/graph":
+                g = self.graph()
+                payload = dict(g.to_dict(), generation=v.index.generation)
+                return send(self, 200, "application/json; charset=utf-8", jdump(payload, indent=ind).encode("utf-8"))
+
+            if path.startswith("/api/unlocks/"):
+                key = unquote(path[len("/api/unlocks/") :])
+                g = self.graph()
+                i = g.find(key)
+                if i is None:
+                    return send(
+                        self,
+                        404,
+                        "application/json; charset=utf-8",
+                        jdump({"error": f"sigla desconocida: {key}"}).encode("utf-8"),
+                    )
+                ids = g.unlocks(g.ids[i])
+                payload = dict(
+                    sigla=g.siglas[i],
+                    course_id=g.ids[i],
+                    level=g.levels[i],
+                    unlocks=ids,
+                    siglas=[g.siglas[g.pos[x]] for x in ids],
+                    count=len(ids),
+                )
+                return send(self, 200, "application/json; charset=utf-8", jdump(payload, indent=ind).encode("utf-8"))
 
             return send(self, 404, "application/json; charset=utf-8", jdump({"error": "unknown api"}).encode("utf-8"))
 
     return H
 
 
+# ---------- asyncio server ----------
+
+class _ConnShim:
+    """Socket mínimo para correr el handler sobre una petición ya leída.
+
+    ``makefile`` entrega la petición completa y ``sendall`` empuja cada escritura
+    al transporte asyncio (así SSE sigue siendo un stream)."""
+
+    def __init__(self, raw: bytes, push):
+        self._raw = raw
+        self._push = push
+
+    def makefile(self, mode, bufsize=None):
+        import io
+
+        return io.BytesIO(self._raw)
+
+    def sendall(self, data):
+        self._push(bytes(data))
+
+
+class _LoopSubscriber:
+    """Suscriptor de ``EventHub`` que entrega en una ``asyncio.Queue`` del loop.
+
+    ``put_nowait`` se llama desde cualquier thread; si la cola se llena se
+    vacía y queda un ``resync``, igual que con las colas de los threads.
+    """
+
+    def __init__(self, loop, maxsize=EventHub.QUEUE_MAX):
+        import asyncio
+
+        self.loop = loop
+        self.q = asyncio.Queue(maxsize)
+
+    def put_nowait(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            pass  # loop cerrado
+
+    def _put(self, item):
+        import asyncio
+
+        try:
+            self.q.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.q.empty():
+                self.q.get_nowait()
+            self.q.put_nowait(("resync", {}))
+
+
+class AsyncHTTPServer:
+    """Servidor HTTP/1.1 sobre asyncio (solo stdlib) con conexiones persistentes.
+
+    Un lector por conexión parsea las peticiones a medida que llegan (pipelining)
+    y las encola; se atienden en orden con el mismo handler de ``handler_factory``
+    en un pool de threads, y las respuestas salen en el mismo orden. Las
+    escrituras del handler esperan el ``drain()`` del transporte. Los streams
+    SSE (``/api/events``) no retienen un thread: el handler responde los
+    headers y el stream sigue como corrutina en el loop.
+    Interfaz compatible con ``ThreadingHTTPServer`` (``serve_forever``,
+    ``shutdown``, ``server_close``, ``server_address``).
+    """
+
+    KEEPALIVE = 30.0  # segundos de inactividad antes de cerrar la conexión
+    MAX_HEADER = 64 * 1024
+    PIPELINE = 16  # peticiones leídas por adelantado por conexión
+
+    def __init__(self, server_address, handler_cls, workers=64):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.server_address = server_address
+        self.handler_cls = type(
+            "AsyncHandler",
+            (handler_cls,),
+            # Una petición por instancia: la conexión (y el keep-alive) la maneja el loop.
+            {"protocol_version": "HTTP/1.1", "handle": handler_cls.handle_one_request},
+        )
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="malla-http")
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+        self.connections = 0
+
+    def serve_forever(self):
+        import asyncio
+
+        asyncio.run(self._main())
+
+    def shutdown(self):
+        self._ready.wait(5)
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def server_close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def sse_subscriber(self):
+        # Lo pide el handler de /api/events (desde un thread del pool).
+        return _LoopSubscriber(self._loop)
+
+    async def _write(self, writer, data: bytes):
+        writer.write(data)
+        await writer.drain()
+
+    async def _sse(self, writer, requests, sse):
+        """Stream SSE en el loop hasta que el cliente cierre o se detenga el servidor."""
+        import asyncio
+
+        v, sub = sse["v"], sse["q"]
+        eof = asyncio.ensure_future(requests.get())  # None: el cliente cerró la conexión
+        try:
+            while not v.watcher.stop_event.is_set() and not self._stop.is_set():
+                get = asyncio.ensure_future(sub.q.get())
+                done, _ = await asyncio.wait({get, eof}, timeout=15, return_when=asyncio.FIRST_COMPLETED)
+                if eof in done:
+                    get.cancel()
+                    break
+                if get in done:
+                    event, data = get.result()
+                    chunk = sse_event(event, data, sse["fields"])
+                else:
+                    get.cancel()
+                    chunk = b": ping\n\n"
+                await self._write(writer, chunk)
+        except (ConnectionError, RuntimeError):
+            pass
+        finally:
+            eof.cancel()
+            v.hub.unsubscribe(sub)
+            sse["release"]()
+
+    async def _main(self):
+        import asyncio
+
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        host, port = self.server_address
+        server = await asyncio.start_server(self._client, host, port, limit=self.MAX_HEADER)
+        self.server_address = server.sockets[0].getsockname()[:2]
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+
+    async def _read_chunked(self, reader) -> bytes:
+        # Transfer-Encoding: chunked -> body completo (los trailers se descartan).
+        parts = []
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise ValueError("chunk inválido") from None
+            if size < 0:
+                raise ValueError("chunk inválido")
+            if size == 0:
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                return b"".join(parts)
+            parts.append(await reader.readexactly(size))
+            if await reader.readexactly(2) != b"\r\n":
+                raise ValueError("chunk inválido")
+
+    async def _read_requests(self, reader, queue):
+        import asyncio
+
+        try:
+            while True:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.KEEPALIVE)
+                lines = head[:-4].split(b"\r\n")
+                n, te = 0, None
+                for line in lines[1:]:
+                    k, _, v = line.partition(b":")
+                    k = k.strip().lower()
+                    if k == b"content-length":
+                        n = as_int(v.decode("latin-1"), 0)
+                    elif k == b"transfer-encoding":
+                        te = v.strip().lower()
+                if te is None:
+                    body = await reader.readexactly(n) if n > 0 else b""
+                    await queue.put(head + body)
+                    continue
+                if te != b"chunked":
+                    await queue.put(501)  # otras codificaciones no se soportan
+                    return
+                try:
+                    body = await self._read_chunked(reader)
+                except ValueError:
+                    await queue.put(400)
+                    return
+                # El handler lee por Content-Length: se reescribe el header.
+                keep = [
+                    line
+                    for line in lines
+                    if line.partition(b":")[0].strip().lower() not in (b"content-length", b"transfer-encoding")
+                ]
+                keep.append(b"Content-Length: %d" % len(body))
+                await queue.put(b"\r\n".join(keep) + b"\r\n\r\n" + body)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            await queue.put(None)
+
+    async def _client(self, reader, writer):
+        import asyncio
+
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.PIPELINE)
+        producer = asyncio.create_task(self._read_requests(reader, queue))
+        peer = writer.get_extra_info("peername") or ("127.0.0.1", 0)
+
+        def push(data):
+            # Desde el thread del handler: espera el drain() (un cliente lento frena al
+            # handler en vez de llenar el buffer); una conexión cerrada se reporta como tal.
+            if writer.is_closing():
+                raise ConnectionResetError("conexión cerrada")
+            try:
+                asyncio.run_coroutine_threadsafe(self._write(writer, data), loop).result(self.KEEPALIVE)
+            except RuntimeError:
+                raise ConnectionResetError("servidor detenido") from None
+            except TimeoutError:
+                writer.transport.abort()
+                raise ConnectionResetError("cliente sin leer") from None
+
+        def run(raw):
+            h = self.handler_cls(_ConnShim(raw, push), peer[:2], self)
+            return h.close_connection, h.sse
+
+        try:
+            while True:
+                raw = await queue.get()
+                if raw is None or writer.is_closing():
+                    break
+                if isinstance(raw, int):
+                    # Body que no se puede delimitar: se responde el error y se cierra.
+                    reason = {400: "Bad Request", 501: "Not Implemented"}[raw]
+                    writer.write(f"HTTP/1.1 {raw} {reason}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+                    await writer.drain()
+                    break
+                close, sse = await loop.run_in_executor(self.pool, run, raw)
+                await writer.drain()
+                if sse is not None:
+                    await self._sse(writer, queue, sse)
+                    break
+                if close:
+                    break
+        except (ConnectionError, RuntimeError, asyncio.CancelledError):
+            pass  # cliente desconectado o servidor deteniéndose
+        finally:
+            producer.cancel()
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except (Exception, asyncio.CancelledError):
+                pass
+
+
+# ---------- headless ----------
+
+# Colores y orden de las concentraciones (CAT de app.js) para el export HTML.
+CAT_STYLE = {
+    "MScB": ("#FFCA08", 0),
+    "M": ("#F1592A", 1),
+    "m": ("#D8DD26", 2),
+    "FI": ("#56A2D6", 3),
+    "OFG": ("#7389C5", 4),
+    "ex": ("#CCCCCC", 5),
+}
+CAT_KEY = {"MSCB": "MScB", "FI": "FI", "OFG": "OFG", "EX": "ex", "M": "M"}
+
+EXPORT_COLUMNS = (
+    "course_id", "term_id", "placement", "sigla", "nombre", "creditos", "aprobado",
+    "concentracion", "prerrequisitos", "semestreOfrecido", "is_temp", "error",
+)
+
+EXPORT_CSS = """
+body{font-family:system-ui,-apple-system,Segoe UI,Roboto,Arial,sans-serif;margin:14px;color:#111}
+.grid{display:flex;gap:10px;align-items:flex-start;overflow-x:auto}
+.term{min-width:180px;max-width:220px;background:#fafafa;border:1px solid #ddd;border-radius:10px;padding:8px}
+.term h2{font-size:15px;margin:0 0 6px}.term .sum{color:#666;font-size:12px;margin-top:6px}
+.course{background:#fff;border:1px solid #ddd;border-left:6px solid var(--cat);border-radius:8px;padding:5px 7px;margin:5px 0;font-size:12px}
+.course .cr{float:right;color:#666}.course.aprobado{border-color:#2f8f3a;border-left-color:var(--cat)}
+.course.aprobado b::after{content:" ✓";color:#2f8f3a}.course.temp{border-style:dashed}
+.course.bad{background:#ffe6e6}.muted{color:#666;font-size:12px}
+"""
+
+
+def norm_cat(raw) -> str:
+    # Como normalizeCat() de app.js.
+    s = str(raw or "").strip()
+    if s in ("m", "M"):
+        return s
+    return CAT_KEY.get(s.upper(), "ex") if s else "ex"
+
+
+def draft_overrides(draft: dict) -> set:
+    return {str(x).strip() for x in draft.get("overrides") or [] if str(x or "").strip()}
+
+
+def draft_placements(draft: dict) -> dict:
+    return {str(k): str(v).strip() for k, v in (draft.get("placements") or {}).items() if str(v or "").strip()}
+
+
+def export_row(c, placements: dict) -> dict:
+    d = c.to_dict(raw=False) if isinstance(c, Course) else {k: v for k, v in c.items() if k != "frontmatter"}
+    d["placement"] = placements.get(str(d.get("course_id")), d.get("term_id"))
+    return d
+
+
+def iter_export(b: Path, draft: dict, roots: list, stats: Counter):
+    """Filas del catálogo con el borrador aplicado (ubicación, cursos
+    reemplazados y temporales), en streaming."""
+    hidden, placements = draft_overrides(draft), draft_placements(draft)
+    for _, c in iter_courses(b, roots):
+        stats["courses"] += 1
+        stats["errors"] += c.error is not None
+        if c.course_id not in hidden:
+            yield export_row(c, placements)
+    for c in merge_temp_courses([], draft):
+        stats["temp"] += 1
+        yield export_row(c, placements)
+
+
+def export_json(b: Path, draft: dict, out, stats: Counter):
+    roots = term_roots(b, find_terms(b)[0])
+    out.write('{"app_version": %s, "courses": [' % jdump(APP_VERSION))
+    for i, row in enumerate(iter_export(b, draft, roots, stats)):
+        out.write(("," if i else "") + "\n" + jdump(row))
+    out.write('\n], "terms": %s}\n' % jdump(effective_terms([t for t, _ in roots], draft)))
+
+
+def export_csv(b: Path, draft: dict, out, stats: Counter):
+    import csv
+
+    w = csv.writer(out, lineterminator="\n")
+    w.writerow(EXPORT_COLUMNS)
+    for row in iter_export(b, draft, term_roots(b, find_terms(b)[0]), stats):
+        vals = []
+        for k in EXPORT_COLUMNS:
+            v = row.get(k)
+            if isinstance(v, list):
+                v = "; ".join(str(x) for x in v)
+            elif isinstance(v, bool):
+                v = "true" if v else "false"
+            vals.append("" if v is None else v)
+        w.writerow(vals)
+
+
+def _term_of(relp: str, roots: list) -> str:
+    parts = Path(relp).parts
+    for t, _ in roots:
+        rp = Path(t.searchRootRel).parts
+        if parts[: len(rp)] == rp:
+            return t.term_id
+    return ""
+
+
+def _html_card(c, moved_from=None) -> str:
+    import html
+
+    color = CAT_STYLE[norm_cat(c.get("concentracion"))][0]
+    cls = "course"
+    if c.get("aprobado") is True:
+        cls += " aprobado"
+    if c.get("is_temp"):
+        cls += " temp"
+    if c.get("error"):
+        cls += " bad"
+    title = c.get("error") or (f"desde {moved_from}" if moved_from else "")
+    return (
+        f'<div class="{cls}" style="--cat:{color}" title="{html.escape(str(title))}">'
+        f'<b>{html.escape(str(c.get("sigla") or ""))}</b><span class="cr">{html.escape(str(c.get("creditos") or 0))}</span>'
+        f'<div>{html.escape(str(c.get("nombre") or ""))}</div></div>'
+    )
+
+
+def export_html(b: Path, draft: dict, out, stats: Counter):
+    """Foto estática de la malla: una columna por período con el borrador aplicado.
+
+    Las notas se leen período a período; solo los cursos que el borrador mueve
+    (y los temporales) se cargan antes, así la memoria depende del borrador y
+    del período más grande, no del tamaño del vault.
+    """
+    import html
+
+    roots = term_roots(b, find_terms(b)[0])
+    hidden, placements = draft_overrides(draft), draft_placements(draft)
+    extra = {}  # term_id -> [(curso, período de origen)]
+    for cid, tid in placements.items():
+        md = b / cid
+        if cid in hidden or not md.is_file():
+            continue
+        src = _term_of(cid, roots)
+        extra.setdefault(tid, []).append((read_course(md, cid, src), src if src != tid else None))
+    for c in merge_temp_courses([], draft):
+        stats["temp"] += 1
+        tid = placements.get(c["course_id"]) or str(c.get("term_id") or "")
+        extra.setdefault(tid, []).append((c, None))
+
+    by_term = {}
+    for t, root in roots:
+        by_term.setdefault(t.term_id, []).append(root)
+    terms = [t["term_id"] for t in effective_terms([t for t, _ in roots], draft)]
+    terms += [tid for tid in extra if tid not in terms]
+
+    name = b.name or str(b)
+    out.write(
+        '<!doctype html><html lang="es"><head><meta charset="utf-8"/>'
+        f"<title>Malla — {html.escape(name)}</title><style>{EXPORT_CSS}</style></head><body>"
+        f'<h1>Malla — {html.escape(name)}</h1><div class="grid">\n'
+    )
+    total = approved = 0
+    for tid in terms:
+        cards = list(extra.pop(tid, []))
+        for root in by_term.get(tid, []):
+            for md in sorted(root.rglob("*.md")):
+                c = read_course(md, rel(md, b), tid)
+                stats["courses"] += 1
+                stats["errors"] += c.error is not None
+                if c.course_id not in hidden and c.course_id not in placements:
+                    cards.append((c, None))
+        cards.sort(key=lambda x: (CAT_STYLE[norm_cat(x[0].get("concentracion"))][1], str(x[0].get("sigla") or "")))
+        credits = sum(num(c.get("creditos")) for c, _ in cards)
+        done = sum(num(c.get("creditos")) for c, _ in cards if c.get("aprobado") is True)
+        total, approved = total + credits, approved + done
+        out.write(
+            f'<section class="term"><h2>{html.escape(tid or "Sin período")}</h2>'
+            + "".join(_html_card(c, src) for c, src in cards)
+            + f'<div class="sum">{len(cards)} cursos · {credits} créditos</div></section>\n'
+        )
+    out.write(
+        f'</div><p class="muted">{approved} de {total} créditos aprobados · '
+        f"{html.escape(APP_NAME)} v{html.escape(APP_VERSION)} · {date.today().isoformat()}</p></body></html>\n"
+    )
+
+
+def scan_vault(b: Path, out, stats: Counter, fields=None):
+    # Un curso por línea (JSON), tal como lo entrega /api/all, sin borrador.
+    seen = set()
+    for t, c in iter_courses(b):
+        seen.add(t.term_id)
+        stats["courses"] += 1
+        stats["errors"] += c.error is not None
+        out.write(jdump(project_course(c, fields)) + "\n")
+    stats["terms"] = len(seen)
+
+
+def validate_vault(b: Path, draft: dict, emit, stats: Counter):
+    """Valida el vault con las reglas de la UI y llama ``emit(problema)``.
+
+    - ``error``: notas que no se pudieron leer, siglas duplicadas, prerrequisitos
+      o correquisitos desconocidos y los warnings hard del borrador (sobrecarga,
+      prerrequisito mal ordenado, correquisito separado).
+    - ``warning``: el resto de los warnings (p. ej. ``semestreOfrecido``).
+
+    Las notas se recorren en streaming; para los warnings se guarda solo un
+    resumen liviano de cada curso. Los warnings ignorados en el borrador no se
+    reportan.
+    """
+    roots = term_roots(b, find_terms(b)[0])
+    hidden = draft_overrides(draft)
+    seen, slim = {}, []
+
+    def issue(level, code, where, text):
+        stats[level] += 1
+        emit(dict(level=level, code=code, where=where, text=text))
+
+    def check_sigla(c):
+        key = norm_sigla(c.get("sigla"))
+        if not key:
+            return
+        if key in seen:
+            issue("error", "sigla:duplicate", c["course_id"], f"Sigla duplicada: {c.get('sigla')} (también en {seen[key]})")
+        else:
+            seen[key] = c["course_id"]
+
+    for _, c in iter_courses(b, roots):
+        stats["courses"] += 1
+        if c.error is not None:
+            issue("error", "parse", c.course_id, c.error)
+        if c.course_id in hidden:
+            continue
+        check_sigla(c)
+        slim.append(_slim_course(c))
+    for c in merge_temp_courses([], draft):
+        stats["temp"] += 1
+        check_sigla(c)
+
+    eng = WarningEngine(slim, [t for t, _ in roots], draft)
+    for w in eng.warnings():
+        if w["ignored"]:
+            stats["ignored"] += 1
+            continue
+        code = re.match(r"[a-z]+(?::(?:unknown|missing|hard|soft))?", w["id"]).group(0)
+        level = "error" if w["kind"] == "hard" or code.endswith(":unknown") else "warning"
+        issue(level, code, w.get("course_id") or w.get("term_id") or "", w.get("text") or "")
+    stats["terms"] = len(roots)
+
+
+def run_headless(args) -> int:
+    """``scan`` / ``validate`` / ``export`` sin servidor ni navegador (para CI)."""
+    t0 = time.perf_counter()
+    b = Path(args.base).resolve() if args.base else basedir()
+    if not b.is_dir():
+        print(f"[{APP_NAME}] No existe el vault: {b}", file=sys.stderr)
+        return 2
+    draft = draft_default() if args.cmd == "scan" or args.no_draft else load_draft(b)
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    stats, code = Counter(), 0
+    try:
+        if args.cmd == "scan":
+            fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None
+            scan_vault(b, out, stats, fields)
+        elif args.cmd == "validate":
+
+            def emit(p):
+                if args.json:
+                    out.write(jdump(p) + "\n")
+                else:
+                    out.write(f"{p['level'].upper():7} {p['code']:16} {p['where']}  {p['text']}\n")
+
+            validate_vault(b, draft, emit, stats)
+            code = 1 if stats["error"] or (args.strict and stats["warning"]) else 0
+        else:
+            dict(json=export_json, csv=export_csv, html=export_html)[args.format](b, draft, out, stats)
+        out.flush()
+    except BrokenPipeError:
+        return 0  # p. ej. `malla_app scan | head`
+    finally:
+        if args.out:
+            out.close()
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(stats.items())) or "vacío"
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"[{APP_NAME}] {args.cmd}: {summary} ({ms:.0f} ms)", file=sys.stderr)
+    return code
+
+
+# ---------- bench ----------
+
+def _fm_text(fm: dict) -> str:
+    # Estilo de bloque ("key: value" y listas "- item"): lo leen PyYAML y el parser mínimo.
+    lines = []
+    for k, v in fm.items():
+        if isinstance(v, list):
+            lines.append(f"{k}:")
+            lines.extend(f"  - {x}" for x in v)
+        elif isinstance(v, bool):
+            lines.append(f"{k}: {'true' if v else 'false'}")
+        else:
+            lines.append(f"{k}: {v}")
+    return "\n".join(lines)
+
+
+def make_vault(root: Path, terms=8, courses=40, body=2000, nested=0, seed=0) -> Path:
+    """Genera un vault sintético de ``terms`` × ``courses`` notas bajo ``root``.
+
+    ``body`` son los bytes de texto tras el frontmatter; con ``nested`` > 0 los
+    períodos quedan bajo esa cantidad de carpetas intermedias (más carpetas de
+    ruido), lo que obliga a ``find_terms`` a usar el recorrido de fallback.
+    """
+    cat_terms, cat_courses = synthetic_catalogue(terms * courses, seed, n_terms=terms)
+    base = root
+    for k in range(nested):
+        (base / f"ruido{k}" / "adjuntos").mkdir(parents=True, exist_ok=True)
+        base = base / f"nivel{k}"
+    filler = ("Lorem ipsum dolor sit amet, apuntes del curso. " * (body // 48 + 1))[:body]
+    for t in cat_terms:
+        (base / t["term_id"] / COURSE_DIRS[0]).mkdir(parents=True, exist_ok=True)
+    for c in cat_courses:
+        fm = dict(
+            sigla=c["sigla"],
+            nombre=c["nombre"],
+            creditos=c["creditos"],
+            aprobado=c["aprobado"],
+            concentracion=c["concentracion"],
+            prerrequisitos=c["prerrequisitos"],
+            semestreOfrecido=c["semestreOfrecido"],
+            notaObtenida=0,
+        )
+        md = base / c["fileRel"]
+        md.write_text(f"---\n{_fm_text(fm)}\n---\n\n{filler}\n", encoding="utf-8")
+    return root
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+def _stats(xs: list) -> dict:
+    xs = sorted(xs)
+    if not xs:
+        return {}
+
+    def pick(q):
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    return dict(n=len(xs), mean=round(sum(xs) / len(xs), 3), p50=pick(0.5), p95=pick(0.95), max=xs[-1])
+
+
+def _bench_http(b: Path, rounds: int, server="threading") -> dict:
+    import http.client
+
+    if server == "asyncio":
+        httpd = AsyncHTTPServer(("127.0.0.1", 0), handler_factory(b, None))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        httpd._ready.wait(10)
+    else:
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_factory(b, None))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    port = httpd.server_address[1]
+    keep = [None]  # con asyncio se reutiliza la conexión (keep-alive)
+
+    def get(path, headers=None):
+        t0 = time.perf_counter()
+        conn = keep[0] or http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        r = None
+        try:
+            conn.request("GET", path, headers=headers or {})
+            r = conn.getresponse()
+            body = r.read()
+            return _ms(t0), r.status, r.getheader("ETag"), len(body)
+        finally:
+            if server == "asyncio" and r is not None and not r.will_close:
+                keep[0] = conn
+            else:
+                conn.close()
+                keep[0] = None
+
+    try:
+        cold, _, etag, size = get("/api/all")
+        warm = [get("/api/all")[0] for _ in range(rounds)]
+        gz = [get("/api/all", {"Accept-Encoding": "gzip"}) for _ in range(rounds)]
+        revalidate = [get("/api/all", {"If-None-Match": etag})[0] for _ in range(rounds)] if etag else []
+        return dict(
+            all_cold_ms=cold,
+            all_bytes=size,
+            all_gzip_bytes=gz[0][3] if gz else None,
+            all_warm_ms=_stats(warm),
+            all_gzip_ms=_stats([x[0] for x in gz]),
+            all_304_ms=_stats(revalidate),
+        )
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _index_memory(root: Path) -> dict:
+    """Memoria que retiene un ``CourseIndex`` escaneado (tracemalloc) y, para
+    comparar, lo que ocuparían esos mismos cursos como dicts con el frontmatter."""
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        index = CourseIndex(root)
+        index.scan()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        n = len(index.courses or [])
+        mark = tracemalloc.get_traced_memory()[0]
+        as_dicts = [c.to_dict() if isinstance(c, Course) else dict(c) for c in index.courses or []]
+        dicts = tracemalloc.get_traced_memory()[0] - mark
+    finally:
+        tracemalloc.stop()
+    del as_dicts
+    return dict(
+        courses=n,
+        index_bytes=retained - base,
+        index_peak_bytes=peak - base,
+        bytes_per_course=round((retained - base) / max(n, 1), 1),
+        dict_records_bytes=dicts,
+    )
+
+
+def run_bench(
+    terms=8, courses=40, body=2000, nested=0, parser="both", rounds=20, workers=None, seed=0, keep=None, server="threading"
+):
+    """Mide generación, parseo, descubrimiento (frío/tibio) y ``/api/all`` por HTTP.
+
+    ``parser``: ``"yaml"``, ``"fallback"`` o ``"both"``. Devuelve un dict listo
+    para serializar (se compara entre versiones por ``app_version``).
+    """
+    import platform
+    import shutil
+    import tempfile
+
+    global _yaml_probe
+    root = Path(keep) if keep else Path(tempfile.mkdtemp(prefix="malla_bench_"))
+    root.mkdir(parents=True, exist_ok=True)
+    out = dict(
+        app_version=APP_VERSION,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        yaml_available=yaml_support() is not None,
+        params=dict(
+            terms=terms, courses=courses, body=body, nested=nested, rounds=rounds, workers=workers, seed=seed, server=server
+        ),
+        generate_ms=None,
+        results={},
+    )
+    saved_probe = _yaml_probe
+    try:
+        t0 = time.perf_counter()
+        make_vault(root, terms, courses, body, nested, seed)
+        out["generate_ms"] = _ms(t0)
+        texts = [read_frontmatter(md) for md in sorted(root.rglob("*.md"))]
+
+        modes = ("yaml", "fallback") if parser == "both" else (parser,)
+        for mode in modes:
+            if mode == "yaml" and saved_probe is False:
+                out["results"][mode] = dict(skipped="PyYAML no disponible")
+                continue
+            _yaml_probe = saved_probe if mode == "yaml" else False
+            res = {}
+
+            t0 = time.perf_counter()
+            for fm in texts:
+                parse_frontmatter(fm)
+            res["parse_us_per_note"] = round((time.perf_counter() - t0) * 1e6 / max(len(texts), 1), 2)
+
+            t0 = time.perf_counter()
+            terms_out, courses_out, debug = discover_all(root, workers=workers, parse_procs=0)
+            res["discover_cold_ms"] = _ms(t0)
+            res["discover_mode"] = debug.get("mode")
+            res["courses_found"] = len(courses_out)
+            res["timings"] = debug.get("timings")
+
+            index = CourseIndex(root)
+            t0 = time.perf_counter()
+            index.scan()
+            res["index_cold_ms"] = _ms(t0)
+            t0 = time.perf_counter()
+            index.scan()
+            res["index_warm_ms"] = _ms(t0)
+            res["memory"] = _index_memory(root)
+
+            for f in root.glob(CACHE_FILE + "*"):
+                f.unlink()
+            res["http"] = _bench_http(root, rounds, server)
+            t0 = time.perf_counter()
+            cached = CourseIndex(root, cache=CatalogCache(root / CACHE_FILE))
+            cached.load_cache()
+            res["sqlite_cold_start_ms"] = _ms(t0)
+            out["results"][mode] = res
+    finally:
+        _yaml_probe = saved_probe
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+    return out
+
+
 def find_free_port(host="127.0.0.1", start=8787, attempts=80):
     import socket
 
@@ -607,14 +5250,159 @@ def find_free_port(host="127.0.0.1", start=8787, attempts=80):
     raise RuntimeError("No se encontró un puerto libre.")
 
 
-def main():
+def parse_args(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog=APP_NAME, description="Servidor local de la malla curricular.")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=DISCOVERY["workers"],
+        help="threads de I/O para el descubrimiento (0 = automático, 1 = secuencial)",
+    )
+    ap.add_argument(
+        "--parse-procs",
+        type=int,
+        default=DISCOVERY["parse_procs"],
+        help="procesos para parsear YAML en paralelo (0 = desactivado)",
+    )
+    ap.add_argument(
+        "--scenario-procs",
+        type=int,
+        default=SCENARIOS["procs"],
+        help="procesos para evaluar escenarios en paralelo (0 = en el proceso principal)",
+    )
+    ap.add_argument(
+        "--access-log",
+        metavar="FILE",
+        help="access log estructurado (una línea JSON por request) en FILE, o '-' para stdout",
+    )
+    ap.add_argument(
+        "--server",
+        choices=("threading", "asyncio"),
+        default="threading",
+        help="backend HTTP: threading (HTTP/1.0, un thread por conexión) o asyncio (HTTP/1.1 keep-alive)",
+    )
+    ap.add_argument(
+        "--dev",
+        action="store_true",
+        help="modo desarrollo: la UI se relee si cambia en disco y no se cachea en el navegador",
+    )
+    ap.add_argument(
+        "--bundle",
+        action="store_true",
+        help="servir la UI como un solo bundle.js armado al arrancar (sin cascada de imports)",
+    )
+    ap.add_argument(
+        "--inline-data",
+        action="store_true",
+        help="embeber config, catálogo y borrador en index.html (window.__MALLA_BOOT__)",
+    )
+    ap.add_argument(
+        "--vault",
+        action="append",
+        metavar="NOMBRE=RUTA",
+        help="servir varios vaults desde un proceso, cada uno en /v/NOMBRE/ (repetible)",
+    )
+    ap.add_argument(
+        "--max-vaults",
+        type=int,
+        default=4,
+        help="con --vault: índices de vault en memoria a la vez; los ociosos se descargan (LRU)",
+    )
+    sub = ap.add_subparsers(dest="cmd")
+    bn = sub.add_parser("bench", help="genera un vault sintético y mide descubrimiento y /api/all (salida JSON)")
+    bn.add_argument("--terms", type=int, default=8, help="períodos del vault sintético")
+    bn.add_argument("--courses", type=int, default=40, help="cursos por período")
+    bn.add_argument("--body", type=int, default=2000, help="bytes de texto por nota tras el frontmatter")
+    bn.add_argument("--nested", type=int, default=0, help="carpetas intermedias sobre los períodos (0-4)")
+    bn.add_argument("--parser", choices=("yaml", "fallback", "both"), default="both")
+    bn.add_argument("--rounds", type=int, default=20, help="requests HTTP por medición")
+    bn.add_argument("--seed", type=int, default=0)
+    bn.add_argument("--keep", metavar="DIR", help="generar el vault en DIR y no borrarlo")
+    bn.add_argument("--out", metavar="FILE", help="escribir el JSON en FILE además de stdout")
+    bp = sub.add_parser("bench-plan", help="mide el planificador sobre catálogos sintéticos")
+    bp.add_argument("--sizes", default="500,1000,2000", help="tamaños de catálogo separados por coma")
+    bp.add_argument("--seed", type=int, default=0)
+    hl = argparse.ArgumentParser(add_help=False)
+    hl.add_argument("--base", metavar="DIR", help="carpeta del vault (por defecto, la del ejecutable)")
+    hl.add_argument("--out", metavar="FILE", help="escribir en FILE en vez de stdout")
+    sc = sub.add_parser("scan", parents=[hl], help="recorre el vault y escribe un curso por línea (JSON), sin servidor")
+    sc.add_argument("--fields", help="campos separados por coma, como ?fields= de /api/all")
+    va = sub.add_parser(
+        "validate",
+        parents=[hl],
+        help="reporta notas ilegibles, siglas duplicadas o desconocidas y warnings del borrador (1 si hay errores)",
+    )
+    va.add_argument("--json", action="store_true", help="un problema por línea en JSON")
+    va.add_argument("--strict", action="store_true", help="los warnings también hacen fallar")
+    va.add_argument("--no-draft", action="store_true", help="ignorar malla_draft.json")
+    ex = sub.add_parser("export", parents=[hl], help="exporta el catálogo con el borrador aplicado (json, csv o html)")
+    ex.add_argument("--format", choices=("json", "csv", "html"), default="json")
+    ex.add_argument("--no-draft", action="store_true", help="ignorar malla_draft.json")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    DISCOVERY.update(workers=max(0, args.workers), parse_procs=max(0, args.parse_procs))
+    SCENARIOS.update(procs=max(0, args.scenario_procs))
+
+    if args.cmd == "bench":
+        res = run_bench(
+            terms=max(1, args.terms),
+            courses=max(1, args.courses),
+            body=max(0, args.body),
+            nested=max(0, min(4, args.nested)),
+            parser=args.parser,
+            rounds=max(1, args.rounds),
+            workers=args.workers or None,
+            seed=args.seed,
+            keep=args.keep,
+            server=args.server,
+        )
+        text = jdump(res, indent=2)
+        if args.out:
+            Path(args.out).write_text(text + "\n", encoding="utf-8")
+        print(text)
+        return
+
+    if args.cmd == "bench-plan":
+        sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+        print(jdump(bench_planner(sizes, args.seed), indent=2))
+        return
+
+    if args.cmd in ("scan", "validate", "export"):
+        sys.exit(run_headless(args))
+
+    if args.access_log:
+        METRICS.access_log = sys.stdout if args.access_log == "-" else open(args.access_log, "a", encoding="utf-8")
+
+    vaults = {}
+    for spec in args.vault or []:
+        try:
+            name, p = parse_vault_spec(spec)
+        except ValueError as e:
+            sys.exit(f"[{APP_NAME}] {e}")
+        if name in vaults:
+            sys.exit(f"[{APP_NAME}] vault repetido: {name}")
+        vaults[name] = p
+
     b = basedir()
     ui = pick_ui_dir(b)
     port = find_free_port()
-    httpd = ThreadingHTTPServer(("127.0.0.1", port), handler_factory(b, ui))
+    server_cls = AsyncHTTPServer if args.server == "asyncio" else ThreadingHTTPServer
+    handler = handler_factory(
+        b, ui, dev=args.dev, bundle=args.bundle, inline_data=args.inline_data, vaults=vaults, max_loaded=args.max_vaults
+    )
+    httpd = server_cls(("127.0.0.1", port), handler)
 
     url = f"http://127.0.0.1:{port}/"
-    print(f"[{APP_NAME} v{APP_VERSION}] Base dir: {b}")
+    if vaults:
+        for name, p in vaults.items():
+            print(f"[{APP_NAME} v{APP_VERSION}] Vault {name}: {p} -> {url}v/{name}/")
+    else:
+        print(f"[{APP_NAME} v{APP_VERSION}] Base dir: {b}")
     print(f"[{APP_NAME}] UI dir: {ui if ui else '(missing)'}")
     print(f"[{APP_NAME}] Servidor en: {url}")
 
@@ -629,8 +5417,12 @@ def main():
         pass
     finally:
         httpd.server_close()
+        shutdown_pools()
         print(f"[{APP_NAME}] Cerrado.")
 
 
 if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()  # pool de parseo dentro del exe de PyInstaller
     main()
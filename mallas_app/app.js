@@ -4,7 +4,7 @@
 // - Warnings (soft/hard) + ignorar persistente (draft)
 // - Unlock view: click en curso -> resalta + parpadea lo que desbloquea
 
-import { byId } from "./modules/utils.js";
+import { byId, jsonDiff } from "./modules/utils.js";
 import { showNotice, hideNotice } from "./modules/toasts.js";
 import * as api from "./modules/api.js";
 import { state, setData, rebuildMaps } from "./modules/state.js";
@@ -76,9 +76,7 @@ function normalizeCat(raw){
   return CAT_KEY[s.toUpperCase()] || "ex";
 }
 function getCatInfo(course){
-  const fm = course?.frontmatter;
-  const raw = course?.concentracion ?? fm?.concentracion ?? fm?.["concentración"] ?? "ex";
-  return CAT[normalizeCat(raw)] || CAT.ex;
+  return CAT[normalizeCat(course?.concentracion)] || CAT.ex;
 }
 
 let _legendDone = false;
@@ -189,6 +187,7 @@ async function loadAll() {
   state._realCourses = Array.isArray(all?.courses) ? all.courses : [];
 
   setData({ config, all, draft });
+  markDraftSynced();
   mergeCoursesWithTemps();
 
   $("ver").textContent = state.all?.version || "";
@@ -202,6 +201,65 @@ async function loadAll() {
   updateDraftButtons();
 }
 
+// ---------- live updates (SSE) ----------
+// El backend empuja deltas por curso (/api/events) cuando cambia el vault;
+// se parchea state en vez de volver a pedir /api/all completo.
+function applyCatalogDelta(delta) {
+  if (!state.all || !delta) return;
+  const byId = new Map();
+  for (const c of (Array.isArray(state._realCourses) ? state._realCourses : [])) {
+    if (c && c.course_id != null) byId.set(String(c.course_id), c);
+  }
+  for (const id of (Array.isArray(delta.removed) ? delta.removed : [])) byId.delete(String(id));
+  const changed = [].concat(delta.added || [], delta.updated || []);
+  for (const c of changed) {
+    if (c && c.course_id != null) byId.set(String(c.course_id), c);
+  }
+  state._realCourses = Array.from(byId.values());
+  if (Array.isArray(delta.terms)) state.all.terms = delta.terms;
+  if (delta.generation != null) state.all.generation = delta.generation;
+
+  mergeCoursesWithTemps();
+  $("debugPre").textContent = JSON.stringify(state.all, null, 2);
+  fullRenderMod();
+}
+
+async function reloadCatalog() {
+  // Unlike loadAll(), keeps the in-memory draft (it may have unsaved changes).
+  const gen = state.all?.generation;
+  const all = await api.getAll(gen);
+  if (all && all.full === false) {
+    applyCatalogDelta({
+      generation: all.generation,
+      updated: all.courses,
+      removed: all.removed,
+      terms: all.terms,
+    });
+    return;
+  }
+  state._realCourses = Array.isArray(all?.courses) ? all.courses : [];
+  state.all = all;
+  mergeCoursesWithTemps();
+  $("debugPre").textContent = JSON.stringify(state.all, null, 2);
+  fullRenderMod();
+}
+
+let _events = null;
+function initLiveUpdates() {
+  if (_events) return;
+  _events = api.subscribeEvents({
+    // If /api/all was served from the on-disk cache before validation, the
+    // corrections may have been published before we subscribed: catch up.
+    hello: () => {
+      if (state.all?.debug?.cache?.validated === false) {
+        reloadCatalog().catch((e) => console.warn("[events] catch-up failed", e));
+      }
+    },
+    delta: (d) => applyCatalogDelta(d),
+    resync: () => reloadCatalog().catch((e) => console.warn("[events] resync failed", e)),
+  });
+}
+
 let _materializeAllClickHandler = null;
 function syncMaterializeAllHandler() {
   const btn = $("materializeAllTemps");
@@ -510,6 +568,26 @@ function moveTempCourseToDisk(course) {
   showNotice("soft", `Mover a disco aún no está disponible para ${label}.`);
 }
 
+// Body for /api/materialize (and each item of /api/materialize/batch).
+function materializePayload(course) {
+  const cid = String(course?.course_id || "").trim();
+  const placementTid = (state.draft?.placements && state.draft.placements[cid]) || course.term_id;
+  const fm = course.frontmatter && typeof course.frontmatter === "object" ? course.frontmatter : {};
+  return {
+    course_id: cid,
+    override_of: course.override_of,
+    term_id: String(placementTid || "").trim(),
+    sigla: course.sigla || fm.sigla,
+    nombre: course.nombre || fm.nombre,
+    creditos: course.creditos ?? course.créditos ?? fm.creditos ?? fm.créditos,
+    aprobado: course.aprobado ?? fm.aprobado,
+    concentracion: course.concentracion ?? course.concentración ?? fm.concentracion ?? fm["concentración"],
+    prerrequisitos: course.prerrequisitos ?? fm.prerrequisitos,
+    semestreOfrecido: course.semestreOfrecido ?? fm.semestreOfrecido,
+    frontmatter: fm,
+  };
+}
+
 async function materializeTempCourse(course) {
   const cid = String(course?.course_id || "").trim();
   if (!cid || !course) {
@@ -521,26 +599,12 @@ async function materializeTempCourse(course) {
     return;
   }
 
-  const placementTid = (state.draft?.placements && state.draft.placements[cid]) || course.term_id;
-  const term_id = String(placementTid || "").trim();
-  if (!term_id) {
+  const payload = materializePayload(course);
+  if (!payload.term_id) {
     showNotice("hard", "El curso temporal no tiene período asignado.");
     return;
   }
 
-  const fm = course.frontmatter && typeof course.frontmatter === "object" ? course.frontmatter : {};
-  const payload = {
-    term_id,
-    sigla: course.sigla || fm.sigla,
-    nombre: course.nombre || fm.nombre,
-    creditos: course.creditos ?? course.créditos ?? fm.creditos ?? fm.créditos,
-    aprobado: course.aprobado ?? fm.aprobado,
-    concentracion: course.concentracion ?? course.concentración ?? fm.concentracion ?? fm["concentración"],
-    prerrequisitos: course.prerrequisitos ?? fm.prerrequisitos,
-    semestreOfrecido: course.semestreOfrecido ?? fm.semestreOfrecido,
-    frontmatter: fm,
-  };
-
   try {
     // Backward-compatible: some deployments may not expose materializeCourse yet.
     const materializeFn =
@@ -567,11 +631,12 @@ async function materializeTempCourse(course) {
     }
 
     state.dirtyDraft = true;
-    await api.saveDraft(state.draft || {});
+    await persistDraft();
     state.dirtyDraft = false;
 
     const [all, draft] = await Promise.all([api.getAll(), api.getDraft()]);
     setData({ config: state.config, all, draft });
+    markDraftSynced();
     mergeCoursesWithTemps();
     updateDraftButtons();
     fullRenderMod();
@@ -608,10 +673,25 @@ async function materializeAllTempCourses() {
   updateDraftButtons();
 
   try {
-    for (const course of list) {
-      await materializeTempCourse(course);
+    // One round trip: the backend validates the whole batch, writes the .md files
+    // and drops the written temp courses from the draft in a single update.
+    await persistDraft();
+    const res = await api.materializeBatch(list.map(materializePayload));
+
+    const [all, draft] = await Promise.all([api.getAll(), api.getDraft()]);
+    state._realCourses = Array.isArray(all?.courses) ? all.courses : [];
+    setData({ config: state.config, all, draft });
+    markDraftSynced();
+    state.dirtyDraft = false;
+    mergeCoursesWithTemps();
+    fullRenderMod();
+
+    const failed = (res?.results || []).filter((r) => !r.ok);
+    if (failed.length) {
+      showNotice("soft", `Guardados ${res.written} de ${list.length}. Error: ${failed[0].error}`);
+    } else {
+      showNotice("info", "Cursos temporales guardados en disco.");
     }
-    showNotice("info", "Cursos temporales guardados en disco.");
   } catch (e) {
     showNotice("hard", String(e?.message || e));
   } finally {
@@ -696,6 +776,157 @@ function computeWarnings(terms, courses, placementsMap, draft, config) {
 }
 
 // ---------- render ----------
+// El grid se reconcilia en vez de reconstruirse: columnas y tarjetas quedan
+// cacheadas por term_id / course_id junto con una firma de su contenido.
+// Solo se recrea lo que cambió de firma y solo se mueven los nodos que
+// quedaron fuera de lugar (insertBefore mueve la tarjeta entre columnas).
+const RENDER_CACHE = { cols: new Map(), cards: new Map() };
+const RENDER_STATS = { requested: 0, frames: 0, last_ms: 0, avg_ms: 0, max_ms: 0, cards_built: 0, cards_reused: 0, cols_built: 0 };
+
+function courseSignature(c, cat, cw, draggable) {
+  return [
+    c.sigla, c.nombre, Number(c.creditos) || 0, c.aprobado === true, cat?.cls || "",
+    draggable, cw.slice(0, 3).map(w => w.kind).join(","), cw.some(w => w.kind === "hard"),
+  ].join("\u0001");
+}
+
+function buildCourseCard(c, cat, cw) {
+  const sigla = String(c.sigla || "").trim();
+  const nombre = String(c.nombre || "").trim();
+
+  const card = mk("div", "course");
+  if (cat?.cls) card.classList.add(cat.cls);
+
+  card.draggable = !!state.draftMode;
+  card.dataset.courseId = c.course_id;
+
+  const isApproved = (c.aprobado === true);
+  if (isApproved) card.classList.add("aprobado");
+
+  if (cw.some(w => w.kind === "hard")) card.classList.add("bad");
+
+  const row1 = mk("div", "row1");
+  const right = mk("div", "row1-right");
+  append(right,
+    mk("div", "cred", String(Number(c.creditos) || 0)),
+    isApproved ? mk("div", "status-badge approved inline", "✓") : null,
+  );
+  append(row1, mk("div", "sigla", sigla), right);
+
+  append(card,
+    row1,
+    nombre ? mk("div", "name", nombre) : null,
+    cw.length ? (() => {
+      const tags = mk("div", "tags");
+      for (const w of cw.slice(0, 3)) tags.appendChild(mk("div", `tag ${w.kind === "hard" ? "bad" : "warn"}`, w.kind === "hard" ? "HARD" : "SOFT"));
+      return tags;
+    })() : null,
+  );
+  return card;
+}
+
+function buildTermHeader(t, total, canDelete) {
+  const th = mk("div", "term-h");
+  const title = mk("div");
+  title.innerHTML = `<div class="term-title">${t.term_id}</div><div class="term-sub">${t.code}</div>`;
+
+  const maxC = state.config?.max_credits ?? 65;
+  const softC = state.config?.soft_credits ?? 50;
+  const cred = mk("div", "term-credits", `${total} cr`);
+  if (total > maxC) cred.classList.add("bad");
+  else if (total > softC) cred.classList.add("warn");
+
+  append(th, title, cred);
+
+  if (canDelete) {
+    const del = mk("button", "term-del", "✕");
+    del.type = "button";
+    del.title = "Eliminar período vacío";
+    del.addEventListener("click", (ev) => {
+      ev.stopPropagation();
+      const tid = t.term_id;
+      state.draft.custom_terms = (Array.isArray(state.draft.custom_terms) ? state.draft.custom_terms : []).filter(x => String(x?.term_id || "") !== tid);
+      state.draft.term_order = (Array.isArray(state.draft.term_order) ? state.draft.term_order : []).filter(x => String(x || "") !== tid);
+      if (state.draft.placements && typeof state.draft.placements === "object") {
+        for (const [cid, pt] of Object.entries(state.draft.placements)) if (String(pt) === tid) delete state.draft.placements[cid];
+      }
+      state.dirtyDraft = true;
+      updateDraftButtons();
+      fullRenderMod();
+      showNotice("info", `Período eliminado: ${tid}.`);
+    });
+    th.appendChild(del);
+  }
+  return th;
+}
+
+// Deja `parent` con exactamente `nodes` como hijos, en ese orden, tocando
+// solo los nodos que no están ya en su posición.
+function reconcileChildren(parent, nodes) {
+  let i = 0;
+  for (const node of nodes) {
+    const cur = parent.children[i] || null;
+    if (cur !== node) parent.insertBefore(node, cur);
+    i++;
+  }
+  while (parent.children.length > nodes.length) parent.lastElementChild.remove();
+}
+
+function termColumn(t) {
+  let entry = RENDER_CACHE.cols.get(t.term_id);
+  if (entry) return entry;
+
+  const col = mk("div", "term");
+  col.dataset.termId = t.term_id;
+
+  const list = mk("div", "list");
+  list.dataset.termId = t.term_id;
+  const hint = mk("div", "drop-hint", "Suelta aquí");
+
+  const add = mk("button", "course course-add", "+");
+  add.type = "button";
+  add.title = `Agregar curso en ${t.term_id}`;
+  add.dataset.termId = t.term_id;
+  add.draggable = false;
+  add.addEventListener("click", (ev) => { ev.stopPropagation(); });
+
+  entry = { col, list, hint, add, head: null, headSig: null };
+  RENDER_CACHE.cols.set(t.term_id, entry);
+  RENDER_STATS.cols_built++;
+  return entry;
+}
+
+// ---------- search (filtro) ----------
+// El filtro responde al tiro con un substring local y, apenas llega la respuesta
+// de /api/search, usa esos resultados (prefijos, sin tildes, cuerpo de la nota).
+let _searchTimer = null;
+let _searchSeq = 0;
+
+function scheduleSearch() {
+  clearTimeout(_searchTimer);
+  const q = ($("filter")?.value || "").trim().toLowerCase();
+  if (!q) { state.searchHits = null; return; }
+  _searchTimer = setTimeout(async () => {
+    const seq = ++_searchSeq;
+    try {
+      const res = await api.searchCourses(q, { limit: 0 });
+      if (seq !== _searchSeq) return;
+      state.searchHits = { q, ids: new Set((res?.results || []).map(r => r.course_id)) };
+      fullRenderMod();
+    } catch {
+      state.searchHits = null; // backend sin /api/search: queda el filtro local
+    }
+  }, 120);
+}
+
+function matchesFilter(c, filter) {
+  if (!filter) return true;
+  const hits = state.searchHits;
+  if (hits && hits.q === filter && hits.ids.has(c.course_id)) return true;
+  const hay = `${String(c.sigla || "").trim()} ${String(c.nombre || "").trim()}`.toLowerCase();
+  return hay.includes(filter);
+}
+
 function render(terms, courses, placements, warnings) {
   const filter = ($("filter")?.value || "").trim().toLowerCase();
   const showIgnored = !!$("showIgnored")?.checked;
@@ -741,116 +972,70 @@ function render(terms, courses, placements, warnings) {
   }
 
   const grid = $("grid");
-  grid.innerHTML = "";
+  const cols = [];
+  const seenTerms = new Set();
 
   for (const t of terms) {
-    const col = mk("div", "term");
-    col.dataset.termId = t.term_id;
-
-    const th = mk("div", "term-h");
-    const title = mk("div");
-    title.innerHTML = `<div class="term-title">${t.term_id}</div><div class="term-sub">${t.code}</div>`;
+    const entry = termColumn(t);
+    seenTerms.add(t.term_id);
 
     const total = creditsByTerm.get(t.term_id) || 0;
-    const maxC = state.config?.max_credits ?? 65;
-    const softC = state.config?.soft_credits ?? 50;
-    const cred = mk("div", "term-credits", `${total} cr`);
-    if (total > maxC) cred.classList.add("bad");
-    else if (total > softC) cred.classList.add("warn");
-
-    append(th, title, cred);
-
-    if (state.draftMode && t.isCustom && !(byTerm.get(t.term_id) || []).length) {
-      const del = mk("button", "term-del", "✕");
-      del.type = "button";
-      del.title = "Eliminar período vacío";
-      del.addEventListener("click", (ev) => {
-        ev.stopPropagation();
-                const tid = t.term_id;
-        state.draft.custom_terms = (Array.isArray(state.draft.custom_terms) ? state.draft.custom_terms : []).filter(x => String(x?.term_id || "") !== tid);
-        state.draft.term_order = (Array.isArray(state.draft.term_order) ? state.draft.term_order : []).filter(x => String(x || "") !== tid);
-        if (state.draft.placements && typeof state.draft.placements === "object") {
-          for (const [cid, pt] of Object.entries(state.draft.placements)) if (String(pt) === tid) delete state.draft.placements[cid];
-        }
-        state.dirtyDraft = true;
-        updateDraftButtons();
-    fullRenderMod();
-        showNotice("info", `Período eliminado: ${tid}.`);
-      });
-      th.appendChild(del);
+    const canDelete = !!(state.draftMode && t.isCustom && !(byTerm.get(t.term_id) || []).length);
+    const headSig = [t.code, total, state.config?.max_credits, state.config?.soft_credits, canDelete].join("\u0001");
+    if (headSig !== entry.headSig) {
+      const head = buildTermHeader(t, total, canDelete);
+      if (entry.head) entry.head.replaceWith(head);
+      entry.head = head;
+      entry.headSig = headSig;
     }
 
-    const list = mk("div", "list");
-    list.dataset.termId = t.term_id;
-
-    list.appendChild(mk("div", "drop-hint", "Suelta aquí"));
-
+    const nodes = [entry.hint];
     for (const c of (byTerm.get(t.term_id) || [])) {
-      const sigla = String(c.sigla || "").trim();
-      const nombre = String(c.nombre || "").trim();
-      if (filter) {
-        const hay = `${sigla} ${nombre}`.toLowerCase();
-        if (!hay.includes(filter)) continue;
-      }
+      if (!matchesFilter(c, filter)) continue;
 
-      const card = mk("div", "course");
       const cat = getCatInfo(c);
-      if (cat?.cls) card.classList.add(cat.cls);
-
-      card.draggable = !!state.draftMode;
-      card.dataset.courseId = c.course_id;
-
-      const isApproved = (c.aprobado === true);
-      if (isApproved) card.classList.add("aprobado");
-
       const cw = wByCourse.get(c.course_id) || [];
-      if (cw.some(w => w.kind === "hard")) card.classList.add("bad");
-
-      const row1 = mk("div", "row1");
-      const right = mk("div", "row1-right");
-      append(right,
-        mk("div", "cred", String(Number(c.creditos) || 0)),
-        isApproved ? mk("div", "status-badge approved inline", "✓") : null,
-      );
-      append(row1, mk("div", "sigla", sigla), right);
-
-      append(card,
-        row1,
-        nombre ? mk("div", "name", nombre) : null,
-        cw.length ? (() => {
-          const tags = mk("div", "tags");
-          for (const w of cw.slice(0, 3)) tags.appendChild(mk("div", `tag ${w.kind === "hard" ? "bad" : "warn"}`, w.kind === "hard" ? "HARD" : "SOFT"));
-          return tags;
-        })() : null,
-      );
-
-      list.appendChild(card);
-
-      if (dbg && dbgLeft > 0) {
-        dbgLeft--;
-        const rawCat = c.concentracion ?? c.frontmatter?.concentracion ?? c.frontmatter?.["concentración"];
-        const key = normalizeCat(rawCat);
-        const varColor = getComputedStyle(card).getPropertyValue("--course-color").trim();
-        const beforeBg = getComputedStyle(card, "::before").backgroundColor;
-        console.log("[DBG colors] course", { sigla, rawCat, key, cls: cat?.cls, order: cat?.order, varColor, beforeBg, className: card.className });
+      const sig = courseSignature(c, cat, cw, !!state.draftMode);
+      let cached = RENDER_CACHE.cards.get(c.course_id);
+      if (cached && cached.sig === sig) {
+        RENDER_STATS.cards_reused++;
+      } else {
+        const card = buildCourseCard(c, cat, cw);
+        if (cached) cached.el.replaceWith(card);
+        cached = { el: card, sig };
+        RENDER_CACHE.cards.set(c.course_id, cached);
+        RENDER_STATS.cards_built++;
+
+        if (dbg && dbgLeft > 0) {
+          dbgLeft--;
+          const rawCat = c.concentracion ?? c.frontmatter?.concentracion ?? c.frontmatter?.["concentración"];
+          const key = normalizeCat(rawCat);
+          const varColor = getComputedStyle(card).getPropertyValue("--course-color").trim();
+          const beforeBg = getComputedStyle(card, "::before").backgroundColor;
+          console.log("[DBG colors] course", { sigla: c.sigla, rawCat, key, cls: cat?.cls, order: cat?.order, varColor, beforeBg, className: card.className });
+        }
       }
+      nodes.push(cached.el);
     }
 
     // "+" (solo state.draftMode): botón visual al final del período
-    if (state.draftMode) {
-      const add = mk("button", "course course-add", "+");
-      add.type = "button";
-      add.title = `Agregar curso en ${t.term_id}`;
-      add.dataset.termId = t.term_id;
-      add.draggable = false;
-      add.addEventListener("click", (ev) => { ev.stopPropagation(); });
-      list.appendChild(add);
-    }
+    if (state.draftMode) nodes.push(entry.add);
 
-    append(col, th, list);
-    grid.appendChild(col);
+    reconcileChildren(entry.list, nodes);
+    if (entry.col.firstElementChild !== entry.head || entry.col.lastElementChild !== entry.list) {
+      reconcileChildren(entry.col, [entry.head, entry.list]);
+    }
+    cols.push(entry.col);
   }
 
+  reconcileChildren(grid, cols);
+
+  // Olvida columnas y tarjetas de cursos que ya no existen; las ocultas por el
+  // filtro se conservan para no reconstruirlas al limpiarlo.
+  const liveCards = new Set((courses || []).map(c => c.course_id));
+  for (const tid of RENDER_CACHE.cols.keys()) if (!seenTerms.has(tid)) RENDER_CACHE.cols.delete(tid);
+  for (const cid of RENDER_CACHE.cards.keys()) if (!liveCards.has(cid)) RENDER_CACHE.cards.delete(cid);
+
   if (dbg) {
     _dbgLogged = true;
     console.log("[DBG colors] end render (logged once)");
@@ -902,7 +1087,7 @@ function renderWarningsModal(activeWarnings) {
 const openWarningsModal = () => { const el = $("warningsModal"); if (el) el.style.display = "flex"; };
 const closeWarningsModal = () => { const el = $("warningsModal"); if (el) el.style.display = "none"; };
 
-function fullRender() {
+function renderNow() {
   if (!state.all || !state.config || !state.draft) return;
 
   const { terms, placements } = buildEffectiveTermsAndPlacements(state.all.terms, state.all.courses, state.draft);
@@ -924,8 +1109,58 @@ function fullRender() {
   render(terms, state.all.courses, placements, warnings);
 }
 
+// Varias llamadas dentro del mismo tick (drop + update, filtro al teclear, SSE)
+// se agrupan en un solo render en el siguiente frame.
+let _renderPending = false;
+const nextFrame = (typeof requestAnimationFrame === "function") ? requestAnimationFrame : (fn) => setTimeout(fn, 16);
+
+function fullRender() {
+  RENDER_STATS.requested++;
+  if (_renderPending) return;
+  _renderPending = true;
+  nextFrame(() => {
+    _renderPending = false;
+    const t0 = performance.now();
+    renderNow();
+    const ms = performance.now() - t0;
+    RENDER_STATS.frames++;
+    RENDER_STATS.last_ms = ms;
+    RENDER_STATS.max_ms = Math.max(RENDER_STATS.max_ms, ms);
+    RENDER_STATS.avg_ms += (ms - RENDER_STATS.avg_ms) / RENDER_STATS.frames;
+    showRenderStats();
+  });
+}
+
+function showRenderStats() {
+  const el = $("renderStats");
+  if (!el) return;
+  const s = RENDER_STATS;
+  el.textContent = `render: ${s.last_ms.toFixed(1)} ms (prom ${s.avg_ms.toFixed(1)}, máx ${s.max_ms.toFixed(1)}) · `
+    + `${s.frames} frames / ${s.requested} pedidos · tarjetas ${s.cards_built} creadas, ${s.cards_reused} reutilizadas · columnas ${s.cols_built}`;
+}
+
+// Copy of the draft as last persisted; saving sends only the diff against it.
+function markDraftSynced() {
+  state._savedDraft = JSON.parse(JSON.stringify(state.draft || {}));
+}
+
+async function persistDraft() {
+  const draft = state.draft || {};
+  const ops = state._savedDraft ? jsonDiff(state._savedDraft, draft) : null;
+  if (ops && !ops.length) return;
+  try {
+    if (ops) await api.patchDraft(ops);
+    else await api.saveDraft(draft);
+  } catch (e) {
+    if (!ops) throw e;
+    // The disk draft diverged (or an older backend): fall back to a full save.
+    await api.saveDraft(draft);
+  }
+  markDraftSynced();
+}
+
 async function saveDraftToServer() {
-  await api.saveDraft(state.draft || {});
+  await persistDraft();
   mergeCoursesWithTemps();
   state.dirtyDraft = false;
   updateDraftButtons();
@@ -934,6 +1169,7 @@ async function saveDraftToServer() {
 
 async function resetDraftFromServer() {
   state.draft = await api.getDraft();
+  markDraftSynced();
   ADD_TERM_TOUCHED = false;
   state.dirtyDraft = false;
   mergeCoursesWithTemps();
@@ -1092,7 +1328,7 @@ function initHandlers() {
   state.draftMode = !!$("draftToggle")?.checked;
   updateDraftButtons();
 
-  on("filter", "input", fullRenderMod);
+  on("filter", "input", () => { fullRenderMod(); scheduleSearch(); });
   on("warningsBtn", "click", openWarningsModalMod);
   on("warningsClose", "click", closeWarningsModalMod);
 
@@ -1173,6 +1409,7 @@ async function main() {
     await loadAll();
     renderLegend();
     fullRenderMod();
+    initLiveUpdates();
   } catch (e) {
     showNotice("hard", String(e.message || e));
   }
@@ -1188,6 +1425,7 @@ try {
     openWarningsModal,
     closeWarningsModal,
     fullRender,
+    renderStats: RENDER_STATS,
     showNotice,
     hideNotice,
     saveDraftToServer,
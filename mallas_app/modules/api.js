@@ -1,6 +1,18 @@
 // Minimal API client for the local Python backend.
 // Keep dependency-free; let app.js decide how to surface errors (toasts, modal, etc.).
 
+/**
+ * Prefix for /api/* URLs. When one server hosts several vaults (--vault name=path)
+ * the UI lives under /v/<name>/ and its API under /v/<name>/api/...
+ */
+export const API_BASE = (() => {
+  const path = typeof location !== "undefined" ? String(location.pathname || "") : "";
+  const m = path.match(/^\/v\/[^/]+(?=\/)/);
+  return m ? m[0] : "";
+})();
+
+const apiUrl = (url) => (String(url).startsWith("/api/") ? API_BASE + url : url);
+
 async function readBodyAsText(res) {
   try {
     return await res.text();
@@ -16,7 +28,7 @@ async function readBodyAsText(res) {
  * @param {RequestInit} [init]
  */
 export async function fetchJSON(url, init = {}) {
-  const res = await fetch(url, init);
+  const res = await fetch(apiUrl(url), init);
   const text = await readBodyAsText(res);
 
   if (!res.ok) {
@@ -38,15 +50,43 @@ export async function fetchJSON(url, init = {}) {
   }
 }
 
+/**
+ * Initial payloads inlined by the server (--inline-data) as window.__MALLA_BOOT__.
+ * Each key is handed out once; later calls go to the network as usual.
+ * @param {"config"|"all"|"draft"} key
+ */
+function takeBoot(key) {
+  const boot = typeof window !== "undefined" ? window.__MALLA_BOOT__ : null;
+  if (!boot || typeof boot !== "object" || !(key in boot)) return null;
+  const value = boot[key];
+  delete boot[key];
+  return value ?? null;
+}
+
 export function getConfig() {
+  const boot = takeBoot("config");
+  if (boot) return Promise.resolve(boot);
   return fetchJSON("/api/config", { method: "GET" });
 }
 
-export function getAll() {
-  return fetchJSON("/api/all", { method: "GET" });
+/**
+ * GET /api/all. Full payloads carry an ETag, so the browser revalidates them (304).
+ * With `since` (a previous `generation`) the backend answers with only the changes:
+ * {full:false, courses:[changed], removed:[course_id]}; or the full payload with full:true.
+ * @param {number} [since]
+ */
+export function getAll(since) {
+  if (since == null) {
+    const boot = takeBoot("all");
+    if (boot) return Promise.resolve(boot);
+  }
+  const qs = since != null ? `?since=${encodeURIComponent(String(since))}` : "";
+  return fetchJSON(`/api/all${qs}`, { method: "GET" });
 }
 
 export function getDraft() {
+  const boot = takeBoot("draft");
+  if (boot) return Promise.resolve(boot);
   return fetchJSON("/api/draft", { method: "GET" });
 }
 
@@ -63,6 +103,22 @@ export function materializeCourse(course) {
   });
 }
 
+/**
+ * Materialize several temporary courses in one request (POST /api/materialize/batch).
+ * Each item is a /api/materialize payload plus its draft `course_id` (and `override_of`).
+ * The whole batch is validated first; with `partial` the valid ones are written anyway.
+ * Returns {ok, written, results:[{course_id, ok, fileRel?, error?}], rev?}.
+ * @param {any[]} courses
+ * @param {{partial?: boolean}} [opts]
+ */
+export function materializeBatch(courses, opts = {}) {
+  return fetchJSON("/api/materialize/batch", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ courses: courses ?? [], partial: !!opts.partial }),
+  });
+}
+
 /**
  * Save draft (POST /api/draft). Returns backend response {ok:true}.
  * @param {any} draft
@@ -75,6 +131,29 @@ export function saveDraft(draft) {
   });
 }
 
+/**
+ * Send only the changes to the draft (PATCH /api/draft), as JSON-patch ops.
+ * With `rev` the backend answers 409 if the draft changed since that revision.
+ * Returns {ok:true, rev}.
+ * @param {any[]} ops
+ * @param {number} [rev]
+ */
+export function patchDraft(ops, rev) {
+  return fetchJSON("/api/draft", {
+    method: "PATCH",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(rev != null ? { ops: ops ?? [], rev } : (ops ?? [])),
+  });
+}
+
+/**
+ * Restore the previous draft snapshot kept by the backend (POST /api/draft/undo).
+ * Returns {ok:true, draft, rev, undo_left}; throws when there is nothing to undo.
+ */
+export function undoDraft() {
+  return fetchJSON("/api/draft/undo", { method: "POST" });
+}
+
 /**
  * Hard reset draft on disk (POST /api/draft/reset).
  * Deletes malla_draft.json if present.
@@ -83,3 +162,73 @@ export function saveDraft(draft) {
 export function hardResetDraft() {
   return fetchJSON("/api/draft/reset", { method: "POST" });
 }
+
+/**
+ * Subscribe to live catalogue deltas (GET /api/events, Server-Sent Events).
+ * `handlers` maps event name -> callback(data); known events: hello, delta, resync.
+ * Returns the EventSource (call .close() to stop) or null if unsupported.
+ * @param {Record<string, (data:any) => void>} handlers
+ */
+export function subscribeEvents(handlers = {}) {
+  if (typeof EventSource !== "function") return null;
+  const es = new EventSource(apiUrl("/api/events"));
+  for (const [name, fn] of Object.entries(handlers || {})) {
+    if (typeof fn !== "function") continue;
+    es.addEventListener(name, (ev) => {
+      let data = null;
+      try {
+        data = ev.data ? JSON.parse(ev.data) : null;
+      } catch {
+        data = null;
+      }
+      fn(data);
+    });
+  }
+  return es;
+}
+
+/**
+ * Ask the backend planner for a placement of the pending courses (POST /api/plan).
+ * `opts`: {start?, cap?: "max"|"soft", summer?, keep_draft?, exact?, time_budget_ms?, apply?, scenario?}.
+ * With apply (default) the backend also writes the placements into the draft and returns it;
+ * with `scenario` it saves them as that named scenario in draft.scenarios instead.
+ * @param {any} [opts]
+ */
+export function planCourses(opts = {}) {
+  return fetchJSON("/api/plan", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(opts ?? {}),
+  });
+}
+
+/**
+ * GET /api/search: ranked, accent-insensitive prefix search over the catalogue
+ * (sigla, nombre, concentracion, prerrequisitos, semestreOfrecido and note bodies).
+ * `opts`: {concentracion?, term?, aprobado?: boolean, limit?: number (0 = all)}.
+ * Returns {q, total, results:[{course_id, sigla, ..., score}], facets, generation}.
+ * @param {string} q
+ * @param {any} [opts]
+ */
+export function searchCourses(q, opts = {}) {
+  const qs = new URLSearchParams({ q: String(q ?? "") });
+  for (const k of ["concentracion", "term", "aprobado", "limit"]) {
+    if (opts?.[k] != null && opts[k] !== "") qs.set(k, String(opts[k]));
+  }
+  return fetchJSON(`/api/search?${qs}`, { method: "GET" });
+}
+
+/**
+ * Compare what-if placement sets (POST /api/scenarios/evaluate).
+ * `opts`: {scenarios?: {name: placements} | [{name, placements}], draft?, current?: boolean}.
+ * Without `scenarios` the backend evaluates the ones saved in draft.scenarios.
+ * Returns {best, scenarios:[{name, rank, counts, hard, graduation, n_terms, load}], procs, elapsed_ms}.
+ * @param {any} [opts]
+ */
+export function evaluateScenarios(opts = {}) {
+  return fetchJSON("/api/scenarios/evaluate", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(opts ?? {}),
+  });
+}
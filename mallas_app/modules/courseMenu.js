@@ -51,20 +51,12 @@ function listify(x) {
 }
 
 function normalizeReqs(course) {
-  const fm = course?.frontmatter || {};
-  const raw = course?.prerrequisitos ?? fm?.prerrequisitos;
-  const arr = listify(raw).map((v) => String(v).trim()).filter(Boolean);
+  // The server (and makeTempCourse) store coreqs as "SIGLA(c)" inside prerrequisitos.
+  const arr = listify(course?.prerrequisitos).map((v) => String(v).trim()).filter(Boolean);
 
   const prereq = [];
   const coreq = [];
 
-  // If upstream already normalized corequisitos, respect it.
-  const co = listify(course?.corequisitos ?? fm?.corequisitos);
-  for (const c of co) {
-    const cc = String(c || "").trim();
-    if (cc) coreq.push(cc);
-  }
-
   for (const it of arr) {
     const low = it.toLowerCase();
     if (!it || low === "nt") continue;
@@ -81,9 +73,7 @@ function normalizeReqs(course) {
 }
 
 function normalizeOffered(course) {
-  const fm = course?.frontmatter || {};
-  const raw = course?.semestreOfrecido ?? fm?.semestreOfrecido;
-  const arr = listify(raw).map((v) => String(v).trim()).filter(Boolean);
+  const arr = listify(course?.semestreOfrecido).map((v) => String(v).trim()).filter(Boolean);
   // Accept [0,1,2] or ["V","I","P"]
   const map = { "0": "V", "1": "I", "2": "P", V: "V", I: "I", P: "P" };
   const out = [];
@@ -390,13 +380,12 @@ function ensureDOM() {
 }
 
 function renderMenu({ course, isDraftMode }) {
-  const fm = course?.frontmatter || {};
   _panel?.classList?.add?.("course-menu");
-  const sigla = String(course?.sigla ?? fm?.sigla ?? "").trim();
-  const nombre = String(course?.nombre ?? fm?.nombre ?? "").trim();
-  const creditos = Number(course?.creditos ?? fm?.creditos ?? fm?.créditos ?? 0) || 0;
-  const concentracion = String(course?.concentracion ?? fm?.concentracion ?? fm?.["concentración"] ?? "ex").trim() || "ex";
-  const aprobado = !!(course?.aprobado ?? fm?.aprobado);
+  const sigla = String(course?.sigla ?? "").trim();
+  const nombre = String(course?.nombre ?? "").trim();
+  const creditos = Number(course?.creditos ?? 0) || 0;
+  const concentracion = String(course?.concentracion ?? "ex").trim() || "ex";
+  const aprobado = !!course?.aprobado;
 
   const { prereq, coreq } = normalizeReqs(course);
   const offered = normalizeOffered(course);
@@ -188,7 +188,7 @@ function normalizeOffered(raw) {
   return out;
 }
 
-function splitReqs(rawList, coreqList) {
+function splitReqs(rawList) {
   const prereqs = [];
   const coreqs = [];
   const rawArr = Array.isArray(rawList) ? rawList : rawList != null ? [rawList] : [];
@@ -199,11 +199,6 @@ function splitReqs(rawList, coreqList) {
     if (m) coreqs.push(m[1].trim());
     else prereqs.push(s);
   }
-  const extraCoreqs = Array.isArray(coreqList) ? coreqList : coreqList != null ? [coreqList] : [];
-  for (const c of extraCoreqs) {
-    const s = String(c ?? "").trim();
-    if (s && !coreqs.includes(s)) coreqs.push(s);
-  }
   return { prereqs, coreqs };
 }
 
@@ -211,21 +206,18 @@ function createOverrideFromDiskCourse(course, termId, mergeCoursesWithTemps) {
   const cid = String(course?.course_id || "").trim();
   if (!cid) return null;
 
-  const fm = course?.frontmatter && typeof course.frontmatter === "object" ? course.frontmatter : {};
-  const offeredRaw = course?.semestreOfrecido ?? fm?.semestreOfrecido;
-  const concRaw = course?.concentracion ?? course?.concentración ?? fm?.concentracion ?? fm?.["concentración"] ?? "ex";
-  const creditosRaw = course?.creditos ?? course?.créditos ?? fm?.creditos ?? fm?.créditos;
-  const { prereqs, coreqs } = splitReqs(course?.prerrequisitos ?? fm?.prerrequisitos, course?.corequisitos ?? fm?.corequisitos);
+  // /api/all omits the raw frontmatter; the normalized fields carry everything (coreqs as "SIGLA(c)").
+  const { prereqs, coreqs } = splitReqs(course?.prerrequisitos);
 
   const payload = {
-    sigla: course?.sigla ?? fm?.sigla,
-    nombre: course?.nombre ?? fm?.nombre,
-    creditos: creditosRaw,
+    sigla: course?.sigla,
+    nombre: course?.nombre,
+    creditos: course?.creditos,
     prerrequisitos: prereqs,
     correquisitos: coreqs,
-    semestreOfrecido: normalizeOffered(offeredRaw),
-    concentracion: concRaw,
-    aprobado: course?.aprobado ?? fm?.aprobado,
+    semestreOfrecido: normalizeOffered(course?.semestreOfrecido),
+    concentracion: course?.concentracion ?? "ex",
+    aprobado: course?.aprobado,
   };
 
   const existingSiglas = listAllSiglas(state.all?.courses || []);
@@ -235,7 +227,7 @@ function createOverrideFromDiskCourse(course, termId, mergeCoursesWithTemps) {
   const newCourse = makeTempCourse(payload, termId, { existingSiglas });
   newCourse.temp_kind = "override";
   newCourse.override_of = cid;
-  newCourse.aprobado = !!(course?.aprobado ?? fm?.aprobado);
+  newCourse.aprobado = !!course?.aprobado;
   newCourse.frontmatter = newCourse.frontmatter && typeof newCourse.frontmatter === "object" ? newCourse.frontmatter : {};
   newCourse.frontmatter.aprobado = newCourse.aprobado;
 
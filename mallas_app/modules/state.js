@@ -17,6 +17,9 @@ export const state = {
   savingDraft: false,
   lastSavedAt: 0,
 
+  // Último resultado de /api/search para el filtro: {q, ids:Set<course_id>} | null
+  searchHits: null,
+
   // Runtime helpers (optional)
   // e.g., maps built by app.js/render for quick lookup
   maps: {
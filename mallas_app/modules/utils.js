@@ -70,3 +70,33 @@ export function uniq(arr) {
   }
   return out;
 }
+
+/** Escape one JSON Pointer token (RFC 6901): "~" -> "~0", "/" -> "~1". */
+export function pointerToken(k) {
+  return String(k).replaceAll("~", "~0").replaceAll("/", "~1");
+}
+
+/**
+ * JSON-patch style diff between two plain JSON values.
+ * Objects are diffed key by key; arrays and scalars are replaced wholesale.
+ * Returns [] when both values are equal.
+ * @param {any} prev
+ * @param {any} next
+ * @param {string} [path]
+ */
+export function jsonDiff(prev, next, path = "") {
+  const isObj = (x) => x !== null && typeof x === "object" && !Array.isArray(x);
+  if (!isObj(prev) || !isObj(next)) {
+    return JSON.stringify(prev) === JSON.stringify(next) ? [] : [{ op: "replace", path, value: next }];
+  }
+  const ops = [];
+  for (const k of Object.keys(prev)) {
+    if (!(k in next)) ops.push({ op: "remove", path: `${path}/${pointerToken(k)}` });
+  }
+  for (const [k, v] of Object.entries(next)) {
+    const p = `${path}/${pointerToken(k)}`;
+    if (!(k in prev)) ops.push({ op: "add", path: p, value: v });
+    else ops.push(...jsonDiff(prev[k], v, p));
+  }
+  return ops;
+}
@@ -0,0 +1,63 @@
+import json
+import re
+import socket
+import threading
+
+import pytest
+
+import malla_app as m
+
+
+@pytest.fixture(scope="module")
+def port(tmp_path_factory):
+    b = m.make_vault(tmp_path_factory.mktemp("vault"), terms=3, courses=6, body=200)
+    srv = m.AsyncHTTPServer(("127.0.0.1", 0), m.handler_factory(b, None))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    assert srv._ready.wait(10)
+    yield srv.server_address[1]
+    srv.shutdown()
+    srv.server_close()
+
+
+def talk(port, data: bytes) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as s:
+        s.sendall(data)
+        out = b""
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                return out
+            out += chunk
+
+
+def statuses(raw: bytes) -> list:
+    return [int(x) for x in re.findall(rb"HTTP/1\.1 (\d{3}) ", raw)]
+
+
+def chunked(body: bytes, split: int) -> bytes:
+    # Dos chunks (el primero con extensión) y un trailer.
+    a, b = body[:split], body[split:]
+    return b"%x;ext=1\r\n%s\r\n%x\r\n%s\r\n0\r\nX-Trailer: 1\r\n\r\n" % (len(a), a, len(b), b)
+
+
+def test_chunked_body_then_pipelined_request(port):
+    body = json.dumps({"apply": False}).encode()
+    raw = talk(
+        port,
+        b"POST /api/plan HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\nContent-Type: application/json\r\n\r\n"
+        + chunked(body, 5)
+        + b"GET /api/config HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n",
+    )
+    assert statuses(raw) == [200, 200]
+    first = raw.split(b"\r\n\r\n", 1)[1]
+    assert b'"ok": true' in first and b'"plan"' in first
+
+
+def test_unsupported_transfer_encoding(port):
+    raw = talk(port, b"POST /api/plan HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: gzip, chunked\r\n\r\n0\r\n\r\n")
+    assert statuses(raw) == [501]
+
+
+def test_malformed_chunk_size(port):
+    raw = talk(port, b"POST /api/plan HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n")
+    assert statuses(raw) == [400]
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import malla_app as m
+
+
+def add_term(tid):
+    return [{"op": "add", "path": "/custom_terms/-", "value": {"term_id": tid}}]
+
+
+def crash(ds):
+    # Simula un corte: el timer no alcanza a compactar y atexit no tiene nada pendiente.
+    if ds._timer is not None:
+        ds._timer.cancel()
+    ds._dirty_since = None
+
+
+def term_ids(d):
+    return [t["term_id"] for t in d["custom_terms"]]
+
+
+def terms_of(ds):
+    return term_ids(ds.get())
+
+
+def test_journal_replay_after_crash(tmp_path):
+    ds = m.DraftStore(tmp_path)
+    ds.patch(add_term("2027-1"))
+    ds.patch(add_term("2027-2"))
+    crash(ds)
+    assert not m.draft_path(tmp_path).exists()
+
+    ds2 = m.DraftStore(tmp_path)
+    assert terms_of(ds2) == ["2027-1", "2027-2"]
+    assert (ds2.replayed, ds2.skipped, ds2.rev) == (2, 0, 2)
+    # Al abrir se compacta: snapshot con ``_rev`` y sin journal.
+    assert not ds2.journal.exists()
+    assert json.loads(m.draft_path(tmp_path).read_text(encoding="utf-8"))[m.SNAPSHOT_REV] == 2
+    assert m.SNAPSHOT_REV not in ds2.get()
+
+
+def test_journal_not_applied_twice(tmp_path):
+    ds = m.DraftStore(tmp_path)
+    ds.patch(add_term("2027-1"))
+    pending = ds.journal.read_text(encoding="utf-8")
+    ds.flush()
+    # Corte entre el rename del snapshot y el borrado del journal.
+    ds.journal.write_text(pending, encoding="utf-8")
+
+    ds2 = m.DraftStore(tmp_path)
+    assert terms_of(ds2) == ["2027-1"]
+    assert (ds2.replayed, ds2.rev) == (0, 1)
+
+
+def test_journal_skips_unreadable_lines(tmp_path):
+    ds = m.DraftStore(tmp_path)
+    for tid in ("A", "B", "C"):
+        ds.patch(add_term(tid))
+    crash(ds)
+    lines = ds.journal.read_text(encoding="utf-8").splitlines(True)
+    lines[1] = lines[1][:10] + "\n"  # entrada ilegible al medio
+    lines.append('{"rev": 4, "ops": [{"op"')  # última línea truncada
+    ds.journal.write_text("".join(lines), encoding="utf-8")
+
+    ds2 = m.DraftStore(tmp_path)
+    assert terms_of(ds2) == ["A", "C"]
+    assert (ds2.replayed, ds2.skipped, ds2.rev) == (2, 2, 3)
+
+
+def test_patch_rev_conflict(tmp_path):
+    ds = m.DraftStore(tmp_path)
+    rev = ds.patch(add_term("2027-1"))
+    assert ds.patch(add_term("2027-2"), rev=rev) == rev + 1
+    with pytest.raises(m.DraftConflict):
+        ds.patch(add_term("2028-1"), rev=rev)
+    assert terms_of(ds) == ["2027-1", "2027-2"]
+    ds.flush()
+
+
+def test_undo_restores_previous_snapshot(tmp_path):
+    ds = m.DraftStore(tmp_path)
+    ds.patch(add_term("2027-1"))
+    ds.flush()
+    ds.patch(add_term("2027-2"))
+    assert terms_of(ds) == ["2027-1", "2027-2"]
+    assert term_ids(ds.undo()) == ["2027-1"]
+    assert terms_of(m.DraftStore(tmp_path)) == ["2027-1"]
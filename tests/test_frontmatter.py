@@ -0,0 +1,40 @@
+import pytest
+
+import malla_app as m
+
+NOTE = "---\nsigla: ABC1234\ncreditos: 10\nprerrequisitos:\n  - MAT1610\n---\n# Cuerpo\n\ntexto\n"
+
+
+@pytest.mark.parametrize("eol", ["\n", "\r\n", "\r"])
+def test_split_frontmatter_line_endings(eol):
+    header, body = m.split_frontmatter(NOTE.replace("\n", eol))
+    assert header == "sigla: ABC1234\ncreditos: 10\nprerrequisitos:\n  - MAT1610"
+    assert body.splitlines() == ["# Cuerpo", "", "texto"]
+
+
+def test_split_frontmatter_without_header():
+    assert m.split_frontmatter("# Nota\r\n---\r\n") == (None, "# Nota\r\n---\r\n")
+    assert m.split_frontmatter("---\r\nsigla: X\r\n") == (None, "---\r\nsigla: X\r\n")
+
+
+@pytest.mark.parametrize("eol", ["\n", "\r\n", "\r"])
+def test_read_frontmatter_matches_split(tmp_path, eol):
+    md = tmp_path / "nota.md"
+    text = NOTE.replace("\n", eol)
+    md.write_bytes(text.encode("utf-8"))
+    assert m.read_frontmatter(md) == m.split_frontmatter(text)[0]
+    assert m.parse_frontmatter(m.read_frontmatter(md))["sigla"] == "ABC1234"
+
+
+def test_read_frontmatter_unclosed(tmp_path):
+    md = tmp_path / "nota.md"
+    md.write_bytes(b"---\r\nsigla: X\r\n")
+    assert m.read_frontmatter(md) is None
+
+
+def test_correquisitos_key_folds_into_prerrequisitos(tmp_path):
+    md = tmp_path / "ABC1234.md"
+    md.write_text("---\nprerrequisitos: [MAT1610, FIS1514(c)]\ncorrequisitos: [FIS1514, IIC1103]\n---\n", encoding="utf-8")
+    c = m.read_course(md, "2025-1/ABC1234.md", "2025-1")
+    assert list(c.prerrequisitos) == ["MAT1610", "FIS1514(c)", "IIC1103(c)"]
+    assert m.split_reqs(c.prerrequisitos) == (["MAT1610"], ["FIS1514", "IIC1103"])
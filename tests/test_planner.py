@@ -0,0 +1,45 @@
+import malla_app as m
+
+
+def course(cid, prer=(), aprobado=False, term_id=None):
+    return dict(
+        course_id=cid, sigla=cid.upper(), term_id=term_id, creditos=10, aprobado=aprobado, prerrequisitos=list(prer)
+    )
+
+
+TERMS = [dict(term_id="2026-1", year=2026, sem=1, code="I")]
+
+
+def test_fixed_prereq_outside_horizon():
+    # B está fijo en un verano (fuera de ``seq`` sin ``summer``): C debe ir después.
+    courses = [course("a", aprobado=True, term_id="2026-1"), course("b"), course("c", ["B"])]
+    draft = dict(m.draft_default(), placements={"b": "2027-0"})
+    plan = m.plan_semesters(courses, TERMS, draft, start="2026-1")
+    assert plan["placements"] == {"c": "2027-1"}
+    assert plan["unplaced"] == []
+    assert m.term_index(plan["placements"]["c"]) > m.term_index("2027-0")
+
+
+def test_fixed_prereq_past_last_term():
+    courses = [course("b"), course("c", ["B"])]
+    draft = dict(m.draft_default(), placements={"b": "2030-2"})
+    plan = m.plan_semesters(courses, TERMS, draft, start="2026-1", max_terms=4)
+    # El horizonte termina antes de 2030-2: C no se puede ubicar antes de B.
+    assert plan["placements"] == {}
+    assert plan["unplaced"] == ["c"]
+
+
+def test_coreq_fixed_outside_horizon_is_unplaced():
+    courses = [course("d", ["E(c)"]), course("e")]
+    draft = dict(m.draft_default(), placements={"e": "2027-0"})
+    plan = m.plan_semesters(courses, TERMS, draft, start="2026-1")
+    assert "d" not in plan["placements"]
+    assert plan["unplaced"] == ["d"]
+
+
+def test_plan_respects_prereq_chain():
+    courses = [course("a"), course("b", ["A"]), course("c", ["B"])]
+    plan = m.plan_semesters(courses, TERMS, m.draft_default(), start="2026-1")
+    p = plan["placements"]
+    assert m.term_index(p["a"]) < m.term_index(p["b"]) < m.term_index(p["c"])
+    assert plan["warnings"]["hard"] == 0
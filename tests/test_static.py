@@ -0,0 +1,55 @@
+import http.client
+import re
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+import malla_app as m
+
+UI_DIR = Path(__file__).resolve().parent.parent / "mallas_app"
+
+
+@pytest.fixture(scope="module", params=["threading", "asyncio"])
+def conn(request, tmp_path_factory):
+    b = m.make_vault(tmp_path_factory.mktemp("vault"), terms=2, courses=4, body=100)
+    handler = m.handler_factory(b, UI_DIR, bundle=True)
+    if request.param == "asyncio":
+        srv = m.AsyncHTTPServer(("127.0.0.1", 0), handler)
+    else:
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    if request.param == "asyncio":
+        assert srv._ready.wait(10)
+    port = srv.server_address[1]
+
+    def call(method, path, headers=None):
+        c = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        try:
+            c.request(method, path, headers=headers or {})
+            r = c.getresponse()
+            return r.status, dict(r.getheaders()), r.read()
+        finally:
+            c.close()
+
+    yield call
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_head_matches_get_without_body(conn):
+    _, _, index = conn("GET", "/")
+    bundle = re.search(rb'src="(/bundle\.js\?v=\w+)"', index).group(1).decode()
+    for path in (bundle, "/app.js", "/modules/api.js", "/no-existe.js"):
+        status, headers, _ = conn("GET", path, {"Accept-Encoding": "gzip"})
+        h_status, h_headers, body = conn("HEAD", path, {"Accept-Encoding": "gzip"})
+        assert (h_status, body) == (status, b""), path
+        for k in ("Content-Length", "Content-Encoding", "ETag", "Cache-Control"):
+            assert h_headers.get(k) == headers.get(k), (path, k)
+    assert conn("HEAD", bundle)[1]["Cache-Control"] == m.StaticCache.IMMUTABLE
+
+
+def test_head_events_not_streamed(conn):
+    status, headers, body = conn("HEAD", "/api/events")
+    assert (status, headers["Allow"], body) == (405, "GET", b"")
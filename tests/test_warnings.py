@@ -0,0 +1,97 @@
+import json
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import malla_app as m
+
+
+def by_id(ws):
+    return sorted(ws, key=lambda w: w["id"])
+
+
+def rebuilt(eng, courses, terms):
+    # Como Vault.warning_engine al cambiar el catálogo: nuevo motor con las ubicaciones de la sesión.
+    draft = dict(eng.draft, placements={k: v for k, v in eng.placement.items() if v})
+    return m.WarningEngine(courses, terms, m.sanitize_draft(draft))
+
+
+def test_move_matches_full_rebuild():
+    terms, courses = m.synthetic_catalogue(120, seed=3, n_terms=6)
+    tids = [t["term_id"] for t in terms] + ["2030-1", "2030-0"]
+    pending = [c["course_id"] for c in courses if not c["aprobado"]]
+    for seed in range(40):
+        rnd = random.Random(seed)
+        eng = m.WarningEngine(courses, terms, m.draft_default())
+        for _ in range(8):
+            changes = {cid: rnd.choice(tids + [None, ""]) for cid in rnd.sample(pending, 5)}
+            eng.move(changes)
+            assert by_id(eng.warnings()) == by_id(rebuilt(eng, courses, terms).warnings()), (seed, changes)
+            assert eng.counts() == rebuilt(eng, courses, terms).counts()
+
+
+def test_move_none_restores_disk_term():
+    terms = [dict(term_id="2025-1", year=2025, sem=1, code="I"), dict(term_id="2025-2", year=2025, sem=2, code="P")]
+    courses = [
+        dict(course_id="a", sigla="A", term_id="2025-1", creditos=10, aprobado=False, prerrequisitos=[]),
+        dict(course_id="b", sigla="B", term_id="2025-1", creditos=10, aprobado=False, prerrequisitos=["A(c)"]),
+    ]
+    eng = m.WarningEngine(courses, terms, m.draft_default())
+    eng.move({"a": "2025-2"})
+    assert eng.counts()["hard"] == 1
+    eng.move({"a": None})
+    assert eng.placement["a"] == "2025-1"
+    assert eng.credits["2025-1"] == 20 and eng.credits["2025-2"] == 0
+    assert eng.counts()["hard"] == 0
+
+
+WARNINGS_JS = Path(__file__).resolve().parent.parent / "mallas_app" / "modules" / "warnings.js"
+
+# Misma entrada que arma app.js: buildEffectiveTermsAndPlacements() + el adaptador que separa ``(c)``.
+NODE_SCRIPT = """
+import { computeWarnings } from %s;
+let s = "";
+for await (const chunk of process.stdin) s += chunk;
+const a = JSON.parse(s);
+const out = a.cases.map((k) => computeWarnings(k.terms, a.courses, k.placements, k.draft, a.config));
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="requiere node")
+def test_parity_with_warnings_js():
+    terms, courses = m.synthetic_catalogue(120, seed=3, n_terms=6)
+    tids = [t["term_id"] for t in terms] + ["2022-0", "2030-1", "2030-2"]
+    js_courses = []
+    for c in courses:
+        pre, co = m.split_reqs(c.get("prerrequisitos"), ignore_case=False)
+        js_courses.append(dict(c, prerrequisitos=pre, corequisitos=co))
+    cases, engines = [], []
+    for seed in range(30):
+        rnd = random.Random(seed)
+        draft = m.draft_default()
+        draft["placements"] = {c["course_id"]: rnd.choice(tids) for c in rnd.sample(courses, 15)}
+        draft["custom_terms"] = [{"term_id": "2031-1"}]
+        eng = m.WarningEngine(courses, terms, m.sanitize_draft(draft))
+        for w in rnd.sample(eng.warnings(), 3):
+            draft["ignored_warnings"][w["id"]] = True
+        eng = m.WarningEngine(courses, terms, m.sanitize_draft(draft))
+        placements = {c["course_id"]: c["term_id"] for c in courses}
+        placements.update(draft["placements"])
+        cases.append(dict(terms=m.effective_terms(terms, draft), placements=placements, draft=draft))
+        engines.append(eng)
+    payload = dict(
+        courses=js_courses, cases=cases, config=dict(max_credits=m.MAX_CREDITS, soft_credits=m.SOFT_CREDITS)
+    )
+    out = subprocess.run(
+        ["node", "--input-type=module", "-e", NODE_SCRIPT % json.dumps(WARNINGS_JS.as_uri())],
+        input=json.dumps(payload, default=str),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for seed, (eng, expected) in enumerate(zip(engines, json.loads(out.stdout))):
+        assert by_id(eng.warnings()) == by_id(expected), seed